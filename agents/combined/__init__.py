@@ -0,0 +1 @@
+"""Combined deployment running every agent in one process."""
@@ -0,0 +1,96 @@
+"""Combined Agents - Runs every agent in one process for small deployments and tests."""
+
+import importlib
+import os
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI
+
+from shared.schemas.base import HealthResponse
+from shared.utils.database import pool_metrics
+from shared.utils.http import client_metrics, use_local_agents
+from shared.utils.metrics import metrics_router
+
+AGENTS = ("ontology", "mapping", "uom", "reranking", "conformance", "inventory")
+
+
+def get_combined_agents() -> list[str]:
+    """
+    Agents served by this process, from ``COMBINED_AGENTS`` (comma-separated, default all).
+
+    Agents left out run as separate services and are called over HTTP at
+    their ``<NAME>_AGENT_URL``.
+
+    Raises:
+        ValueError: If an unknown agent is listed
+    """
+    configured = os.getenv("COMBINED_AGENTS")
+    if configured is None:
+        return list(AGENTS)
+    names = [name.strip() for name in configured.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(AGENTS))
+    if unknown:
+        raise ValueError(f"Unknown agents in COMBINED_AGENTS: {', '.join(unknown)}")
+    return names
+
+
+COMBINED_AGENTS = get_combined_agents()
+AGENT_APPS: dict[str, FastAPI] = {
+    name: importlib.import_module(f"agents.{name}.main").app for name in COMBINED_AGENTS
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Run the lifespan of every mounted agent and call them in-process.
+
+    Mounted apps do not get lifespan events of their own. The agents share
+    the process-wide ontology snapshot and database engine, so the first
+    agent creates them and the others reuse them.
+    """
+    use_local_agents(COMBINED_AGENTS)
+    async with AsyncExitStack() as stack:
+        for agent_app in AGENT_APPS.values():
+            await stack.enter_async_context(agent_app.router.lifespan_context(agent_app))
+        yield
+
+
+app = FastAPI(
+    title="Combined Agents",
+    description="Every agent in one process, each mounted under /<agent>",
+    version="0.1.0",
+    lifespan=lifespan,
+)
+# Requests are measured by the mounted agents, labelled with their /<agent> prefix
+app.include_router(metrics_router)
+for _name, _agent_app in AGENT_APPS.items():
+    app.mount(f"/{_name}", _agent_app)
+
+
+@app.get("/", response_model=HealthResponse)
+async def root() -> HealthResponse:
+    """Root endpoint returning service health."""
+    return HealthResponse(
+        status="healthy",
+        service="combined-agents",
+        timestamp=datetime.utcnow(),
+    )
+
+
+@app.get("/health", response_model=HealthResponse)
+async def health() -> HealthResponse:
+    """Health check endpoint."""
+    return HealthResponse(
+        status="healthy",
+        service="combined-agents",
+        timestamp=datetime.utcnow(),
+    )
+
+
+@app.get("/metrics/agents")
+async def agent_metrics() -> dict:
+    """Mounted agents, the shared connection pool and calls between agents."""
+    return {"agents": COMBINED_AGENTS, "db": pool_metrics(), "calls": client_metrics()}
@@ -0,0 +1,234 @@
+"""Streaming validation of whole NDJSON releases."""
+
+import asyncio
+import json
+import os
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from agents.conformance.rules import NODE_REF, RELATIONSHIP_REF, get_validator
+from shared.ontology.release import is_relationship
+
+BULK_WORKERS = int(os.getenv("CONFORMANCE_BULK_WORKERS", str(os.cpu_count() or 1)))
+BULK_CHUNK_SIZE = int(os.getenv("CONFORMANCE_BULK_CHUNK_SIZE", "2000"))
+
+_executor: Executor | None = None
+
+
+@dataclass(slots=True)
+class RowResult:
+    """Outcome of validating one NDJSON row."""
+
+    line: int
+    kind: str = "unparsed"
+    node_id: str | None = None
+    references: tuple[str, str] | None = None
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+    def to_json(self) -> bytes:
+        """Serialize as an NDJSON output line."""
+        row = {
+            "line": self.line,
+            "valid": not self.errors,
+            "errors": self.errors,
+            "warnings": self.warnings,
+        }
+        if self.node_id is not None:
+            row["id"] = self.node_id
+        return json.dumps(row).encode() + b"\n"
+
+
+@dataclass(slots=True)
+class BulkSummary:
+    """Counts reported after the last row."""
+
+    rows: int = 0
+    nodes: int = 0
+    relationships: int = 0
+    invalid: int = 0
+    with_warnings: int = 0
+    unresolved_references: int = 0
+
+    def to_json(self) -> bytes:
+        """Serialize as the final NDJSON output line."""
+        summary = {
+            "rows": self.rows,
+            "nodes": self.nodes,
+            "relationships": self.relationships,
+            "invalid": self.invalid,
+            "with_warnings": self.with_warnings,
+            "unresolved_references": self.unresolved_references,
+            "valid": self.invalid == 0,
+        }
+        return json.dumps({"summary": summary}).encode() + b"\n"
+
+
+def validate_rows(rows: list[tuple[int, bytes]]) -> list[RowResult]:
+    """
+    Parse and validate a chunk of NDJSON rows.
+
+    Runs in pool workers, so it only depends on picklable arguments and the
+    per-process validator cache.
+
+    Args:
+        rows: Line numbers and raw lines
+
+    Returns:
+        One result per row, in order
+    """
+    validate_node = get_validator(NODE_REF)
+    validate_relationship = get_validator(RELATIONSHIP_REF)
+    results = []
+    for line, raw in rows:
+        result = RowResult(line)
+        try:
+            record = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            result.errors.append(f"invalid JSON: {exc.msg}")
+            results.append(result)
+            continue
+        if not isinstance(record, dict):
+            result.errors.append("value: expected object")
+        elif is_relationship(record):
+            result.kind = "relationship"
+            result.errors, result.warnings = validate_relationship(record)
+            source, target = record.get("source_id"), record.get("target_id")
+            if isinstance(source, str) and isinstance(target, str):
+                result.references = (source, target)
+        else:
+            result.kind = "node"
+            result.errors, result.warnings = validate_node(record)
+            if isinstance(record.get("id"), str):
+                result.node_id = record["id"]
+        results.append(result)
+    return results
+
+
+def get_executor() -> Executor:
+    """
+    Get the pool running CPU-bound validation.
+
+    A process pool of ``CONFORMANCE_BULK_WORKERS`` workers; a single worker
+    thread when that is 1.
+    """
+    global _executor
+    if _executor is None:
+        if BULK_WORKERS > 1:
+            _executor = ProcessPoolExecutor(BULK_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(1, thread_name_prefix="conformance")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the validation pool, if started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def _chunks(
+    lines: AsyncIterable[tuple[int, bytes]], size: int
+) -> AsyncIterator[list[tuple[int, bytes]]]:
+    chunk: list[tuple[int, bytes]] = []
+    async for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_validation(
+    lines: AsyncIterable[tuple[int, bytes]],
+    executor: Executor,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    max_pending: int = BULK_WORKERS * 2,
+) -> AsyncIterator[bytes]:
+    """
+    Validate a release row by row, yielding only rows with findings.
+
+    Rows are validated in chunks on ``executor``, with at most
+    ``max_pending`` chunks in flight, so memory does not grow with the input
+    apart from the set of node ids. Relationship endpoints are checked
+    against that set; relationships whose endpoints have not been seen yet
+    are held back and resolved, or reported, after the last row. Node ids
+    seen twice are errors.
+
+    Args:
+        lines: Line numbers and raw NDJSON lines
+        executor: Pool running ``validate_rows``
+        chunk_size: Rows per pool task
+        max_pending: Maximum chunks in flight
+
+    Yields:
+        One NDJSON line per row with errors or warnings, in input order for
+        rows decided immediately, then the held-back relationships, then a
+        summary line
+    """
+    loop = asyncio.get_running_loop()
+    summary = BulkSummary()
+    node_ids: set[str] = set()
+    deferred: list[RowResult] = []
+    pending: deque[asyncio.Future[list[RowResult]]] = deque()
+
+    def settle(result: RowResult) -> bytes | None:
+        if result.errors:
+            summary.invalid += 1
+        if result.warnings:
+            summary.with_warnings += 1
+        return result.to_json() if result.errors or result.warnings else None
+
+    def collect(results: list[RowResult]) -> list[bytes]:
+        output = []
+        for result in results:
+            summary.rows += 1
+            if result.kind == "relationship":
+                summary.relationships += 1
+            elif result.kind == "node":
+                summary.nodes += 1
+
+            if result.references is not None:
+                source, target = result.references
+                if source not in node_ids or target not in node_ids:
+                    deferred.append(result)
+                    continue
+            elif result.node_id is not None:
+                if result.node_id in node_ids:
+                    result.errors.append(f"id: duplicate node id {result.node_id}")
+                else:
+                    node_ids.add(result.node_id)
+            line = settle(result)
+            if line is not None:
+                output.append(line)
+        return output
+
+    try:
+        async for chunk in _chunks(lines, chunk_size):
+            pending.append(loop.run_in_executor(executor, validate_rows, chunk))
+            while pending and (len(pending) > max_pending or pending[0].done()):
+                for line in collect(await pending.popleft()):
+                    yield line
+        while pending:
+            for line in collect(await pending.popleft()):
+                yield line
+    finally:
+        for future in pending:
+            future.cancel()
+
+    for result in deferred:
+        assert result.references is not None
+        for name, node_id in zip(("source_id", "target_id"), result.references, strict=True):
+            if node_id not in node_ids:
+                result.errors.append(f"{name}: unknown node {node_id}")
+                summary.unresolved_references += 1
+        finding = settle(result)
+        if finding is not None:
+            yield finding
+
+    yield summary.to_json()
@@ -1,17 +1,40 @@
 """Conformance Agent - Validates data against ontology constraints."""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, Field
 
+from agents.conformance.bulk import get_executor, shutdown_executor, stream_validation
+from agents.conformance.rules import UnknownSchemaError, get_validator
 from shared.schemas.base import HealthResponse
+from shared.utils.database import engine_lifespan, pool_metrics
+from shared.utils.logging import RequestIdMiddleware, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router, span
+from shared.utils.streaming import DuplexStreamingResponse, iter_lines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own the shared database pool and the validation pool for the lifetime of the app."""
+    async with logging_lifespan(), engine_lifespan():
+        try:
+            yield
+        finally:
+            shutdown_executor()
+
 
 app = FastAPI(
     title="Conformance Agent",
     description="Validates data against ontology constraints and rules",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 
 class ValidationRequest(BaseModel):
@@ -49,20 +72,54 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
 @app.post("/api/v1/validate", response_model=ValidationResponse)
 async def validate_data(request: ValidationRequest) -> ValidationResponse:
     """
     Validate data against ontology schema.
 
+    ``schema_ref`` names a definition such as
+    ``ontology_v1#/definitions/OntologyNode`` (or just ``OntologyNode``), or a
+    whole schema such as ``ontology_v1``. The validator is compiled once per
+    definition and reused; schema names with path separators are rejected.
+
     Args:
         request: Validation request with data and schema reference
 
     Returns:
         Validation results
     """
-    # Stub implementation - will validate against ontology rules
-    return ValidationResponse(
-        valid=True,
-        errors=[],
-        warnings=[],
+    try:
+        validator = get_validator(request.schema_ref)
+    except UnknownSchemaError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    with span("conformance.validate"):
+        errors, warnings = validator(request.data)
+    return ValidationResponse(valid=not errors, errors=errors, warnings=warnings)
+
+
+@app.post("/api/v1/validate/bulk")
+async def validate_bulk(request: Request) -> DuplexStreamingResponse:
+    """
+    Validate a whole NDJSON release as it streams in.
+
+    Every line is a node or a relationship (a record with
+    ``relationship_type``). Rows are validated on a process pool and only
+    rows with errors or warnings are streamed back, followed by a summary
+    line. Relationship endpoints must reference node ids in the release.
+
+    Args:
+        request: Raw HTTP request carrying the NDJSON body
+
+    Returns:
+        NDJSON stream of findings and the summary
+    """
+    return DuplexStreamingResponse(
+        stream_validation(iter_lines(request.stream()), get_executor()),
+        media_type="application/x-ndjson",
     )
@@ -0,0 +1,376 @@
+"""Validators compiled from the ontology schema and attribute dictionary."""
+
+import json
+import operator
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from shared.ontology.release import DATA_DIR
+from shared.utils.cache import LRUCache
+
+RELEASES_DIR = DATA_DIR / "releases"
+DEFAULT_SCHEMA = "ontology_v1"
+ATTRIBUTE_DICTIONARY = "attribute_dictionary.json"
+NODE_REF = f"{DEFAULT_SCHEMA}#/definitions/OntologyNode"
+RELATIONSHIP_REF = f"{DEFAULT_SCHEMA}#/definitions/Relationship"
+
+# Schema file names: no path separators, so a reference cannot leave RELEASES_DIR
+_SCHEMA_NAME = re.compile(r"[A-Za-z0-9_-]+")
+# Compiled validators kept; each (schema, definition) pair is compiled once
+VALIDATOR_CACHE_SIZE = 64
+
+# A check appends messages for ``value`` found at ``path`` to ``errors``
+Check = Callable[[Any, str, list[str]], None]
+
+
+class UnknownSchemaError(LookupError):
+    """Raised when a schema reference does not resolve."""
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledValidator:
+    """A schema compiled into a single callable."""
+
+    schema_ref: str
+    version: str
+    check: Callable[[Any], tuple[list[str], list[str]]]
+
+    def __call__(self, data: Any) -> tuple[list[str], list[str]]:
+        """Validate data, returning (errors, warnings)."""
+        return self.check(data)
+
+
+_TYPES: dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, int | float) and not isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+    "null": lambda value: value is None,
+}
+
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def _label(path: str) -> str:
+    return path or "value"
+
+
+def compile_schema(schema: dict, definitions: dict) -> Check:
+    """
+    Compile a JSON Schema fragment into a flat check function.
+
+    Supports the subset used by the ontology releases: ``type``, ``enum``,
+    ``pattern``, numeric bounds, ``required``, ``properties``,
+    ``additionalProperties: false``, ``items`` and local ``$ref``. Every
+    keyword becomes one small closure decided at compile time, so checking a
+    value never looks at the schema again.
+
+    Args:
+        schema: Schema fragment
+        definitions: ``definitions`` of the enclosing document, for ``$ref``
+
+    Returns:
+        Check function
+    """
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        if name not in definitions:
+            raise UnknownSchemaError(f"Unresolved $ref: {schema['$ref']}")
+        return compile_schema(definitions[name], definitions)
+
+    checks: list[Check] = []
+
+    type_name = schema.get("type")
+    if type_name is not None:
+        is_type = _TYPES[type_name]
+
+        def check_type(value: Any, path: str, errors: list[str]) -> None:
+            if not is_type(value):
+                errors.append(f"{_label(path)}: expected {type_name}")
+
+        checks.append(check_type)
+    else:
+        is_type = None
+
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+        listed = ", ".join(map(str, schema["enum"]))
+
+        def check_enum(value: Any, path: str, errors: list[str]) -> None:
+            if isinstance(value, str | int | float | bool) and value not in allowed:
+                errors.append(f"{_label(path)}: {value!r} is not one of {listed}")
+
+        checks.append(check_enum)
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value: Any, path: str, errors: list[str]) -> None:
+            if isinstance(value, str) and pattern.search(value) is None:
+                errors.append(f"{_label(path)}: does not match {pattern.pattern}")
+
+        checks.append(check_pattern)
+
+    for keyword, test, relation in (
+        ("minimum", operator.ge, ">="),
+        ("maximum", operator.le, "<="),
+        ("exclusiveMinimum", operator.gt, ">"),
+        ("exclusiveMaximum", operator.lt, "<"),
+    ):
+        if keyword in schema:
+            checks.append(partial(_check_bound, float(schema[keyword]), test, relation))
+
+    if "required" in schema:
+        required = tuple(schema["required"])
+
+        def check_required(value: Any, path: str, errors: list[str]) -> None:
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        errors.append(f"{_join(path, key)}: is required")
+
+        checks.append(check_required)
+
+    if "properties" in schema:
+        properties = tuple(
+            (key, compile_schema(fragment, definitions))
+            for key, fragment in schema["properties"].items()
+        )
+
+        def check_properties(value: Any, path: str, errors: list[str]) -> None:
+            if isinstance(value, dict):
+                for key, check in properties:
+                    if key in value:
+                        check(value[key], _join(path, key), errors)
+
+        checks.append(check_properties)
+
+        if schema.get("additionalProperties") is False:
+            known = frozenset(schema["properties"])
+
+            def check_additional(value: Any, path: str, errors: list[str]) -> None:
+                if isinstance(value, dict):
+                    for key in value.keys() - known:
+                        errors.append(f"{_join(path, key)}: is not allowed")
+
+            checks.append(check_additional)
+
+    if "items" in schema:
+        check_item = compile_schema(schema["items"], definitions)
+
+        def check_items(value: Any, path: str, errors: list[str]) -> None:
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    check_item(item, f"{_label(path)}[{index}]", errors)
+
+        checks.append(check_items)
+
+    if len(checks) == 1:
+        return checks[0]
+    if is_type is not None and len(checks) > 1:
+        # A type mismatch makes every other keyword meaningless; stop there
+        first, rest = checks[0], tuple(checks[1:])
+
+        def check_typed(value: Any, path: str, errors: list[str]) -> None:
+            if not is_type(value):
+                first(value, path, errors)
+                return
+            for check in rest:
+                check(value, path, errors)
+
+        return check_typed
+
+    all_checks = tuple(checks)
+
+    def check_all(value: Any, path: str, errors: list[str]) -> None:
+        for check in all_checks:
+            check(value, path, errors)
+
+    return check_all
+
+
+def _check_bound(
+    bound: float,
+    test: Callable[[float, float], bool],
+    relation: str,
+    value: Any,
+    path: str,
+    errors: list[str],
+) -> None:
+    # Compared without float(): ints beyond float range would overflow it,
+    # and Python compares ints and floats exactly
+    if isinstance(value, int | float) and not isinstance(value, bool):
+        if not test(value, bound):
+            errors.append(f"{_label(path)}: must be {relation} {bound:g}")
+
+
+def compile_attribute_rules(dictionary: dict) -> dict[str, tuple[Check, frozenset[str]]]:
+    """
+    Compile the attribute dictionary into per-category attribute checks.
+
+    Args:
+        dictionary: Parsed ``attribute_dictionary.json``
+
+    Returns:
+        Per category, a check for the ``attributes`` object and the set of
+        attribute names it defines
+    """
+    rules = {}
+    for category, spec in dictionary["categories"].items():
+        attributes = spec["attributes"]
+        schema = {"type": "object", "properties": attributes}
+        rules[category] = (compile_schema(schema, {}), frozenset(attributes))
+    return rules
+
+
+def _node_validator(
+    check_node: Check,
+    attribute_rules: dict[str, tuple[Check, frozenset[str]]],
+) -> Callable[[Any], tuple[list[str], list[str]]]:
+    def validate_node(data: Any) -> tuple[list[str], list[str]]:
+        errors: list[str] = []
+        warnings: list[str] = []
+        check_node(data, "", errors)
+        if errors or not isinstance(data, dict):
+            return errors, warnings
+
+        rule = attribute_rules.get(data["category"])
+        attributes = data.get("attributes")
+        if rule is None or not isinstance(attributes, dict):
+            return errors, warnings
+        check_attributes, known = rule
+        check_attributes(attributes, "attributes", errors)
+        for key in attributes.keys() - known:
+            warnings.append(f"attributes.{key}: not in the {data['category']} dictionary")
+        return errors, warnings
+
+    return validate_node
+
+
+def _plain_validator(check: Check) -> Callable[[Any], tuple[list[str], list[str]]]:
+    def validate(data: Any) -> tuple[list[str], list[str]]:
+        errors: list[str] = []
+        check(data, "", errors)
+        return errors, []
+
+    return validate
+
+
+def _load_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())  # type: ignore[no-any-return]
+    except FileNotFoundError as exc:
+        raise UnknownSchemaError(f"Unknown schema: {path.name}") from exc
+
+
+def parse_schema_ref(schema_ref: str) -> tuple[str, str | None]:
+    """
+    Split a schema reference into schema name and definition.
+
+    ``ontology_v1#/definitions/OntologyNode`` names a definition of
+    ``data/releases/ontology_v1.schema.json``; a bare ``OntologyNode`` refers
+    to the default schema, and ``ontology_v1`` to the whole release document.
+
+    Equivalent spellings reduce to the same pair, which is what validators
+    are cached under.
+
+    Args:
+        schema_ref: Schema reference
+
+    Returns:
+        Schema name and definition name (None for the whole document)
+
+    Raises:
+        UnknownSchemaError: If the schema name contains anything but
+            letters, digits, "_" and "-"
+    """
+    if "#" in schema_ref:
+        name, _, pointer = schema_ref.partition("#")
+        name = name or DEFAULT_SCHEMA
+        if _SCHEMA_NAME.fullmatch(name) is None:
+            raise UnknownSchemaError(f"Invalid schema name: {name!r}")
+        return name, pointer.rsplit("/", 1)[-1] or None
+    if _SCHEMA_NAME.fullmatch(schema_ref) and (RELEASES_DIR / f"{schema_ref}.schema.json").exists():
+        return schema_ref, None
+    return DEFAULT_SCHEMA, schema_ref
+
+
+def compile_validator(name: str, definition: str | None) -> CompiledValidator:
+    """
+    Compile the validator for a schema definition.
+
+    ``OntologyNode`` validators also apply the attribute dictionary of the
+    node's category: typed, enumerated and bounded attributes are errors,
+    attributes missing from the dictionary are warnings.
+
+    Args:
+        name: Schema name, as returned by ``parse_schema_ref``
+        definition: Definition name, None for the whole document
+
+    Returns:
+        Compiled validator
+
+    Raises:
+        UnknownSchemaError: If the schema or definition does not exist
+    """
+    schema_ref = name if definition is None else f"{name}#/definitions/{definition}"
+    document = _load_json(RELEASES_DIR / f"{name}.schema.json")
+    definitions = document.get("definitions", {})
+    version = document.get("$id", name).rsplit("/", 1)[-1]
+
+    if definition is None:
+        return CompiledValidator(
+            schema_ref, version, _plain_validator(compile_schema(document, definitions))
+        )
+    if definition not in definitions:
+        raise UnknownSchemaError(f"Unknown definition {definition!r} in {name}")
+
+    check = compile_schema(definitions[definition], definitions)
+    if definition == "OntologyNode":
+        dictionary = _load_json(RELEASES_DIR / ATTRIBUTE_DICTIONARY)
+        rules = compile_attribute_rules(dictionary)
+        return CompiledValidator(schema_ref, version, _node_validator(check, rules))
+    return CompiledValidator(schema_ref, version, _plain_validator(check))
+
+
+_validators: LRUCache[CompiledValidator] = LRUCache(VALIDATOR_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+def get_validator(schema_ref: str) -> CompiledValidator:
+    """
+    Get the compiled validator for a schema reference, compiling it once.
+
+    Validators are cached under the (schema, definition) pair the reference
+    reduces to, so spellings of the same definition share one entry, and
+    the cache holds at most ``VALIDATOR_CACHE_SIZE`` of them. Schema names
+    name a versioned schema file, so the cache is effectively per schema
+    version.
+
+    Args:
+        schema_ref: Schema reference
+
+    Returns:
+        Cached compiled validator
+
+    Raises:
+        UnknownSchemaError: If the reference does not resolve
+    """
+    key = parse_schema_ref(schema_ref)
+    validator = _validators.get(key)
+    if validator is None:
+        with _lock:
+            validator = _validators.get(key)
+            if validator is None:
+                validator = compile_validator(*key)
+                _validators.put(key, validator)
+    return validator
@@ -0,0 +1,176 @@
+"""Unit-normalized inventory totals rolled up the ontology hierarchy."""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from shared.ontology.graph import get_graph
+from shared.ontology.snapshot import OntologySnapshot
+from shared.ontology.units import (
+    IncompatibleUnitsError,
+    MissingItemDataError,
+    UnitTable,
+    UnknownUnitError,
+    item_factor,
+)
+
+GroupBy = Literal["location", "ontology_node_id", "child", "none"]
+
+
+@dataclass(frozen=True, slots=True)
+class BaseQuantity:
+    """A quantity expressed in the base unit of its dimension."""
+
+    quantity: float
+    unit: str
+    dimension: str
+
+
+class BaseUnitNormalizer:
+    """
+    Converts quantities to the base unit of their dimension.
+
+    Unit codes repeat heavily within an upload, so each distinct code is
+    resolved once.
+    """
+
+    def __init__(self, table: UnitTable) -> None:
+        self._table = table
+        self._resolved: dict[str, tuple[float, str, str] | None] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "BaseUnitNormalizer":
+        """Build a normalizer over the unit table of a snapshot."""
+        return cls(snapshot.derived("unit_table", UnitTable.from_snapshot))
+
+    def normalize(self, quantity: float, unit: str) -> BaseQuantity | None:
+        """
+        Convert a quantity to its dimension's base unit.
+
+        Args:
+            quantity: Quantity in ``unit``
+            unit: Unit code such as "kg" or "unit_001"
+
+        Returns:
+            Base-unit quantity, or None when the unit is unknown
+        """
+        try:
+            resolved = self._resolved[unit]
+        except KeyError:
+            resolved = self._resolved[unit] = self._resolve(unit)
+        if resolved is None:
+            return None
+        factor, base_unit, dimension = resolved
+        return BaseQuantity(quantity * factor, base_unit, dimension)
+
+    def _resolve(self, unit: str) -> tuple[float, str, str] | None:
+        try:
+            source = self._table.resolve(unit)
+        except UnknownUnitError:
+            return None
+        base = self._table.base_unit(source.dimension)
+        return self._table.factor(source.id, base.id), base.id, source.dimension
+
+
+@dataclass(slots=True)
+class Rollup:
+    """Totals of a subtree in one target unit."""
+
+    total: float = 0.0
+    items: int = 0
+    groups: dict[str | None, tuple[float, int]] = field(default_factory=dict)
+    unconverted: list[dict[str, Any]] = field(default_factory=list)
+
+    def add(self, key: str | None, quantity: float, items: int) -> None:
+        """Add a converted quantity to the total and its group."""
+        self.total += quantity
+        self.items += items
+        group_quantity, group_items = self.groups.get(key, (0.0, 0))
+        self.groups[key] = (group_quantity + quantity, group_items + items)
+
+
+def subtree(snapshot: OntologySnapshot, node_id: str) -> list[str]:
+    """
+    Get a node and every node under it in the ``is_a`` hierarchy.
+
+    Raises:
+        KeyError: If the node does not exist
+    """
+    return [node_id, *get_graph(snapshot).descendants(node_id)]
+
+
+def _child_of(snapshot: OntologySnapshot, root_id: str) -> dict[str, str]:
+    """Map each node under ``root_id`` to the direct child of the root it falls under."""
+    graph = get_graph(snapshot)
+    root = snapshot.position(root_id)
+    if root is None:
+        raise KeyError(root_id)
+    children = {snapshot.nodes[position].id for position in graph.graph("is_a").children(root)}
+    return {
+        node_id: next(
+            (ancestor for ancestor in (node_id, *graph.ancestors(node_id)) if ancestor in children),
+            node_id,
+        )
+        for node_id in graph.descendants(root_id)
+    }
+
+
+def roll_up(
+    rows: Iterable[dict[str, Any]],
+    snapshot: OntologySnapshot,
+    table: UnitTable,
+    node_id: str,
+    unit: str,
+    group_by: GroupBy = "location",
+) -> Rollup:
+    """
+    Convert grouped base-unit sums to one unit and total them.
+
+    Rows arrive already summed per node and base unit, so each conversion
+    is applied once per group rather than once per item. Conversions across
+    dimensions (litres of milk to kilograms) use the item's density or unit
+    weight; groups that cannot be converted are reported, not dropped.
+
+    Args:
+        rows: Output of ``aggregate_items``
+        snapshot: Ontology snapshot
+        table: Unit table
+        node_id: Root of the subtree being aggregated
+        unit: Target unit code
+        group_by: Break the total down by location, by node, by child of
+            the root, or "none" for a single group
+
+    Returns:
+        Total, per-group quantities and the groups left unconverted
+
+    Raises:
+        UnknownUnitError: If the target unit is unknown
+    """
+    table.resolve(unit)
+    owner = _child_of(snapshot, node_id) if group_by == "child" else {}
+    factors: dict[tuple[str, str], float | str] = {}
+    rollup = Rollup()
+    for row in rows:
+        item_id, row_unit = row["ontology_node_id"], row["unit"]
+        factor = factors.get((item_id, row_unit))
+        if factor is None:
+            try:
+                factor = item_factor(table, snapshot.get(item_id), row_unit, unit)
+            except (UnknownUnitError, IncompatibleUnitsError, MissingItemDataError) as exc:
+                factor = str(exc)
+            factors[(item_id, row_unit)] = factor
+        if isinstance(factor, str):
+            rollup.unconverted.append({**row, "reason": factor})
+            continue
+
+        key: str | None
+        if group_by == "location":
+            key = row["location"]
+        elif group_by == "ontology_node_id":
+            key = item_id
+        elif group_by == "child":
+            key = owner.get(item_id, item_id)
+        else:
+            key = None
+        rollup.add(key, float(row["quantity"]) * factor, int(row["items"]))
+    return rollup
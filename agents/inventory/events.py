@@ -0,0 +1,332 @@
+"""Append-only inventory event log with incrementally maintained totals."""
+
+import asyncio
+import logging
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from shared.utils.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("receive", "consume", "adjust", "transfer")
+
+# Event writers hold this advisory lock shared and snapshots hold it
+# exclusively, so a snapshot never misses an event committed with a lower seq
+SNAPSHOT_LOCK_KEY = 0x1A7E_5E9
+
+
+def get_snapshot_interval() -> float:
+    """Seconds between total snapshots, from ``INVENTORY_SNAPSHOT_INTERVAL`` (0 disables)."""
+    return float(os.getenv("INVENTORY_SNAPSHOT_INTERVAL", "300"))
+
+
+def get_snapshot_retention() -> float:
+    """Seconds snapshots are kept, from ``INVENTORY_SNAPSHOT_RETENTION`` (0 keeps all)."""
+    return float(os.getenv("INVENTORY_SNAPSHOT_RETENTION", "604800"))
+
+
+@dataclass(frozen=True, slots=True)
+class EventRecord:
+    """An inventory change with its quantity normalized to a base unit."""
+
+    event_type: str
+    ontology_node_id: str
+    location: str
+    to_location: str | None
+    quantity: float
+    unit: str
+    base_quantity: float
+    base_unit: str
+    dimension: str
+    reference: str | None = None
+
+    def deltas(self) -> list[tuple[str, str, str, str, float]]:
+        """
+        Changes this event makes to running totals.
+
+        Returns:
+            (node, location, dimension, base unit, signed base quantity) per
+            affected total; transfers move stock between two locations
+        """
+        key = (self.ontology_node_id, self.location, self.dimension, self.base_unit)
+        if self.event_type == "consume":
+            return [(*key, -self.base_quantity)]
+        if self.event_type == "transfer":
+            assert self.to_location is not None
+            target = (self.ontology_node_id, self.to_location, self.dimension, self.base_unit)
+            return [(*key, -self.base_quantity), (*target, self.base_quantity)]
+        return [(*key, self.base_quantity)]
+
+
+def merge_deltas(events: Sequence[EventRecord]) -> list[tuple[str, str, str, str, float]]:
+    """
+    Sum the deltas of many events per total.
+
+    Returns:
+        One delta per (node, location, dimension, base unit), sorted so that
+        concurrent writers lock total rows in the same order
+    """
+    merged: dict[tuple[str, str, str, str], float] = {}
+    for event in events:
+        for node_id, location, dimension, base_unit, delta in event.deltas():
+            key = (node_id, location, dimension, base_unit)
+            merged[key] = merged.get(key, 0.0) + delta
+    return [(*key, merged[key]) for key in sorted(merged)]
+
+
+_LOCK_SHARED = text("SELECT pg_advisory_xact_lock_shared(:key)")
+_LOCK_EXCLUSIVE = text("SELECT pg_advisory_xact_lock(:key)")
+
+_INSERT_EVENTS = text("""
+    INSERT INTO inventory.events
+        (event_type, ontology_node_id, location, to_location, quantity, unit,
+         base_quantity, base_unit, dimension, reference)
+    SELECT event_type, ontology_node_id, location, to_location, quantity, unit,
+           base_quantity, base_unit, dimension, reference
+    FROM unnest(
+        CAST(:event_types AS text[]), CAST(:node_ids AS text[]),
+        CAST(:locations AS text[]), CAST(:to_locations AS text[]),
+        CAST(:quantities AS float8[]), CAST(:units AS text[]),
+        CAST(:base_quantities AS float8[]), CAST(:base_units AS text[]),
+        CAST(:dimensions AS text[]), CAST(:references AS text[])
+    ) WITH ORDINALITY AS batch(
+        event_type, ontology_node_id, location, to_location, quantity, unit,
+        base_quantity, base_unit, dimension, reference, position
+    )
+    ORDER BY position
+    RETURNING seq, occurred_at
+    """)
+
+_APPLY_DELTAS = text("""
+    INSERT INTO inventory.totals
+        (ontology_node_id, location, dimension, base_unit, quantity, last_seq)
+    SELECT ontology_node_id, location, dimension, base_unit, delta, :last_seq
+    FROM unnest(
+        CAST(:node_ids AS text[]), CAST(:locations AS text[]),
+        CAST(:dimensions AS text[]), CAST(:base_units AS text[]),
+        CAST(:deltas AS float8[])
+    ) AS batch(ontology_node_id, location, dimension, base_unit, delta)
+    ON CONFLICT (ontology_node_id, location, dimension) DO UPDATE SET
+        quantity = inventory.totals.quantity + EXCLUDED.quantity,
+        last_seq = GREATEST(inventory.totals.last_seq, EXCLUDED.last_seq)
+    """)
+
+
+async def record_events(
+    connection: AsyncConnection, events: Sequence[EventRecord]
+) -> list[tuple[int, datetime]]:
+    """
+    Append events to the log and apply them to the running totals.
+
+    Both happen in the caller's transaction, so totals always equal the sum
+    of committed events.
+
+    Args:
+        connection: Database connection inside a transaction
+        events: Events in the order they happened
+
+    Returns:
+        Sequence number and timestamp of each event, in input order
+    """
+    if not events:
+        return []
+    await connection.execute(_LOCK_SHARED, {"key": SNAPSHOT_LOCK_KEY})
+    result = await connection.execute(
+        _INSERT_EVENTS,
+        {
+            "event_types": [event.event_type for event in events],
+            "node_ids": [event.ontology_node_id for event in events],
+            "locations": [event.location for event in events],
+            "to_locations": [event.to_location for event in events],
+            "quantities": [event.quantity for event in events],
+            "units": [event.unit for event in events],
+            "base_quantities": [event.base_quantity for event in events],
+            "base_units": [event.base_unit for event in events],
+            "dimensions": [event.dimension for event in events],
+            "references": [event.reference for event in events],
+        },
+    )
+    # Sequence numbers are drawn in insertion order
+    recorded = sorted((int(row.seq), row.occurred_at) for row in result)
+
+    deltas = merge_deltas(events)
+    await connection.execute(
+        _APPLY_DELTAS,
+        {
+            "node_ids": [delta[0] for delta in deltas],
+            "locations": [delta[1] for delta in deltas],
+            "dimensions": [delta[2] for delta in deltas],
+            "base_units": [delta[3] for delta in deltas],
+            "deltas": [delta[4] for delta in deltas],
+            "last_seq": recorded[-1][0],
+        },
+    )
+    return recorded
+
+
+_LAST_SEQ = text("SELECT COALESCE(MAX(seq), 0) AS seq FROM inventory.events")
+
+# Stamped after the lock is held, so every included event happened before it
+_INSERT_SNAPSHOT = text("""
+    INSERT INTO inventory.snapshots (seq, taken_at) VALUES (:seq, clock_timestamp())
+    ON CONFLICT (seq) DO NOTHING
+    RETURNING taken_at
+    """)
+
+_COPY_TOTALS = text("""
+    INSERT INTO inventory.snapshot_totals
+        (seq, ontology_node_id, location, dimension, base_unit, quantity)
+    SELECT :seq, ontology_node_id, location, dimension, base_unit, quantity
+    FROM inventory.totals
+    """)
+
+
+async def take_snapshot(connection: AsyncConnection) -> int | None:
+    """
+    Copy the running totals into a point-in-time snapshot.
+
+    Waits for in-flight event writes to commit and holds new ones back
+    while the totals are copied.
+
+    Args:
+        connection: Database connection inside a transaction
+
+    Returns:
+        Last event included, or None if no event happened since the last snapshot
+    """
+    await connection.execute(_LOCK_EXCLUSIVE, {"key": SNAPSHOT_LOCK_KEY})
+    seq = int((await connection.execute(_LAST_SEQ)).scalar_one())
+    if (await connection.execute(_INSERT_SNAPSHOT, {"seq": seq})).first() is None:
+        return None
+    await connection.execute(_COPY_TOTALS, {"seq": seq})
+    return seq
+
+
+# Keeps the newest snapshot taken before the cutoff as the base for queries
+# just after it; their totals go with them (ON DELETE CASCADE)
+_PRUNE_SNAPSHOTS = text("""
+    DELETE FROM inventory.snapshots
+    WHERE seq < (
+        SELECT MAX(seq) FROM inventory.snapshots
+        WHERE taken_at <= clock_timestamp() - make_interval(secs => :retention)
+    )
+    """)
+
+
+async def prune_snapshots(connection: AsyncConnection, retention: float) -> int:
+    """
+    Delete snapshots no longer needed to answer queries within the retention.
+
+    Queries further back than the oldest snapshot left stay correct, they
+    replay the event log from the start.
+
+    Args:
+        connection: Database connection inside a transaction
+        retention: Seconds of history served from snapshots
+
+    Returns:
+        Number of snapshots deleted
+    """
+    result = await connection.execute(_PRUNE_SNAPSHOTS, {"retention": retention})
+    return int(result.rowcount)
+
+
+_CURRENT_TOTALS = text("""
+    SELECT location, ontology_node_id, dimension, base_unit AS unit,
+           quantity, 1 AS items
+    FROM inventory.totals
+    WHERE ontology_node_id = ANY(:node_ids)
+      AND (CAST(:location AS text) IS NULL OR location = :location)
+    """)
+
+# Latest snapshot at or before :as_of, plus the events after it up to :as_of
+_TOTALS_AS_OF = text("""
+    WITH base AS (
+        SELECT COALESCE(MAX(seq), 0) AS seq FROM inventory.snapshots WHERE taken_at <= :as_of
+    ),
+    tail AS (
+        SELECT * FROM inventory.events
+        WHERE seq > (SELECT seq FROM base) AND occurred_at <= :as_of
+          AND ontology_node_id = ANY(:node_ids)
+    ),
+    deltas AS (
+        SELECT ontology_node_id, location, dimension, base_unit, quantity
+        FROM inventory.snapshot_totals
+        WHERE seq = (SELECT seq FROM base) AND ontology_node_id = ANY(:node_ids)
+        UNION ALL
+        SELECT ontology_node_id, location, dimension, base_unit,
+               CASE WHEN event_type IN ('consume', 'transfer')
+                    THEN -base_quantity ELSE base_quantity END
+        FROM tail
+        UNION ALL
+        SELECT ontology_node_id, to_location, dimension, base_unit, base_quantity
+        FROM tail WHERE event_type = 'transfer'
+    )
+    SELECT location, ontology_node_id, dimension, base_unit AS unit,
+           SUM(quantity) AS quantity, 1 AS items
+    FROM deltas
+    WHERE CAST(:location AS text) IS NULL OR location = :location
+    GROUP BY location, ontology_node_id, dimension, base_unit
+    """)
+
+
+async def fetch_totals(
+    connection: AsyncConnection,
+    node_ids: Sequence[str],
+    location: str | None = None,
+    as_of: datetime | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Get running totals, now or at a point in time.
+
+    Current totals are read directly. Past totals start from the latest
+    snapshot taken at or before ``as_of`` and replay only the events after
+    it, so the work is bounded by the snapshot interval.
+
+    Args:
+        connection: Database connection
+        node_ids: Ontology nodes to include
+        location: Only totals at this location
+        as_of: Point in time, or None for now
+
+    Returns:
+        One row per location, node and dimension, in the shape of
+        ``aggregate_items`` rows
+    """
+    params: dict[str, Any] = {"node_ids": list(node_ids), "location": location}
+    if as_of is None:
+        result = await connection.execute(_CURRENT_TOTALS, params)
+    else:
+        result = await connection.execute(_TOTALS_AS_OF, {**params, "as_of": as_of})
+    return [dict(row._mapping) for row in result]
+
+
+async def run_snapshots(interval: float, retention: float = 0) -> None:
+    """
+    Take a snapshot every ``interval`` seconds until cancelled.
+
+    Args:
+        interval: Seconds between snapshots
+        retention: Seconds snapshots are kept, 0 to keep them all
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with get_engine().begin() as connection:
+                seq = await take_snapshot(connection)
+                pruned = await prune_snapshots(connection, retention) if retention > 0 else 0
+        except SQLAlchemyError as exc:
+            logger.warning("Inventory snapshot failed: %s", exc)
+            continue
+        if seq is not None:
+            logger.info("Inventory totals snapshot at event %d", seq)
+        if pruned:
+            logger.info("Pruned %d inventory snapshots older than %.0fs", pruned, retention)
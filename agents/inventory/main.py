@@ -1,17 +1,82 @@
 """Inventory Agent - Manages stock and inventory operations."""
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
+from typing import Any, Literal
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from agents.inventory.aggregation import BaseUnitNormalizer, GroupBy, roll_up, subtree
+from agents.inventory.events import (
+    EventRecord,
+    fetch_totals,
+    get_snapshot_interval,
+    get_snapshot_retention,
+    record_events,
+    run_snapshots,
+    take_snapshot,
+)
+from agents.inventory.store import (
+    DuplicateItemError,
+    InvalidCursorError,
+    ItemRecord,
+    aggregate_items,
+    bulk_upsert,
+    chunked,
+    fetch_item,
+    insert_item,
+    list_items,
+)
+from shared.ontology.reload import release_router
+from shared.ontology.snapshot import OntologySnapshot, get_snapshot_store
+from shared.ontology.units import UnitTable, UnknownUnitError
 from shared.schemas.base import HealthResponse
+from shared.utils.database import engine_lifespan, get_db_session, pool_metrics
+from shared.utils.http import DeadlineMiddleware
+from shared.utils.logging import RequestIdMiddleware, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router, span
+from shared.utils.streaming import iter_lines
+
+MAX_PAGE_SIZE = 1000
+MAX_BULK_ERRORS = 100
+
+
+def get_normalizer(snapshot: OntologySnapshot) -> BaseUnitNormalizer:
+    """Get the base-unit normalizer of a snapshot."""
+    return snapshot.derived("inventory_base_units", BaseUnitNormalizer.from_snapshot)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own the shared database pool and snapshot the running totals periodically."""
+    async with logging_lifespan(), engine_lifespan():
+        interval = get_snapshot_interval()
+        retention = get_snapshot_retention()
+        task = asyncio.create_task(run_snapshots(interval, retention)) if interval > 0 else None
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
 
 app = FastAPI(
     title="Inventory Agent",
     description="Manages stock and inventory operations",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.include_router(release_router)
+app.add_middleware(DeadlineMiddleware)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 
 class InventoryItem(BaseModel):
@@ -24,6 +89,111 @@ class InventoryItem(BaseModel):
     location: str | None = Field(None, description="Storage location")
 
 
+class InventoryEvent(BaseModel):
+    """A change to the stock of an ontology node at a location."""
+
+    event_type: Literal["receive", "consume", "adjust", "transfer"] = Field(
+        ..., description="Kind of change"
+    )
+    ontology_node_id: str = Field(..., description="Reference to ontology node")
+    quantity: float = Field(..., description="Quantity; signed for adjustments, positive otherwise")
+    unit: str = Field(..., description="Unit of measure")
+    location: str = Field(..., description="Location of the stock, or its source for transfers")
+    to_location: str | None = Field(None, description="Destination of a transfer")
+    reference: str | None = Field(None, description="External reference, e.g. a delivery note")
+
+    @model_validator(mode="after")
+    def check_event(self) -> "InventoryEvent":
+        """Check the quantity sign and transfer locations fit the event type."""
+        if self.event_type == "adjust":
+            if self.quantity == 0:
+                raise ValueError("adjust needs a non-zero quantity")
+        elif self.quantity <= 0:
+            raise ValueError(f"{self.event_type} needs a positive quantity")
+        if (self.event_type == "transfer") != (self.to_location is not None):
+            raise ValueError("to_location is required for transfer and only allowed for it")
+        if self.to_location == self.location:
+            raise ValueError("transfer needs two different locations")
+        return self
+
+
+class RecordedEvent(InventoryEvent):
+    """An event as stored in the log."""
+
+    seq: int = Field(..., description="Position in the event log")
+    occurred_at: datetime = Field(..., description="When the event was recorded")
+
+
+class AggregateGroup(BaseModel):
+    """Total of one group of an aggregation."""
+
+    key: str | None = Field(..., description="Location, ontology node or child node id")
+    quantity: float = Field(..., description="Quantity in the requested unit")
+    items: int = Field(..., description="Inventory items or running totals summed")
+
+
+class AggregationResponse(BaseModel):
+    """Quantity of an ontology subtree held in inventory."""
+
+    node_id: str = Field(..., description="Root of the aggregated subtree")
+    unit: str = Field(..., description="Unit of all quantities")
+    total: float = Field(..., description="Total quantity in the requested unit")
+    items: int = Field(..., description="Inventory items or running totals summed")
+    groups: list[AggregateGroup] = Field(default_factory=list, description="Breakdown")
+    unconverted: list[dict] = Field(
+        default_factory=list, description="Groups whose unit could not be converted"
+    )
+
+
+class BulkUpsertResponse(BaseModel):
+    """Outcome of a bulk upsert."""
+
+    received: int = Field(..., description="Rows in the upload")
+    upserted: int = Field(..., description="Distinct items created or replaced")
+    rejected: int = Field(..., description="Rows that failed validation and were skipped")
+    errors: list[str] = Field(
+        default_factory=list, description=f"First {MAX_BULK_ERRORS} row errors"
+    )
+
+
+def _resolve_subtree(node_id: str, unit: str) -> tuple[OntologySnapshot, UnitTable, list[str]]:
+    """Check the node and unit of an aggregation and get the node's subtree."""
+    snapshot = get_snapshot_store().current()
+    try:
+        node_ids = subtree(snapshot, node_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown ontology node: {node_id}") from exc
+    table = snapshot.derived("unit_table", UnitTable.from_snapshot)
+    try:
+        table.resolve(unit)
+    except UnknownUnitError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return snapshot, table, node_ids
+
+
+def _aggregation_response(
+    rows: list[dict[str, Any]],
+    snapshot: OntologySnapshot,
+    table: UnitTable,
+    node_id: str,
+    unit: str,
+    group_by: GroupBy,
+) -> AggregationResponse:
+    """Roll base-unit rows up into the requested unit."""
+    rollup = roll_up(rows, snapshot, table, node_id, unit, group_by)
+    return AggregationResponse(
+        node_id=node_id,
+        unit=unit,
+        total=rollup.total,
+        items=rollup.items,
+        groups=[
+            AggregateGroup(key=key, quantity=quantity, items=items)
+            for key, (quantity, items) in rollup.groups.items()
+        ],
+        unconverted=rollup.unconverted,
+    )
+
+
 @app.get("/", response_model=HealthResponse)
 async def root() -> HealthResponse:
     """Root endpoint returning service health."""
@@ -44,45 +214,283 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
 @app.get("/api/v1/inventory", response_model=list[InventoryItem])
-async def list_inventory(location: str | None = None) -> list[InventoryItem]:
+async def list_inventory(
+    response: Response,
+    location: str | None = None,
+    ontology_node_id: str | None = None,
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    session: AsyncSession = Depends(get_db_session),
+) -> list[InventoryItem]:
     """
-    List inventory items.
+    List inventory items in id order, one page at a time.
+
+    When more items follow, the ``X-Next-Cursor`` response header carries the
+    cursor of the next page.
 
     Args:
+        response: Outgoing response, for the cursor header
         location: Filter by storage location
+        ontology_node_id: Filter by ontology node
+        cursor: Cursor of the page to fetch
+        limit: Page size
+        session: Database session
 
     Returns:
         List of inventory items
     """
-    # Stub implementation
-    return []
+    try:
+        with span("db.list_items"):
+            rows, next_cursor = await list_items(
+                await session.connection(), limit, location, ontology_node_id, cursor
+            )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [InventoryItem.model_construct(**row) for row in rows]
+
+
+@app.get("/api/v1/inventory/aggregate", response_model=AggregationResponse)
+async def aggregate_inventory(
+    node_id: str = Query(..., description="Ontology node to total, e.g. the id of Dairy"),
+    unit: str = Query(..., description="Unit to report quantities in"),
+    group_by: GroupBy = Query("location", description="Breakdown of the total"),
+    location: str | None = Query(None, description="Only items at this location"),
+    session: AsyncSession = Depends(get_db_session),
+) -> AggregationResponse:
+    """
+    Total the quantity held of an ontology node and everything under it.
+
+    Items of every node in the ``is_a`` subtree are summed in one grouped
+    scan over their stored base-unit quantities; each group is then
+    converted to ``unit``.
+
+    Args:
+        node_id: Root of the subtree
+        unit: Target unit
+        group_by: Break down by location, by node, by child of the root, or "none"
+        location: Only items at this location
+        session: Database session
+
+    Returns:
+        Total and breakdown in the requested unit
+    """
+    snapshot, table, node_ids = _resolve_subtree(node_id, unit)
+    with span("db.aggregate_items"):
+        rows = await aggregate_items(await session.connection(), node_ids, location)
+    return _aggregation_response(rows, snapshot, table, node_id, unit, group_by)
+
+
+@app.post("/api/v1/inventory/events", response_model=list[RecordedEvent], status_code=201)
+async def record_inventory_events(
+    events: list[InventoryEvent], session: AsyncSession = Depends(get_db_session)
+) -> list[RecordedEvent]:
+    """
+    Append stock changes to the event log.
+
+    The running totals of every affected node and location are updated in
+    the same transaction, so they never drift from the log.
+
+    Args:
+        events: Changes in the order they happened
+        session: Database session
+
+    Returns:
+        Recorded events with their position in the log
+    """
+    snapshot = get_snapshot_store().current()
+    normalizer = get_normalizer(snapshot)
+    records = []
+    for index, event in enumerate(events):
+        if event.ontology_node_id not in snapshot:
+            raise HTTPException(
+                status_code=422,
+                detail=f"events[{index}]: unknown ontology node {event.ontology_node_id}",
+            )
+        base = normalizer.normalize(event.quantity, event.unit)
+        if base is None:
+            raise HTTPException(
+                status_code=422, detail=f"events[{index}]: unknown unit {event.unit!r}"
+            )
+        records.append(
+            EventRecord(
+                event_type=event.event_type,
+                ontology_node_id=event.ontology_node_id,
+                location=event.location,
+                to_location=event.to_location,
+                quantity=event.quantity,
+                unit=event.unit,
+                base_quantity=base.quantity,
+                base_unit=base.unit,
+                dimension=base.dimension,
+                reference=event.reference,
+            )
+        )
+
+    with span("db.record_events"):
+        recorded = await record_events(await session.connection(), records)
+        await session.commit()
+    return [
+        RecordedEvent(**event.model_dump(), seq=seq, occurred_at=occurred_at)
+        for event, (seq, occurred_at) in zip(events, recorded, strict=True)
+    ]
+
+
+@app.get("/api/v1/inventory/totals", response_model=AggregationResponse)
+async def inventory_totals(
+    node_id: str = Query(..., description="Ontology node to total, e.g. the id of Dairy"),
+    unit: str = Query(..., description="Unit to report quantities in"),
+    group_by: GroupBy = Query("location", description="Breakdown of the total"),
+    location: str | None = Query(None, description="Only stock at this location"),
+    as_of: datetime | None = Query(None, description="Point in time, by default now"),
+    session: AsyncSession = Depends(get_db_session),
+) -> AggregationResponse:
+    """
+    Total the stock of an ontology node and everything under it from the event log.
+
+    Current totals are read from the running totals; with ``as_of``, the
+    latest snapshot before that time is replayed forward with the events
+    after it.
+
+    Args:
+        node_id: Root of the subtree
+        unit: Target unit
+        group_by: Break down by location, by node, by child of the root, or "none"
+        location: Only stock at this location
+        as_of: Point in time
+        session: Database session
+
+    Returns:
+        Total and breakdown in the requested unit
+    """
+    snapshot, table, node_ids = _resolve_subtree(node_id, unit)
+    with span("db.fetch_totals"):
+        rows = await fetch_totals(await session.connection(), node_ids, location, as_of)
+    return _aggregation_response(rows, snapshot, table, node_id, unit, group_by)
+
+
+@app.post("/api/v1/inventory/snapshots")
+async def snapshot_inventory_totals(session: AsyncSession = Depends(get_db_session)) -> dict:
+    """
+    Snapshot the running totals now instead of at the next interval.
+
+    Args:
+        session: Database session
+
+    Returns:
+        Last event included, null when nothing happened since the last snapshot
+    """
+    with span("db.take_snapshot"):
+        seq = await take_snapshot(await session.connection())
+        await session.commit()
+    return {"seq": seq}
 
 
 @app.get("/api/v1/inventory/{item_id}", response_model=InventoryItem)
-async def get_inventory_item(item_id: str) -> InventoryItem:
+async def get_inventory_item(
+    item_id: str, session: AsyncSession = Depends(get_db_session)
+) -> InventoryItem:
     """
     Get a specific inventory item.
 
     Args:
         item_id: Item identifier
+        session: Database session
 
     Returns:
         Inventory item details
     """
-    raise HTTPException(status_code=404, detail="Item not found")
+    with span("db.fetch_item"):
+        row = await fetch_item(await session.connection(), item_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return InventoryItem.model_construct(**row)
 
 
 @app.post("/api/v1/inventory", response_model=InventoryItem, status_code=201)
-async def create_inventory_item(item: InventoryItem) -> InventoryItem:
+async def create_inventory_item(
+    item: InventoryItem, session: AsyncSession = Depends(get_db_session)
+) -> InventoryItem:
     """
     Create a new inventory item.
 
     Args:
         item: Item data
+        session: Database session
 
     Returns:
         Created item
     """
-    # Stub implementation
+    row = item.model_dump()
+    base = get_normalizer(get_snapshot_store().current()).normalize(item.quantity, item.unit)
+    if base is not None:
+        row.update(base_quantity=base.quantity, base_unit=base.unit, dimension=base.dimension)
+    try:
+        with span("db.insert_item"):
+            await insert_item(await session.connection(), row)
+    except DuplicateItemError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    await session.commit()
     return item
+
+
+@app.post("/api/v1/inventory/bulk", response_model=BulkUpsertResponse)
+async def bulk_upsert_inventory(
+    request: Request, session: AsyncSession = Depends(get_db_session)
+) -> BulkUpsertResponse:
+    """
+    Create or replace many items from an NDJSON upload.
+
+    Each line is an inventory item. Valid rows are streamed into Postgres
+    with COPY as the body arrives and merged in one transaction; when an id
+    appears more than once, its last row wins. Invalid rows are skipped and
+    reported.
+
+    Args:
+        request: Raw HTTP request carrying the NDJSON body
+        session: Database session
+
+    Returns:
+        Row counts and the first row errors
+    """
+    normalizer = get_normalizer(get_snapshot_store().current())
+    received = rejected = 0
+    errors: list[str] = []
+
+    async def records() -> AsyncIterator[ItemRecord]:
+        nonlocal received, rejected
+        async for line_number, line in iter_lines(request.stream()):
+            received += 1
+            try:
+                item = InventoryItem.model_validate_json(line)
+            except ValidationError as exc:
+                rejected += 1
+                if len(errors) < MAX_BULK_ERRORS:
+                    errors.append(f"line {line_number}: {exc.errors()[0]['msg']}")
+                continue
+            base = normalizer.normalize(item.quantity, item.unit)
+            yield (
+                item.id,
+                item.ontology_node_id,
+                item.quantity,
+                item.unit,
+                item.location,
+                base.quantity if base is not None else None,
+                base.unit if base is not None else None,
+                base.dimension if base is not None else None,
+            )
+
+    with span("db.bulk_upsert"):
+        upserted = await bulk_upsert(await session.connection(), chunked(records()))
+        await session.commit()
+    return BulkUpsertResponse(
+        received=received, upserted=upserted, rejected=rejected, errors=errors
+    )
@@ -0,0 +1,266 @@
+"""Postgres storage for inventory items."""
+
+import base64
+import binascii
+import os
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+BULK_CHUNK_SIZE = int(os.getenv("INVENTORY_BULK_CHUNK_SIZE", "10000"))
+
+ITEM_COLUMNS = ("id", "ontology_node_id", "quantity", "unit", "location")
+# Quantities normalized to the base unit of their dimension when written
+BASE_COLUMNS = ("base_quantity", "base_unit", "dimension")
+STORED_COLUMNS = ITEM_COLUMNS + BASE_COLUMNS
+ItemRecord = tuple[str, str, float, str, str | None, float | None, str | None, str | None]
+
+
+class DuplicateItemError(ValueError):
+    """Raised when creating an item whose id already exists."""
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(item_id: str) -> str:
+    """Opaque cursor pointing after an item."""
+    return base64.urlsafe_b64encode(item_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor: Opaque cursor
+
+    Returns:
+        Id of the last item of the previous page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from exc
+
+
+_SELECT = "SELECT id, ontology_node_id, quantity, unit, location FROM inventory.items"
+
+_FETCH = text(f"{_SELECT} WHERE id = :id")
+
+_INSERT = text("""
+    INSERT INTO inventory.items
+        (id, ontology_node_id, quantity, unit, location, base_quantity, base_unit, dimension)
+    VALUES
+        (:id, :ontology_node_id, :quantity, :unit, :location,
+         :base_quantity, :base_unit, :dimension)
+    """)
+
+_PAGE = text(f"""
+    {_SELECT}
+    WHERE (CAST(:location AS text) IS NULL OR location = :location)
+      AND (CAST(:ontology_node_id AS text) IS NULL OR ontology_node_id = :ontology_node_id)
+      AND (CAST(:after AS text) IS NULL OR id > :after)
+    ORDER BY id
+    LIMIT :limit
+    """)
+
+_CREATE_STAGING = text("""
+    CREATE TEMPORARY TABLE inventory_staging (
+        id TEXT NOT NULL,
+        ontology_node_id TEXT NOT NULL,
+        quantity DOUBLE PRECISION NOT NULL,
+        unit TEXT NOT NULL,
+        location TEXT,
+        base_quantity DOUBLE PRECISION,
+        base_unit TEXT,
+        dimension TEXT,
+        seq BIGINT NOT NULL
+    ) ON COMMIT DROP
+    """)
+
+# Later rows for the same id win, as if they had been posted one by one
+_MERGE_STAGING = text("""
+    INSERT INTO inventory.items
+        (id, ontology_node_id, quantity, unit, location, base_quantity, base_unit, dimension)
+    SELECT DISTINCT ON (id)
+        id, ontology_node_id, quantity, unit, location, base_quantity, base_unit, dimension
+    FROM inventory_staging
+    ORDER BY id, seq DESC
+    ON CONFLICT (id) DO UPDATE SET
+        ontology_node_id = EXCLUDED.ontology_node_id,
+        quantity = EXCLUDED.quantity,
+        unit = EXCLUDED.unit,
+        location = EXCLUDED.location,
+        base_quantity = EXCLUDED.base_quantity,
+        base_unit = EXCLUDED.base_unit,
+        dimension = EXCLUDED.dimension,
+        updated_at = now()
+    """)
+
+
+async def fetch_item(connection: AsyncConnection, item_id: str) -> dict[str, Any] | None:
+    """
+    Get one item by id.
+
+    Args:
+        connection: Database connection
+        item_id: Item identifier
+
+    Returns:
+        Item columns, or None when it does not exist
+    """
+    row = (await connection.execute(_FETCH, {"id": item_id})).first()
+    return dict(row._mapping) if row is not None else None
+
+
+async def insert_item(connection: AsyncConnection, item: dict[str, Any]) -> None:
+    """
+    Create an item.
+
+    Args:
+        connection: Database connection
+        item: Item columns, including the base-unit columns
+
+    Raises:
+        DuplicateItemError: If an item with the same id exists
+    """
+    try:
+        async with connection.begin_nested():
+            await connection.execute(
+                _INSERT, {column: item.get(column) for column in STORED_COLUMNS}
+            )
+    except IntegrityError as exc:
+        raise DuplicateItemError(f"Item {item['id']} already exists") from exc
+
+
+async def list_items(
+    connection: AsyncConnection,
+    limit: int,
+    location: str | None = None,
+    ontology_node_id: str | None = None,
+    cursor: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Get one page of items in id order.
+
+    Pages are keyset-paginated: each page continues after the last id of the
+    previous one, so deep pages cost the same as the first and concurrent
+    inserts never shift rows between pages.
+
+    Args:
+        connection: Database connection
+        limit: Page size
+        location: Only items at this location
+        ontology_node_id: Only items of this ontology node
+        cursor: Cursor returned with the previous page
+
+    Returns:
+        Items of the page and the cursor of the next page, None on the last page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    after = decode_cursor(cursor) if cursor is not None else None
+    result = await connection.execute(
+        _PAGE,
+        {
+            "location": location,
+            "ontology_node_id": ontology_node_id,
+            "after": after,
+            "limit": limit + 1,
+        },
+    )
+    rows = [dict(row._mapping) for row in result]
+    if len(rows) <= limit:
+        return rows, None
+    del rows[limit:]
+    return rows, encode_cursor(rows[-1]["id"])
+
+
+_AGGREGATE = text("""
+    SELECT location, ontology_node_id, dimension, COALESCE(base_unit, unit) AS unit,
+           SUM(COALESCE(base_quantity, quantity)) AS quantity, COUNT(*) AS items
+    FROM inventory.items
+    WHERE ontology_node_id = ANY(:node_ids)
+      AND (CAST(:location AS text) IS NULL OR location = :location)
+    GROUP BY location, ontology_node_id, dimension, COALESCE(base_unit, unit)
+    """)
+
+
+async def aggregate_items(
+    connection: AsyncConnection, node_ids: Sequence[str], location: str | None = None
+) -> list[dict[str, Any]]:
+    """
+    Sum stored base-unit quantities in one grouped scan.
+
+    Items whose unit could not be normalized when written are summed per
+    original unit, with a null dimension.
+
+    Args:
+        connection: Database connection
+        node_ids: Ontology nodes to include
+        location: Only items at this location
+
+    Returns:
+        One row per location, node, dimension and unit, with the summed
+        quantity and the number of items
+    """
+    result = await connection.execute(
+        _AGGREGATE, {"node_ids": list(node_ids), "location": location}
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def chunked(
+    records: AsyncIterable[ItemRecord], size: int = BULK_CHUNK_SIZE
+) -> AsyncIterator[list[ItemRecord]]:
+    """Group records into lists of at most ``size``."""
+    chunk: list[ItemRecord] = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def bulk_upsert(
+    connection: AsyncConnection, chunks: AsyncIterable[Sequence[ItemRecord]]
+) -> int:
+    """
+    Insert or replace many items with COPY.
+
+    Chunks are streamed into a temporary staging table with the binary COPY
+    protocol as they arrive, then merged into ``inventory.items`` with one
+    ``INSERT ... ON CONFLICT`` statement. The caller owns the transaction.
+
+    Args:
+        connection: Database connection inside a transaction
+        chunks: Item records, in input order
+
+    Returns:
+        Number of distinct items written
+    """
+    await connection.execute(_CREATE_STAGING)
+    driver = (await connection.get_raw_connection()).driver_connection
+    assert driver is not None
+    seq = 0
+    async for chunk in chunks:
+        records = [(*record, seq + offset) for offset, record in enumerate(chunk)]
+        seq += len(records)
+        await driver.copy_records_to_table(
+            "inventory_staging", records=records, columns=[*STORED_COLUMNS, "seq"]
+        )
+    if seq == 0:
+        return 0
+    result = await connection.execute(_MERGE_STAGING)
+    return int(result.rowcount)
@@ -0,0 +1,131 @@
+"""Batch mapping over JSON arrays and streamed NDJSON bodies."""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+
+from pydantic import ValidationError
+
+from shared.schemas.base import MappingRequest, MappingResponse
+from shared.utils.streaming import iter_lines
+
+logger = logging.getLogger(__name__)
+
+Mapper = Callable[[MappingRequest], Awaitable[MappingResponse]]
+
+
+def dedupe_key(request: MappingRequest) -> tuple[str, str]:
+    """
+    Key under which identical requests share one result.
+
+    Only case and runs of whitespace are folded. Punctuation is kept because
+    the quantity parser reads it: "1/2 cup", "1-2 cup" and "1.2 cup" are
+    different quantities.
+    """
+    context = json.dumps(request.context, sort_keys=True) if request.context else ""
+    return " ".join(request.text.casefold().split()), context
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[MappingRequest | str]:
+    """
+    Parse a streamed NDJSON body into mapping requests.
+
+    Lines that fail to parse are yielded as an error message instead of
+    aborting the stream, so one bad row does not lose the rest of the batch.
+
+    Args:
+        chunks: Raw body chunks
+
+    Yields:
+        Parsed requests, or an error message per invalid line
+    """
+    async for line_number, line in iter_lines(chunks):
+        yield _parse_line(line, line_number)
+
+
+def _parse_line(line: bytes, line_number: int) -> MappingRequest | str:
+    try:
+        return MappingRequest.model_validate_json(line)
+    except ValidationError as exc:
+        return f"line {line_number}: {exc.errors()[0]['msg']}"
+
+
+async def stream_mappings(
+    requests: AsyncIterable[MappingRequest | str],
+    mapper: Mapper,
+    concurrency: int,
+    dedupe_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Map a stream of requests, yielding NDJSON responses in input order.
+
+    At most ``concurrency`` mappings run at once and at most a few times that
+    many results are buffered, so memory stays bounded for arbitrarily long
+    inputs. Requests with the same ``dedupe_key`` reuse the
+    result of the first one seen within the last ``dedupe_size`` distinct keys.
+
+    Args:
+        requests: Requests, or error messages for rows that failed to parse
+        mapper: Coroutine mapping a single request
+        concurrency: Maximum number of mappings in flight
+        dedupe_size: Number of distinct keys remembered for de-duplication
+
+    Yields:
+        One NDJSON line per input row; rows that failed to parse or to map
+        get an ``{"error": ...}`` line
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    window = concurrency * 4
+    shared: OrderedDict[tuple[str, str], asyncio.Task[MappingResponse]] = OrderedDict()
+    pending: deque[tuple[MappingRequest | str, asyncio.Task[MappingResponse] | None]] = deque()
+
+    async def bounded(request: MappingRequest) -> MappingResponse:
+        async with semaphore:
+            return await mapper(request)
+
+    try:
+        async for request in requests:
+            task = None
+            if isinstance(request, MappingRequest):
+                key = dedupe_key(request)
+                task = shared.get(key)
+                if task is None:
+                    task = asyncio.ensure_future(bounded(request))
+                    shared[key] = task
+                    if len(shared) > dedupe_size:
+                        shared.popitem(last=False)
+                else:
+                    shared.move_to_end(key)
+            pending.append((request, task))
+
+            while pending and (len(pending) > window or _is_ready(pending[0][1])):
+                yield await _render(*pending.popleft())
+
+        while pending:
+            yield await _render(*pending.popleft())
+    finally:
+        for _, task in pending:
+            if task is not None:
+                task.cancel()
+
+
+def _is_ready(task: asyncio.Task[MappingResponse] | None) -> bool:
+    return task is None or task.done()
+
+
+async def _render(
+    request: MappingRequest | str, task: asyncio.Task[MappingResponse] | None
+) -> bytes:
+    if task is None:
+        return json.dumps({"error": request}).encode() + b"\n"
+    assert isinstance(request, MappingRequest)
+    try:
+        response = await task
+    except Exception as exc:
+        logger.exception("Mapping %r failed", request.text)
+        return json.dumps({"error": f"mapping failed: {exc}"}).encode() + b"\n"
+    if response.text != request.text:
+        response = response.model_copy(update={"text": request.text})
+    return response.model_dump_json().encode() + b"\n"
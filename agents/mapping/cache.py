@@ -0,0 +1,277 @@
+"""Two-tier cache of mapping results."""
+
+import hashlib
+import logging
+import os
+from datetime import UTC, datetime, timedelta
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from agents.mapping.batch import dedupe_key
+from shared.ontology.snapshot import OntologySnapshot
+from shared.schemas.base import MappingRequest, MappingResponse
+from shared.utils.cache import LRUCache
+from shared.utils.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[str, str, str]
+
+
+def get_cache_settings() -> dict:
+    """
+    Mapping cache settings from the environment.
+
+    ``MAPPING_CACHE_SIZE`` bounds the in-process tier (0 disables caching),
+    ``MAPPING_CACHE_TTL`` and ``MAPPING_NEGATIVE_CACHE_TTL`` give the lifetime
+    in seconds of mapped and unmapped results (a ``MAPPING_CACHE_TTL`` of 0
+    also disables caching, a negative TTL of 0 stops caching unmapped
+    results), and ``MAPPING_SHARED_CACHE`` enables the Postgres tier.
+
+    Returns:
+        Keyword arguments for ``MappingCache``
+    """
+    return {
+        "maxsize": int(os.getenv("MAPPING_CACHE_SIZE", "100000")),
+        "ttl": float(os.getenv("MAPPING_CACHE_TTL", "3600")),
+        "negative_ttl": float(os.getenv("MAPPING_NEGATIVE_CACHE_TTL", "300")),
+        "shared": os.getenv("MAPPING_SHARED_CACHE", "false").lower() == "true",
+    }
+
+
+def cache_key(request: MappingRequest, checksum: str) -> CacheKey:
+    """
+    Key of a request's result.
+
+    Args:
+        request: Mapping request
+        checksum: Checksum of the ontology release the result was mapped against
+
+    Returns:
+        Text with case and whitespace folded, hash of the context and
+        release checksum
+    """
+    folded, context = dedupe_key(request)
+    return folded, hashlib.sha256(context.encode()).hexdigest()[:32], checksum
+
+
+_FETCH = text("""
+    SELECT response FROM mapping.result_cache
+    WHERE release_checksum = :checksum AND text_key = :text_key
+      AND context_hash = :context_hash AND expires_at > now()
+    """)
+
+_STORE = text("""
+    INSERT INTO mapping.result_cache
+        (release_checksum, text_key, context_hash, response, mapped, expires_at)
+    VALUES (:checksum, :text_key, :context_hash, CAST(:response AS jsonb), :mapped, :expires_at)
+    ON CONFLICT (release_checksum, text_key, context_hash)
+    DO UPDATE SET response = EXCLUDED.response, mapped = EXCLUDED.mapped,
+                  expires_at = EXCLUDED.expires_at
+    """)
+
+_DELETE = text("""
+    DELETE FROM mapping.result_cache
+    WHERE release_checksum = :checksum AND text_key = :text_key
+      AND context_hash = :context_hash
+    """)
+
+_WARM = text("""
+    SELECT text_key, context_hash, response,
+           EXTRACT(EPOCH FROM expires_at - now()) AS remaining
+    FROM mapping.result_cache
+    WHERE release_checksum = :checksum AND expires_at > now()
+    ORDER BY expires_at DESC
+    LIMIT :limit
+    """)
+
+
+class MappingCache:
+    """
+    Mapping results of one ontology release.
+
+    Results live in an in-process LRU with a TTL; unmapped results are kept
+    for the shorter ``negative_ttl``, so text that nothing matched is not
+    searched again on every request but is retried soon. With ``shared``,
+    results are also written to ``mapping.result_cache`` in Postgres, where
+    other workers find them on a local miss and cold workers warm from them.
+    The shared tier is best effort: database errors are logged and treated
+    as misses, and so are stored rows that no longer validate as a
+    ``MappingResponse``; those are deleted.
+
+    One instance belongs to one snapshot, so a new release starts empty.
+    """
+
+    def __init__(
+        self,
+        checksum: str,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float,
+        shared: bool = False,
+    ) -> None:
+        self.checksum = checksum
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self.shared_hits = 0
+        # Every put passes its own TTL; a non-positive one is never stored
+        self._local: LRUCache[MappingResponse] = LRUCache(maxsize, ttl=ttl if ttl > 0 else None)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "MappingCache | None":
+        """
+        Create the cache of a snapshot.
+
+        Returns:
+            Cache, or None when ``MAPPING_CACHE_SIZE`` or ``MAPPING_CACHE_TTL`` is 0
+        """
+        settings = get_cache_settings()
+        if settings["maxsize"] <= 0 or settings["ttl"] <= 0:
+            return None
+        return cls(snapshot.checksum, **settings)
+
+    async def get(self, request: MappingRequest) -> MappingResponse | None:
+        """
+        Look up the result of a request.
+
+        Args:
+            request: Mapping request
+
+        Returns:
+            Cached response for the request's text, or None on a miss
+        """
+        key = cache_key(request, self.checksum)
+        response = self._local.get(key)
+        if response is None and self.shared:
+            response = await self._fetch(key)
+            if response is not None:
+                self.shared_hits += 1
+                self._local.put(key, response, ttl=self._ttl(response))
+        if response is None:
+            return None
+        return response.model_copy(update={"text": request.text})
+
+    async def put(self, request: MappingRequest, response: MappingResponse) -> None:
+        """
+        Store the result of a request in both tiers.
+
+        Args:
+            request: Mapping request
+            response: Its result
+        """
+        key = cache_key(request, self.checksum)
+        ttl = self._ttl(response)
+        if ttl <= 0:
+            return
+        self._local.put(key, response, ttl=ttl)
+        if self.shared:
+            await self._store(key, response, ttl)
+
+    def _ttl(self, response: MappingResponse) -> float:
+        return self.ttl if response.mapped_node_id is not None else self.negative_ttl
+
+    async def _fetch(self, key: CacheKey) -> MappingResponse | None:
+        text_key, context_hash, checksum = key
+        try:
+            async with get_engine().connect() as connection:
+                result = await connection.execute(
+                    _FETCH,
+                    {"checksum": checksum, "text_key": text_key, "context_hash": context_hash},
+                )
+                row = result.first()
+        except (SQLAlchemyError, OSError) as exc:
+            logger.warning("Shared mapping cache lookup failed: %s", exc)
+            return None
+        if row is None:
+            return None
+        response = self._validate(row.response)
+        if response is None:
+            await self._delete([key])
+        return response
+
+    @staticmethod
+    def _validate(stored: object) -> MappingResponse | None:
+        try:
+            return MappingResponse.model_validate(stored)
+        except ValidationError as exc:
+            logger.info("Dropping a shared mapping cache row that no longer validates: %s", exc)
+            return None
+
+    async def _delete(self, keys: list[CacheKey]) -> None:
+        try:
+            async with get_engine().begin() as connection:
+                await connection.execute(
+                    _DELETE,
+                    [
+                        {"checksum": checksum, "text_key": text_key, "context_hash": context_hash}
+                        for text_key, context_hash, checksum in keys
+                    ],
+                )
+        except (SQLAlchemyError, OSError) as exc:
+            logger.warning("Shared mapping cache delete failed: %s", exc)
+
+    async def _store(self, key: CacheKey, response: MappingResponse, ttl: float) -> None:
+        text_key, context_hash, checksum = key
+        try:
+            async with get_engine().begin() as connection:
+                await connection.execute(
+                    _STORE,
+                    {
+                        "checksum": checksum,
+                        "text_key": text_key,
+                        "context_hash": context_hash,
+                        "response": response.model_dump_json(),
+                        "mapped": response.mapped_node_id is not None,
+                        "expires_at": datetime.now(UTC) + timedelta(seconds=ttl),
+                    },
+                )
+        except (SQLAlchemyError, OSError) as exc:
+            logger.warning("Shared mapping cache write failed: %s", exc)
+
+    async def warm(self, limit: int | None = None) -> int:
+        """
+        Load the freshest shared entries of this release into the local tier.
+
+        Args:
+            limit: Maximum number of entries, by default the local capacity
+
+        Returns:
+            Number of entries loaded; rows that do not validate are deleted
+            instead
+        """
+        if not self.shared:
+            return 0
+        try:
+            async with get_engine().connect() as connection:
+                result = await connection.execute(
+                    _WARM,
+                    {"checksum": self.checksum, "limit": limit or self._local.maxsize},
+                )
+                rows = result.all()
+        except (SQLAlchemyError, OSError) as exc:
+            logger.warning("Could not warm the mapping cache: %s", exc)
+            return 0
+        invalid: list[CacheKey] = []
+        # Oldest first, so the freshest entries end up most recently used
+        for row in reversed(rows):
+            key = (row.text_key, row.context_hash, self.checksum)
+            response = self._validate(row.response)
+            if response is None:
+                invalid.append(key)
+            else:
+                self._local.put(key, response, ttl=float(row.remaining))
+        if invalid:
+            await self._delete(invalid)
+        return len(rows) - len(invalid)
+
+    def stats(self) -> dict:
+        """Get local tier counters and shared tier hits."""
+        return {
+            **self._local.stats(),
+            "shared": self.shared,
+            "shared_hits": self.shared_hits,
+            "checksum": self.checksum,
+        }
@@ -0,0 +1,230 @@
+"""Lexical candidate generation over ontology labels and synonyms."""
+
+import copy
+import math
+import os
+from dataclasses import dataclass
+
+from shared.ontology.snapshot import NodeRecord, OntologySnapshot, SnapshotDiff
+from shared.ontology.text import normalize_text, trigrams
+
+CONFIDENT_SCORE = float(os.getenv("MAPPING_LEXICAL_CONFIDENT_SCORE", "0.85"))
+CONFIDENT_MARGIN = float(os.getenv("MAPPING_LEXICAL_CONFIDENT_MARGIN", "0.15"))
+
+
+@dataclass(frozen=True, slots=True)
+class LexicalCandidate:
+    """A node matched by lexical similarity."""
+
+    node_id: str
+    label: str
+    category: str
+    score: float
+    exact: bool
+
+    def to_dict(self) -> dict:
+        """Serialize as a mapping alternative."""
+        return {
+            "id": self.node_id,
+            "label": self.label,
+            "category": self.category,
+            "score": round(self.score, 4),
+        }
+
+
+class LexicalIndex:
+    """
+    Token and character-trigram inverted index over node surface forms.
+
+    Every normalized label and synonym is a separate surface form. A query is
+    scored against the forms sharing at least one token or trigram with it,
+    combining an IDF-weighted token Jaccard (BM25 with term frequency
+    saturated at one, which is what short labels give) and a trigram Jaccard
+    that tolerates misspellings and plurals. A node's score is the best
+    score of its forms.
+    """
+
+    def __init__(self, snapshot: OntologySnapshot) -> None:
+        self._nodes = snapshot.nodes
+        self._exact: dict[str, list[int]] = {}
+        self._form_nodes: list[int] = []
+        self._form_tokens: list[frozenset[str]] = []
+        self._form_trigram_counts: list[int] = []
+        self._token_postings: dict[str, list[int]] = {}
+        self._trigram_postings: dict[str, list[int]] = {}
+        for position, node in enumerate(snapshot.nodes):
+            self._add_node(position, node)
+        self._weigh()
+
+    def _add_node(self, position: int, node: NodeRecord) -> None:
+        for form in dict.fromkeys((normalize_text(node.label), *node.synonyms)):
+            if not form:
+                continue
+            form_id = len(self._form_nodes)
+            self._form_nodes.append(position)
+            self._exact.setdefault(form, []).append(position)
+            tokens = frozenset(form.split())
+            self._form_tokens.append(tokens)
+            for token in tokens:
+                self._token_postings.setdefault(token, []).append(form_id)
+            grams = trigrams(form)
+            self._form_trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_postings.setdefault(gram, []).append(form_id)
+
+    def _weigh(self) -> None:
+        total = len(self._form_nodes)
+        self._unknown_idf = math.log(1 + (total + 0.5) / 0.5)
+        self._idf = {
+            token: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for token, posting in self._token_postings.items()
+        }
+        self._form_weights = [
+            sum(self._idf[token] for token in tokens) for tokens in self._form_tokens
+        ]
+
+    def updated(
+        self, diff: SnapshotDiff, previous: OntologySnapshot, snapshot: OntologySnapshot
+    ) -> "LexicalIndex | None":
+        """
+        Follow a release change by indexing only the appended nodes.
+
+        Surface forms of existing nodes are reused when their labels and
+        synonyms are unchanged; only IDF weights are recomputed.
+
+        Args:
+            diff: Changes from ``previous`` to ``snapshot``
+            previous: Snapshot this index was built from
+            snapshot: New snapshot
+
+        Returns:
+            Index for ``snapshot``, or None when it must be rebuilt
+        """
+        if not diff.appended:
+            return None
+        for node_id in diff.changed:
+            old, new = previous.get(node_id), snapshot.get(node_id)
+            if old is None or new is None or (old.label, old.synonyms) != (new.label, new.synonyms):
+                return None
+
+        index = copy.copy(self)
+        index._nodes = snapshot.nodes
+        if diff.added:
+            # Copy the posting lists this index shares with readers of the old one
+            index._exact = {form: list(positions) for form, positions in self._exact.items()}
+            index._form_nodes = list(self._form_nodes)
+            index._form_tokens = list(self._form_tokens)
+            index._form_trigram_counts = list(self._form_trigram_counts)
+            index._token_postings = {
+                token: list(posting) for token, posting in self._token_postings.items()
+            }
+            index._trigram_postings = {
+                gram: list(posting) for gram, posting in self._trigram_postings.items()
+            }
+            for position in range(len(previous), len(snapshot)):
+                index._add_node(position, snapshot.nodes[position])
+            index._weigh()
+        return index
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "LexicalIndex":
+        """Build the index for a snapshot."""
+        return cls(snapshot)
+
+    def search(
+        self,
+        text: str,
+        limit: int = 10,
+        category: str | None = None,
+    ) -> list[LexicalCandidate]:
+        """
+        Rank nodes by lexical similarity to ``text``.
+
+        Args:
+            text: Raw query text
+            limit: Maximum candidates to return
+            category: Restrict candidates to one category
+
+        Returns:
+            Candidates, best first; exact label/synonym hits score 1.0
+        """
+        query = normalize_text(text)
+        if not query:
+            return []
+
+        exact = self._exact.get(query)
+        if exact is not None:
+            candidates = [
+                self._candidate(position, 1.0, exact=True)
+                for position in exact
+                if category is None or self._nodes[position].category == category
+            ]
+            if candidates:
+                return candidates[:limit]
+
+        tokens = set(query.split())
+        query_weight = sum(self._idf.get(token, self._unknown_idf) for token in tokens)
+        token_overlap: dict[int, float] = {}
+        for token in tokens:
+            weight = self._idf.get(token)
+            if weight is None:
+                continue
+            for form_id in self._token_postings[token]:
+                token_overlap[form_id] = token_overlap.get(form_id, 0.0) + weight
+
+        grams = trigrams(query)
+        gram_overlap: dict[int, int] = {}
+        for gram in grams:
+            for form_id in self._trigram_postings.get(gram, ()):
+                gram_overlap[form_id] = gram_overlap.get(form_id, 0) + 1
+
+        best: dict[int, float] = {}
+        for form_id in token_overlap.keys() | gram_overlap.keys():
+            position = self._form_nodes[form_id]
+            if category is not None and self._nodes[position].category != category:
+                continue
+            matched = token_overlap.get(form_id, 0.0)
+            token_score = matched / (query_weight + self._form_weights[form_id] - matched)
+            shared = gram_overlap.get(form_id, 0)
+            gram_score = shared / (len(grams) + self._form_trigram_counts[form_id] - shared)
+            score = 0.5 * token_score + 0.5 * gram_score
+            if score > best.get(position, 0.0):
+                best[position] = score
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [self._candidate(position, score, exact=False) for position, score in ranked]
+
+    def _candidate(self, position: int, score: float, exact: bool) -> LexicalCandidate:
+        node = self._nodes[position]
+        return LexicalCandidate(
+            node_id=node.id,
+            label=node.label,
+            category=node.category,
+            score=score,
+            exact=exact,
+        )
+
+
+def confident_match(candidates: list[LexicalCandidate]) -> LexicalCandidate | None:
+    """
+    Pick the candidate to map to without further stages, if unambiguous.
+
+    A single exact hit always qualifies. Otherwise the best candidate needs a
+    score of at least ``MAPPING_LEXICAL_CONFIDENT_SCORE`` and a lead of
+    ``MAPPING_LEXICAL_CONFIDENT_MARGIN`` over the runner-up.
+
+    Args:
+        candidates: Ranked candidates from ``LexicalIndex.search``
+
+    Returns:
+        The confident candidate, or None when later stages must decide
+    """
+    if not candidates:
+        return None
+    best = candidates[0]
+    runner_up = candidates[1].score if len(candidates) > 1 else 0.0
+    if best.exact:
+        return best if runner_up < 1.0 else None
+    if best.score >= CONFIDENT_SCORE and best.score - runner_up >= CONFIDENT_MARGIN:
+        return best
+    return None
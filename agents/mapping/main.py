@@ -1,16 +1,101 @@
 """Mapping Agent - Maps unstructured text to canonical ontology nodes."""
 
+import logging
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+
+from agents.mapping.batch import iter_ndjson, stream_mappings
+from agents.mapping.cache import MappingCache
+from agents.mapping.lexical import LexicalIndex, confident_match
+from agents.mapping.parser import QuantityParser
+from shared.ontology.reload import release_router
+from shared.ontology.snapshot import (
+    OntologySnapshot,
+    SnapshotDiff,
+    get_snapshot_store,
+    register_incremental,
+)
+from shared.schemas.base import (
+    HealthResponse,
+    MappingRequest,
+    MappingResponse,
+    RerankRequest,
+    RerankResponse,
+)
+from shared.utils.database import engine_lifespan, pool_metrics
+from shared.utils.http import (
+    AgentCallError,
+    AgentClient,
+    AgentUnavailableError,
+    DeadlineMiddleware,
+    LocalAgentClient,
+    agent_clients_lifespan,
+    client_metrics,
+    get_agent_client,
+    register_local_handler,
+)
+from shared.utils.logging import RequestIdMiddleware, limit_logger, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router, span
+from shared.utils.streaming import DuplexStreamingResponse
+
+BATCH_CONCURRENCY = int(os.getenv("MAPPING_BATCH_CONCURRENCY", "32"))
+BATCH_DEDUPE_SIZE = int(os.getenv("MAPPING_BATCH_DEDUPE_SIZE", "10000"))
+MAX_ALTERNATIVES = int(os.getenv("MAPPING_MAX_ALTERNATIVES", "5"))
+RERANK_TIMEOUT = float(os.getenv("MAPPING_RERANK_TIMEOUT", "0.5"))
+
+logger = limit_logger(logging.getLogger(__name__))
+
+_request_list = TypeAdapter(list[MappingRequest])
+
+
+def get_mapping_cache(snapshot: OntologySnapshot) -> MappingCache | None:
+    """Get the mapping result cache of a snapshot, None when caching is disabled."""
+    return snapshot.derived("mapping_cache", MappingCache.from_snapshot)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the text indexes, warm the result cache and own the database and agent pools."""
+    snapshot = get_snapshot_store().current()
+    snapshot.derived("lexical_index", LexicalIndex.from_snapshot)
+    snapshot.derived("quantity_parser", QuantityParser.from_snapshot)
+    async with logging_lifespan(), engine_lifespan(), agent_clients_lifespan():
+        cache = get_mapping_cache(snapshot)
+        if cache is not None:
+            await cache.warm()
+        yield
 
-from shared.schemas.base import HealthResponse, MappingRequest, MappingResponse
 
 app = FastAPI(
     title="Mapping Agent",
     description="Maps unstructured text to canonical ontology nodes",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.include_router(release_router)
+app.add_middleware(DeadlineMiddleware)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+
+def _update_quantity_parser(
+    parser: QuantityParser,
+    diff: SnapshotDiff,
+    previous: OntologySnapshot,
+    snapshot: OntologySnapshot,
+) -> QuantityParser | None:
+    """Keep the parser unless a unit of measure changed."""
+    return None if diff.touches_category("unit_of_measure", previous, snapshot) else parser
+
+
+register_incremental("lexical_index", LexicalIndex.updated)
+register_incremental("quantity_parser", _update_quantity_parser)
 
 
 @app.get("/", response_model=HealthResponse)
@@ -33,6 +118,25 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
+@app.get("/metrics/http")
+async def http_metrics() -> dict:
+    """Calls to other agents and the state of their circuit breakers."""
+    return client_metrics()
+
+
+@app.get("/metrics/cache")
+async def cache_metrics() -> dict:
+    """Mapping result cache counters for the active release."""
+    cache = get_mapping_cache(get_snapshot_store().current())
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
 @app.post("/api/v1/map", response_model=MappingResponse)
 async def map_text(request: MappingRequest) -> MappingResponse:
     """
@@ -44,10 +148,151 @@ async def map_text(request: MappingRequest) -> MappingResponse:
     Returns:
         Mapped node with confidence score and alternatives
     """
-    # Stub implementation - will use embeddings and similarity search
+    return await map_request(request)
+
+
+register_local_handler("mapping", "/api/v1/map", map_text)
+
+
+@app.post("/api/v1/map/batch")
+async def map_batch(request: Request) -> DuplexStreamingResponse:
+    """
+    Map many texts in one call.
+
+    The body is either a JSON array of mapping requests or, with
+    ``Content-Type: application/x-ndjson``, one request per line that is
+    consumed as it streams in. Responses are streamed back as NDJSON in input
+    order; texts within a batch that differ only in case and whitespace are
+    mapped once.
+
+    Args:
+        request: Raw HTTP request carrying the batch body
+
+    Returns:
+        NDJSON stream of mapping responses
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        requests = iter_ndjson(request.stream())
+    else:
+        try:
+            items = _request_list.validate_json(await request.body())
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+        requests = _iterate(items)
+
+    return DuplexStreamingResponse(
+        stream_mappings(requests, map_request, BATCH_CONCURRENCY, BATCH_DEDUPE_SIZE),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _iterate(items: list[MappingRequest]) -> AsyncIterator[MappingRequest]:
+    for item in items:
+        yield item
+
+
+async def map_request(request: MappingRequest) -> MappingResponse:
+    """
+    Map a single request to ontology nodes.
+
+    Results are cached per text (ignoring case and whitespace), context and
+    ontology release.
+    Alternatives of unconfident matches are reranked by the Reranking Agent
+    when ``RERANKING_AGENT_URL`` is set; if it is unavailable they keep their
+    lexical order and the result is not cached.
+
+    Args:
+        request: Mapping request with text and optional context
+
+    Returns:
+        Mapping response
+    """
+    snapshot = get_snapshot_store().current()
+    cache = get_mapping_cache(snapshot)
+    if cache is not None:
+        cached = await cache.get(request)
+        if cached is not None:
+            logger.debug("Cache hit for %r", request.text)
+            return cached
+    response = _map_uncached(request, snapshot)
+    logger.debug(
+        "Mapped %r to %s (confidence %.3f, %d alternatives)",
+        request.text,
+        response.mapped_node_id,
+        response.confidence,
+        len(response.alternatives),
+    )
+    client = get_agent_client("reranking")
+    if client is not None and response.mapped_node_id is None and len(response.alternatives) > 1:
+        reranked = await _rerank_alternatives(client, request, response)
+        if reranked is None:
+            return response
+        response = reranked
+    if cache is not None:
+        await cache.put(request, response)
+    return response
+
+
+def _map_uncached(request: MappingRequest, snapshot: OntologySnapshot) -> MappingResponse:
+    with span("mapping.parse"):
+        parser = snapshot.derived("quantity_parser", QuantityParser.from_snapshot)
+        parsed = parser.parse(request.text)
+    index = snapshot.derived("lexical_index", LexicalIndex.from_snapshot)
+    category = (request.context or {}).get("category")
+    with span("mapping.candidates"):
+        candidates = index.search(
+            parsed.item or request.text, limit=MAX_ALTERNATIVES + 1, category=category
+        )
+
+    match = confident_match(candidates)
+    if match is not None:
+        return MappingResponse(
+            text=request.text,
+            mapped_node_id=match.node_id,
+            confidence=match.score,
+            alternatives=[c.to_dict() for c in candidates if c is not match][:MAX_ALTERNATIVES],
+            quantity=parsed.quantity,
+            unit_node_id=parsed.unit_node_id,
+        )
+
+    # No unambiguous lexical hit - embedding search will take over here
     return MappingResponse(
         text=request.text,
         mapped_node_id=None,
         confidence=0.0,
-        alternatives=[],
+        alternatives=[candidate.to_dict() for candidate in candidates[:MAX_ALTERNATIVES]],
+        quantity=parsed.quantity,
+        unit_node_id=parsed.unit_node_id,
     )
+
+
+async def _rerank_alternatives(
+    client: AgentClient | LocalAgentClient, request: MappingRequest, response: MappingResponse
+) -> MappingResponse | None:
+    try:
+        body = RerankRequest.model_validate(
+            {
+                "query": request.text,
+                "candidates": response.alternatives,
+                "context": request.context,
+                "top_k": MAX_ALTERNATIVES,
+            }
+        )
+    except ValidationError as exc:
+        logger.info(
+            "Keeping lexical order of alternatives, context not usable for reranking: %s", exc
+        )
+        return None
+    try:
+        with span("mapping.rerank"):
+            reranked = await client.call(
+                "/api/v1/rerank",
+                body,
+                RerankResponse,
+                idempotent=True,
+                timeout=RERANK_TIMEOUT,
+            )
+    except (AgentUnavailableError, AgentCallError) as exc:
+        logger.info("Keeping lexical order of alternatives: %s", exc)
+        return None
+    return response.model_copy(update={"alternatives": reranked.reranked_results})
@@ -0,0 +1,195 @@
+"""Quantity and unit extraction from noisy item text."""
+
+import re
+import unicodedata
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from shared.ontology.snapshot import OntologySnapshot
+from shared.ontology.text import normalize_text
+
+_VULGAR_FRACTIONS = (
+    "".join(chr(code) for code in range(0x2150, 0x2190) if unicodedata.category(chr(code)) == "No")
+    + "¼½¾"
+)
+
+_NUMBER = rf"""
+    \d+\s+\d+/\d+               # mixed fraction: 1 1/2
+  | \d+\s*[{_VULGAR_FRACTIONS}] # mixed unicode fraction: 1½
+  | \d+/\d+                     # fraction: 3/4
+  | [{_VULGAR_FRACTIONS}]       # unicode fraction: ½
+  | \d*\.\d+ | \d+              # decimal or integer
+"""
+
+# A leading number must be followed by whitespace, the end, "x " or a
+# letter; a letter ("2lbs") is only accepted when it starts a unit
+_LEADING_QUANTITY = re.compile(
+    rf"""
+    ^\s*(?P<low>{_NUMBER})
+    (?:\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER}))?
+    (?=\s|$|x\s|(?P<attached>[^\W\d_]))
+    \s*(?:x\s+)?
+    (?P<rest>.*)$
+    """,
+    re.VERBOSE | re.IGNORECASE | re.DOTALL,
+)
+
+# Searched on right-stripped text; every optional run of whitespace is
+# followed by a required character, so a failed search stays linear
+_TRAILING_QUANTITY = re.compile(
+    rf"""
+    [\s,(]
+    (?P<low>{_NUMBER})
+    (?:\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER}))?
+    (?:\s*(?P<unit>[^\W\d_][\w. ]{{0,15}}?))?
+    (?:\s*\))?$
+    """,
+    re.VERBOSE | re.IGNORECASE | re.DOTALL,
+)
+
+# Longer text is mapped without looking for a quantity
+MAX_PARSE_LENGTH = 500
+
+_FILLER = frozenset({"of", "x"})
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedText:
+    """Quantity, unit and item phrase extracted from a line of text."""
+
+    quantity: float | None
+    quantity_max: float | None
+    unit: str | None
+    unit_node_id: str | None
+    item: str
+
+
+def parse_number(token: str) -> float:
+    """
+    Parse a quantity token.
+
+    Accepts integers, decimals, fractions ("3/4"), mixed fractions
+    ("1 1/2") and unicode vulgar fractions alone or mixed ("1½").
+
+    Args:
+        token: Quantity token matched by the parser
+
+    Returns:
+        Numeric value
+
+    Raises:
+        ValueError: If a fraction has a zero denominator
+    """
+    token = token.strip()
+    if token[-1] in _VULGAR_FRACTIONS:
+        whole = token[:-1].strip()
+        return (float(whole) if whole else 0.0) + unicodedata.numeric(token[-1])
+    if "/" in token:
+        whole, _, fraction = token.rpartition(" ")
+        numerator, denominator = fraction.split("/")
+        if int(denominator) == 0:
+            raise ValueError(f"Zero denominator in quantity {token!r}")
+        value = int(numerator) / int(denominator)
+        return float(whole) + value if whole else value
+    return float(token)
+
+
+class QuantityParser:
+    """
+    Splits text into quantity, unit and item phrase.
+
+    Units are resolved against the labels and synonyms of the snapshot's
+    ``unit_of_measure`` nodes, including two-word units such as "fl oz".
+    Patterns are compiled once at import; parsing a line is at most two
+    regex matches plus a few dictionary lookups, and text longer than
+    ``MAX_PARSE_LENGTH`` is not parsed at all.
+    """
+
+    def __init__(self, units: dict[str, str]) -> None:
+        self._units = units
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "QuantityParser":
+        """Build a parser with the units of a snapshot."""
+        units: dict[str, str] = {}
+        for node in snapshot.in_category("unit_of_measure"):
+            for form in (normalize_text(node.label), *node.synonyms):
+                units.setdefault(form, node.id)
+        return cls(units)
+
+    def parse(self, text: str) -> ParsedText:
+        """
+        Parse one line of text.
+
+        Args:
+            text: Raw input such as "2 lbs apples" or "Milk 1-2 l"
+
+        Returns:
+            Parsed quantity, unit and item phrase; text whose quantity is not
+            a number, such as "1/0 apples", or that is longer than
+            ``MAX_PARSE_LENGTH`` is returned without a quantity
+        """
+        if len(text) > MAX_PARSE_LENGTH:
+            return ParsedText(None, None, None, None, " ".join(text.split()))
+        try:
+            match = _LEADING_QUANTITY.match(text)
+            if match is not None:
+                words = match["rest"].split()
+                unit, unit_node_id, consumed = self._match_unit(words)
+                if consumed or match["attached"] is None:
+                    words = words[consumed:]
+                    if words and words[0].lower() in _FILLER:
+                        words = words[1:]
+                    return self._parsed(match["low"], match["high"], unit, unit_node_id, words)
+
+            stripped = text.rstrip()
+            match = _TRAILING_QUANTITY.search(stripped)
+            if match is not None:
+                words = (match["unit"] or "").split()
+                unit, unit_node_id, consumed = self._match_unit(words)
+                if consumed == len(words):
+                    item = stripped[: match.start()].rstrip(" ,-(").split()
+                    return self._parsed(match["low"], match["high"], unit, unit_node_id, item)
+        except ValueError:
+            pass
+
+        return ParsedText(None, None, None, None, " ".join(text.split()))
+
+    def parse_many(self, texts: Iterable[str]) -> list[ParsedText]:
+        """
+        Parse many lines of text.
+
+        Args:
+            texts: Raw inputs
+
+        Returns:
+            Parsed results in input order
+        """
+        parse = self.parse
+        return [parse(text) for text in texts]
+
+    def _match_unit(self, words: list[str]) -> tuple[str | None, str | None, int]:
+        units = self._units
+        for size in (2, 1):
+            if len(words) >= size:
+                candidate = " ".join(words[:size])
+                node_id = units.get(candidate.lower()) or units.get(normalize_text(candidate))
+                if node_id is not None:
+                    return candidate, node_id, size
+        return None, None, 0
+
+    @staticmethod
+    def _parsed(
+        low: str,
+        high: str | None,
+        unit: str | None,
+        unit_node_id: str | None,
+        words: list[str],
+    ) -> ParsedText:
+        return ParsedText(
+            quantity=parse_number(low),
+            quantity_max=parse_number(high) if high else None,
+            unit=unit,
+            unit_node_id=unit_node_id,
+            item=" ".join(words),
+        )
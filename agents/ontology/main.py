@@ -1,17 +1,119 @@
 """Ontology Agent - Manages the canonical ontology graph."""
 
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import SQLAlchemyError
 
+from shared.ontology.embeddings import (
+    EmbeddingsUnavailableError,
+    search_vectors,
+    sync_pgvector,
+    uses_pgvector,
+)
+from shared.ontology.graph import RelationshipType, get_graph
+from shared.ontology.reload import (
+    ReleaseWatcher,
+    get_watch_interval,
+    notify_subscribers,
+    resolve_release_path,
+)
+from shared.ontology.snapshot import (
+    OntologySnapshot,
+    ReleaseValidationError,
+    ReloadResult,
+    get_snapshot_store,
+    leased_snapshot,
+)
 from shared.schemas.base import HealthResponse, OntologyNode
+from shared.utils.database import engine_lifespan, pool_metrics
+from shared.utils.http import DeadlineMiddleware
+from shared.utils.logging import RequestIdMiddleware, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router, span
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Load the ontology snapshot and its graph, watch the release, and own the database pool.
+
+    Catalogs searched with pgvector are synced to ``ontology.nodes`` in the background.
+    """
+    store = get_snapshot_store()
+    get_graph(store.current())
+    watcher = None
+    if get_watch_interval() > 0:
+        watcher = ReleaseWatcher(store, get_watch_interval(), on_reload=_announce)
+        watcher.start()
+    async with logging_lifespan(), engine_lifespan():
+        sync = asyncio.create_task(_sync_vectors(store.current()))
+        try:
+            yield
+        finally:
+            sync.cancel()
+            with suppress(asyncio.CancelledError):
+                await sync
+            if watcher is not None:
+                await watcher.stop()
+
 
 app = FastAPI(
     title="Ontology Agent",
     description="Manages the canonical ontology graph for food items, units, and properties",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.add_middleware(DeadlineMiddleware)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+
+async def _announce(result: ReloadResult) -> None:
+    get_graph(result.snapshot)
+    await notify_subscribers(result, get_snapshot_store().path)
+    await _sync_vectors(result.snapshot)
+
+
+async def _sync_vectors(snapshot: OntologySnapshot) -> None:
+    if not uses_pgvector(snapshot):
+        return
+    try:
+        if await sync_pgvector(snapshot):
+            logger.info("Synced %d node embeddings to pgvector", len(snapshot))
+    except (SQLAlchemyError, OSError, ValueError) as exc:
+        logger.warning("Syncing node embeddings to pgvector failed: %s", exc)
+
+
+# Query vectors accepted in one vector search request
+MAX_VECTOR_QUERIES = 256
+
+
+class ReloadRequest(BaseModel):
+    """Request to activate a release."""
+
+    path: str | None = Field(
+        None, description="Release file relative to the data directory (default: current)"
+    )
+    force: bool = Field(False, description="Reload even if the release checksum is unchanged")
+
+
+class VectorSearchRequest(BaseModel):
+    """Request for nearest-neighbour search over node embeddings."""
+
+    embeddings: list[list[float]] = Field(
+        ..., min_length=1, max_length=MAX_VECTOR_QUERIES, description="Query vectors"
+    )
+    category: str | None = Field(None, description="Filter by category")
+    limit: int = Field(10, ge=1, le=1000, description="Results per query")
 
 
 @app.get("/", response_model=HealthResponse)
@@ -34,10 +136,17 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
 @app.get("/api/v1/nodes", response_model=list[OntologyNode])
 async def list_nodes(
     category: str | None = None,
     limit: int = 100,
+    snapshot: OntologySnapshot = Depends(leased_snapshot),
 ) -> list[OntologyNode]:
     """
     List ontology nodes.
@@ -45,26 +154,143 @@ async def list_nodes(
     Args:
         category: Filter by category (food_item, unit_of_measure, property)
         limit: Maximum number of nodes to return
+        snapshot: Snapshot leased for this request
 
     Returns:
         List of ontology nodes
     """
-    # Stub implementation - will be enhanced with database queries
-    return []
+    if category is None:
+        records = snapshot.nodes[:limit]
+    else:
+        positions = snapshot.category_positions(category)[:limit]
+        records = tuple(snapshot.nodes[position] for position in positions)
+    return [record.to_model() for record in records]
 
 
 @app.get("/api/v1/nodes/{node_id}", response_model=OntologyNode)
-async def get_node(node_id: str) -> OntologyNode:
+async def get_node(
+    node_id: str, snapshot: OntologySnapshot = Depends(leased_snapshot)
+) -> OntologyNode:
     """
     Get a specific ontology node by ID.
 
     Args:
         node_id: Unique node identifier
+        snapshot: Snapshot leased for this request
 
     Returns:
         Ontology node details
     """
-    raise HTTPException(status_code=404, detail="Node not found")
+    record = snapshot.get(node_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return record.to_model()
+
+
+def _related(
+    snapshot: OntologySnapshot,
+    node_id: str,
+    relationship_type: str,
+    node_ids: list[str],
+    limit: int,
+) -> JSONResponse:
+    results = []
+    for related_id in node_ids[:limit]:
+        record = snapshot.get(related_id)
+        if record is not None:
+            results.append({"id": record.id, "label": record.label, "category": record.category})
+    return JSONResponse(
+        content={
+            "id": node_id,
+            "relationship_type": relationship_type,
+            "total": len(node_ids),
+            "results": results,
+        }
+    )
+
+
+@app.get("/api/v1/nodes/{node_id}/ancestors")
+async def get_ancestors(
+    node_id: str,
+    relationship_type: RelationshipType = "is_a",
+    limit: int = 1000,
+    snapshot: OntologySnapshot = Depends(leased_snapshot),
+) -> JSONResponse:
+    """
+    List every node a node reaches through a relationship type.
+
+    Args:
+        node_id: Unique node identifier
+        relationship_type: Relationship to follow from source to target
+        limit: Maximum number of nodes to return
+        snapshot: Snapshot leased for this request
+
+    Returns:
+        Ancestor nodes, nearest first
+    """
+    try:
+        ancestors = get_graph(snapshot).ancestors(node_id, relationship_type)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Node not found") from exc
+    return _related(snapshot, node_id, relationship_type, ancestors, limit)
+
+
+@app.get("/api/v1/nodes/{node_id}/descendants")
+async def get_descendants(
+    node_id: str,
+    relationship_type: RelationshipType = "is_a",
+    limit: int = 1000,
+    snapshot: OntologySnapshot = Depends(leased_snapshot),
+) -> JSONResponse:
+    """
+    List every node reaching a node through a relationship type.
+
+    For example, the descendants of "Dairy" under ``is_a``.
+
+    Args:
+        node_id: Unique node identifier
+        relationship_type: Relationship to follow from target to source
+        limit: Maximum number of nodes to return
+        snapshot: Snapshot leased for this request
+
+    Returns:
+        Descendant nodes
+    """
+    try:
+        descendants = get_graph(snapshot).descendants(node_id, relationship_type)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Node not found") from exc
+    return _related(snapshot, node_id, relationship_type, descendants, limit)
+
+
+@app.get("/api/v1/subsumes")
+async def subsumes(
+    ancestor_id: str,
+    descendant_id: str,
+    relationship_type: RelationshipType = "is_a",
+    snapshot: OntologySnapshot = Depends(leased_snapshot),
+) -> JSONResponse:
+    """
+    Check whether one node subsumes another, in O(1).
+
+    Args:
+        ancestor_id: Candidate ancestor node
+        descendant_id: Candidate descendant node
+        relationship_type: Relationship defining the hierarchy
+        snapshot: Snapshot leased for this request
+
+    Returns:
+        Whether ``ancestor_id`` is ``descendant_id`` or one of its ancestors
+    """
+    graph = get_graph(snapshot)
+    return JSONResponse(
+        content={
+            "ancestor_id": ancestor_id,
+            "descendant_id": descendant_id,
+            "relationship_type": relationship_type,
+            "subsumes": graph.subsumes(ancestor_id, descendant_id, relationship_type),
+        }
+    )
 
 
 @app.post("/api/v1/nodes", response_model=OntologyNode, status_code=201)
@@ -87,6 +313,7 @@ async def search_nodes(
     q: str,
     category: str | None = None,
     limit: int = 10,
+    snapshot: OntologySnapshot = Depends(leased_snapshot),
 ) -> JSONResponse:
     """
     Search ontology nodes by text query.
@@ -95,9 +322,92 @@ async def search_nodes(
         q: Search query
         category: Filter by category
         limit: Maximum results to return
+        snapshot: Snapshot leased for this request
 
     Returns:
         Search results with relevance scores
     """
-    # Stub implementation - will use vector similarity search
-    return JSONResponse(content={"results": [], "query": q})
+    # Exact label/synonym hits only; /api/v1/search/vector searches by embedding
+    hits = snapshot.lookup_synonym(q)
+    results = [
+        {"id": record.id, "label": record.label, "category": record.category, "score": 1.0}
+        for record in hits
+        if category is None or record.category == category
+    ]
+    return JSONResponse(content={"results": results[:limit], "query": q})
+
+
+@app.post("/api/v1/search/vector")
+async def search_nodes_by_vector(
+    request: VectorSearchRequest, snapshot: OntologySnapshot = Depends(leased_snapshot)
+) -> JSONResponse:
+    """
+    Search ontology nodes by embedding similarity.
+
+    All query vectors are scored in one batch against the in-process index;
+    catalogs too large for memory are searched with pgvector. Releases
+    without embeddings, or an unreachable database, are answered with 503.
+
+    Args:
+        request: Query vectors, category filter and result limit
+        snapshot: Snapshot leased for this request
+
+    Returns:
+        Results per query vector with cosine similarity scores
+    """
+    try:
+        queries = np.asarray(request.embeddings, dtype=np.float32)
+        with span("ontology.vector_search"):
+            hits = await search_vectors(snapshot, queries, request.limit, request.category)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except EmbeddingsUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    results = []
+    for query_hits in hits:
+        matches = []
+        for hit in query_hits:
+            record = snapshot.get(hit.node_id)
+            matches.append(
+                {
+                    "id": hit.node_id,
+                    "label": record.label if record else None,
+                    "category": record.category if record else None,
+                    "score": hit.score,
+                }
+            )
+        results.append(matches)
+    return JSONResponse(content={"results": results})
+
+
+@app.post("/api/v1/admin/reload")
+async def reload_release(request: ReloadRequest, background_tasks: BackgroundTasks) -> dict:
+    """
+    Build, validate and activate a release without a restart.
+
+    The next snapshot is built in a worker thread while requests keep being
+    served; in-flight requests finish on the snapshot they leased. Once
+    active, the other agents are notified in the background so they can
+    update their derived caches from the diff.
+
+    Args:
+        request: Release to load
+        background_tasks: Runs the subscriber notification after responding
+
+    Returns:
+        Reload summary with the diff against the previous release
+    """
+    store = get_snapshot_store()
+    try:
+        path = resolve_release_path(request.path)
+        result = await asyncio.to_thread(store.reload, path, request.force)
+    except ReleaseValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors) from exc
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Release not found") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result.changed:
+        background_tasks.add_task(_announce, result)
+    return result.to_dict()
@@ -0,0 +1,119 @@
+"""Coalescing of concurrent rerank requests into batches."""
+
+import asyncio
+import os
+from collections.abc import Callable, Sequence
+
+from agents.reranking.scoring import RerankGroup
+
+BATCH_WINDOW_MS = float(os.getenv("RERANKING_BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("RERANKING_BATCH_MAX_SIZE", "64"))
+
+Scorer = Callable[[Sequence[RerankGroup]], list[list[dict]]]
+
+_batcher: "MicroBatcher | None" = None
+
+
+class MicroBatcher:
+    """
+    Collects single-query requests for a short window and scores them together.
+
+    The first request of a batch starts a timer of ``window`` seconds; the
+    batch is scored when the timer fires or ``max_size`` requests are
+    waiting, whichever comes first. When a batch fails, its groups are
+    scored one by one, so only the requests whose group fails get the error.
+    """
+
+    def __init__(self, score: Scorer, window: float, max_size: int) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.score = score
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.requests = 0
+        self._loop = asyncio.get_running_loop()
+        self._pending: list[tuple[RerankGroup, asyncio.Future[list[dict]]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop the batcher schedules on."""
+        return self._loop
+
+    async def submit(self, group: RerankGroup) -> list[dict]:
+        """
+        Queue a group and wait for its batch to be scored.
+
+        Args:
+            group: Query with its candidates
+
+        Returns:
+            Reranked candidates of the group
+        """
+        future: asyncio.Future[list[dict]] = self._loop.create_future()
+        self._pending.append((group, future))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Score every waiting request now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        pending = [(group, future) for group, future in pending if not future.cancelled()]
+        if not pending:
+            return
+        self.batches += 1
+        self.requests += len(pending)
+        try:
+            results = self.score([group for group, _ in pending])
+        except Exception:
+            for group, future in pending:
+                try:
+                    future.set_result(self.score([group])[0])
+                except Exception as exc:
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(pending, results, strict=True):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """Get batch counters."""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "pending": len(self._pending),
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+        }
+
+
+def get_batcher(score: Scorer) -> MicroBatcher | None:
+    """
+    Get the batcher of the running event loop.
+
+    Args:
+        score: Function scoring a batch of groups
+
+    Returns:
+        Batcher, or None when ``RERANKING_BATCH_WINDOW_MS`` is 0
+    """
+    global _batcher
+    if BATCH_WINDOW_MS <= 0:
+        return None
+    if _batcher is None or _batcher.loop is not asyncio.get_running_loop():
+        _batcher = MicroBatcher(score, BATCH_WINDOW_MS / 1000, BATCH_MAX_SIZE)
+    return _batcher
+
+
+def shutdown_batcher() -> None:
+    """Score anything still waiting and drop the batcher."""
+    global _batcher
+    if _batcher is not None:
+        _batcher.flush()
+        _batcher = None
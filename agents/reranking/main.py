@@ -1,32 +1,122 @@
 """Reranking Agent - Improves search result relevance through reranking."""
 
+import logging
+import math
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
-from shared.schemas.base import HealthResponse
+from agents.reranking.batching import get_batcher, shutdown_batcher
+from agents.reranking.scoring import (
+    FEATURE_CACHE_SIZE,
+    RerankGroup,
+    TextFeatures,
+    rerank_many,
+    update_feature_cache,
+)
+from shared.ontology.reload import release_router
+from shared.ontology.snapshot import OntologySnapshot, get_snapshot_store, register_incremental
+from shared.schemas.base import HealthResponse, RerankRequest, RerankResponse
+from shared.utils.cache import LRUCache
+from shared.utils.database import engine_lifespan, pool_metrics
+from shared.utils.http import DeadlineMiddleware, register_local_handler
+from shared.utils.logging import Lazy, RequestIdMiddleware, limit_logger, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router, span
+
+logger = limit_logger(logging.getLogger(__name__))
+
+
+def get_feature_cache(snapshot: OntologySnapshot) -> LRUCache[TextFeatures]:
+    """Get the (query, node) lexical feature cache of a snapshot."""
+    return snapshot.derived("rerank_feature_cache", lambda _: LRUCache(FEATURE_CACHE_SIZE))
+
+
+def to_group(request: RerankRequest) -> RerankGroup:
+    """Convert a rerank request to a scoring group."""
+    context = request.context.model_dump(exclude_none=True) if request.context else None
+    return RerankGroup(request.query, request.candidates, context, request.top_k)
+
+
+def check_embeddings(request: RerankRequest, snapshot: OntologySnapshot) -> str | None:
+    """
+    Check candidate embeddings are numeric and as long as the query embedding.
+
+    Args:
+        request: Rerank request
+        snapshot: Snapshot whose node embeddings candidates fall back to
+
+    Returns:
+        Error message, or None when the embeddings can be scored
+    """
+    lengths = set()
+    for index, candidate in enumerate(request.candidates):
+        vector = candidate.get("embedding")
+        if vector is None:
+            continue
+        if not isinstance(vector, list) or not all(_is_finite_number(value) for value in vector):
+            return f"candidates[{index}].embedding must be a list of finite numbers"
+        lengths.add(len(vector))
+    query_embedding = request.context.query_embedding if request.context else None
+    if query_embedding is None:
+        return None
+    if snapshot.embeddings is not None:
+        lengths.add(snapshot.embeddings.shape[1])
+    wrong = sorted(length for length in lengths if length != len(query_embedding))
+    if wrong:
+        return f"query_embedding has {len(query_embedding)} dimensions, candidates have {wrong[0]}"
+    return None
+
+
+def _is_finite_number(value: object) -> bool:
+    return isinstance(value, int | float) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def score_groups(groups: Sequence[RerankGroup]) -> list[list[dict]]:
+    """Rerank groups against the active snapshot in one pass."""
+    snapshot = get_snapshot_store().current()
+    with span("reranking.rerank"):
+        return rerank_many(groups, snapshot, get_feature_cache(snapshot))
+
+
+register_incremental("rerank_feature_cache", update_feature_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own the shared database pool and flush waiting rerank requests on shutdown."""
+    try:
+        async with logging_lifespan(), engine_lifespan():
+            yield
+    finally:
+        shutdown_batcher()
+
 
 app = FastAPI(
     title="Reranking Agent",
     description="Improves search result relevance through reranking",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.include_router(release_router)
+app.add_middleware(DeadlineMiddleware)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 
-class RerankRequest(BaseModel):
-    """Request for reranking results."""
+class BatchRerankRequest(BaseModel):
+    """Many reranking requests scored in one call."""
 
-    query: str = Field(..., description="Original search query")
-    candidates: list[dict] = Field(..., description="Candidate results to rerank")
-    context: dict | None = Field(None, description="Additional context")
+    requests: list[RerankRequest] = Field(..., min_length=1, description="Queries to rerank")
 
 
-class RerankResponse(BaseModel):
-    """Response from reranking."""
+class BatchRerankResponse(BaseModel):
+    """Reranked results per query, in request order."""
 
-    query: str
-    reranked_results: list[dict] = Field(..., description="Reranked results")
+    results: list[RerankResponse]
 
 
 @app.get("/", response_model=HealthResponse)
@@ -49,19 +139,73 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
+@app.get("/metrics/batching")
+async def batching_metrics() -> dict:
+    """Micro-batching counters for single-query rerank requests."""
+    batcher = get_batcher(score_groups)
+    return batcher.stats() if batcher is not None else {"enabled": False}
+
+
 @app.post("/api/v1/rerank", response_model=RerankResponse)
 async def rerank_results(request: RerankRequest) -> RerankResponse:
     """
     Rerank search results to improve relevance.
 
+    Candidates are scored on lexical overlap with the query, exact synonym
+    matches, a category prior from the context and embedding similarity.
+    Concurrent requests arriving within ``RERANKING_BATCH_WINDOW_MS`` are
+    scored together.
+
     Args:
         request: Reranking request with query and candidates
 
     Returns:
         Reranked results
     """
-    # Stub implementation - will use advanced scoring algorithms
-    return RerankResponse(
-        query=request.query,
-        reranked_results=request.candidates,
+    error = check_embeddings(request, get_snapshot_store().current())
+    if error is not None:
+        raise HTTPException(status_code=422, detail=error)
+    batcher = get_batcher(score_groups)
+    group = to_group(request)
+    results = await batcher.submit(group) if batcher is not None else score_groups([group])[0]
+    logger.debug(
+        "Reranked %d candidates for %r: %s",
+        len(results),
+        request.query,
+        Lazy(lambda: [(r.get("id"), r.get("rerank_score")) for r in results[:3]]),
+    )
+    return RerankResponse(query=request.query, reranked_results=results)
+
+
+register_local_handler("reranking", "/api/v1/rerank", rerank_results)
+
+
+@app.post("/api/v1/rerank/batch", response_model=BatchRerankResponse)
+async def rerank_batch(request: BatchRerankRequest) -> BatchRerankResponse:
+    """
+    Rerank the candidates of many queries in one call.
+
+    Args:
+        request: Queries with their candidates
+
+    Returns:
+        Reranked results per query, in request order
+    """
+    snapshot = get_snapshot_store().current()
+    for index, item in enumerate(request.requests):
+        error = check_embeddings(item, snapshot)
+        if error is not None:
+            raise HTTPException(status_code=422, detail=f"requests[{index}]: {error}")
+    results = score_groups([to_group(item) for item in request.requests])
+    return BatchRerankResponse(
+        results=[
+            RerankResponse(query=item.query, reranked_results=reranked)
+            for item, reranked in zip(request.requests, results, strict=True)
+        ]
     )
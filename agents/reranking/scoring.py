@@ -0,0 +1,257 @@
+"""Feature-based candidate scoring for the Reranking Agent."""
+
+import os
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from shared.ontology.snapshot import NodeRecord, OntologySnapshot, SnapshotDiff
+from shared.ontology.text import normalize_text, trigrams
+from shared.utils.cache import LRUCache
+
+FEATURE_CACHE_SIZE = int(os.getenv("RERANKING_FEATURE_CACHE_SIZE", "65536"))
+
+FEATURES = (
+    "token_overlap",
+    "trigram_similarity",
+    "synonym_match",
+    "category_prior",
+    "embedding_cosine",
+)
+WEIGHTS = np.array([0.3, 0.2, 0.25, 0.1, 0.15], dtype=np.float64)
+
+TextFeatures = tuple[float, float, float]
+
+
+@dataclass(frozen=True, slots=True)
+class RerankGroup:
+    """One query with the candidates to rerank for it."""
+
+    query: str
+    candidates: Sequence[dict]
+    context: dict | None = None
+    top_k: int | None = None
+
+
+def text_features(query: str, forms: Iterable[str]) -> TextFeatures:
+    """
+    Lexical features of one candidate for a normalized query.
+
+    Each feature is the best value over the candidate's surface forms.
+
+    Args:
+        query: Normalized query text
+        forms: Normalized label and synonyms of the candidate
+
+    Returns:
+        Share of query tokens found in a form, trigram Jaccard similarity,
+        and 1.0 when the query equals a form exactly
+    """
+    query_tokens = set(query.split())
+    query_grams = trigrams(query)
+    overlap = similarity = 0.0
+    for form in forms:
+        if form == query:
+            return 1.0, 1.0, 1.0
+        if query_tokens:
+            overlap = max(overlap, len(query_tokens.intersection(form.split())) / len(query_tokens))
+        grams = trigrams(form)
+        union = len(query_grams | grams)
+        if union:
+            similarity = max(similarity, len(query_grams & grams) / union)
+    return overlap, similarity, 0.0
+
+
+def _forms(candidate: dict, node: NodeRecord | None) -> tuple[str, ...]:
+    if node is not None:
+        return (normalize_text(node.label), *node.synonyms)
+    forms = [candidate.get("label") or "", *(candidate.get("synonyms") or ())]
+    return tuple(form for form in map(normalize_text, forms) if form)
+
+
+def _category_priors(context: dict | None) -> dict[str, float]:
+    context = context or {}
+    priors = context.get("category_priors")
+    if isinstance(priors, dict):
+        return {str(category): float(prior) for category, prior in priors.items()}
+    category = context.get("category")
+    return {category: 1.0} if isinstance(category, str) else {}
+
+
+def _embedding_cosines(
+    query_embedding: Sequence[float] | None,
+    candidates: Sequence[dict],
+    positions: Sequence[int | None],
+    snapshot: OntologySnapshot,
+) -> np.ndarray:
+    cosines = np.zeros(len(candidates), dtype=np.float64)
+    if query_embedding is None:
+        return cosines
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if query.ndim != 1 or norm == 0:
+        return cosines
+
+    matrix = np.zeros((len(candidates), len(query)), dtype=np.float32)
+    for row, (candidate, position) in enumerate(zip(candidates, positions, strict=True)):
+        vector = candidate.get("embedding")
+        if vector is None and position is not None and snapshot.embeddings is not None:
+            vector = snapshot.embeddings[position]
+        if vector is not None and len(vector) == len(query):
+            matrix[row] = vector
+    norms = np.linalg.norm(matrix, axis=1)
+    present = norms > 0
+    cosines[present] = (matrix[present] @ query) / (norms[present] * norm)
+    return cosines
+
+
+def candidate_features(
+    query: str,
+    candidates: Sequence[dict],
+    context: dict | None,
+    snapshot: OntologySnapshot,
+    cache: LRUCache[TextFeatures] | None = None,
+) -> np.ndarray:
+    """
+    Compute the feature matrix for a candidate list.
+
+    Lexical features of candidates that are nodes of ``snapshot`` are
+    memoized per (normalized query, node id); the context-dependent
+    features are computed for the whole list at once.
+
+    Args:
+        query: Raw query text
+        candidates: Candidates with an ``id`` and optionally ``label``,
+            ``synonyms``, ``category`` and ``embedding``
+        context: Optional ``category``, ``category_priors`` and ``query_embedding``
+        snapshot: Ontology snapshot the candidates come from
+        cache: Memo of lexical features
+
+    Returns:
+        Array of shape (len(candidates), len(FEATURES))
+    """
+    normalized = normalize_text(query)
+    features = np.zeros((len(candidates), len(FEATURES)), dtype=np.float64)
+    positions: list[int | None] = []
+    categories: list[str | None] = []
+    for row, candidate in enumerate(candidates):
+        node_id = candidate.get("id")
+        position = snapshot.position(node_id) if isinstance(node_id, str) else None
+        node = snapshot.nodes[position] if position is not None else None
+        positions.append(position)
+        categories.append(node.category if node is not None else candidate.get("category"))
+
+        key = (normalized, node_id)
+        cached = cache.get(key) if cache is not None and node is not None else None
+        if cached is None:
+            cached = text_features(normalized, _forms(candidate, node))
+            if cache is not None and node is not None:
+                cache.put(key, cached)
+        features[row, :3] = cached
+
+    priors = _category_priors(context)
+    if priors:
+        features[:, 3] = [priors.get(category, 0.0) if category else 0.0 for category in categories]
+    query_embedding = (context or {}).get("query_embedding")
+    features[:, 4] = _embedding_cosines(query_embedding, candidates, positions, snapshot)
+    return features
+
+
+def top_k_order(scores: np.ndarray, k: int | None = None) -> np.ndarray:
+    """
+    Indices of the best scores, best first.
+
+    When ``k`` is smaller than the list, the top k are selected with
+    ``argpartition`` and only they are sorted. Ties keep input order.
+
+    Args:
+        scores: Score per candidate
+        k: Number of indices to return, or None for all
+
+    Returns:
+        Indices into ``scores``
+    """
+    if k is None or k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def rerank_many(
+    groups: Sequence[RerankGroup],
+    snapshot: OntologySnapshot,
+    cache: LRUCache[TextFeatures] | None = None,
+) -> list[list[dict]]:
+    """
+    Rerank the candidates of many queries at once.
+
+    The feature matrices of all groups are stacked and scored with a single
+    product; each group is then cut to its ``top_k``.
+
+    Args:
+        groups: Queries with their candidates
+        snapshot: Ontology snapshot the candidates come from
+        cache: Memo of lexical features
+
+    Returns:
+        Reranked candidates per group, in input order
+    """
+    if not groups:
+        return []
+    features = [
+        candidate_features(group.query, group.candidates, group.context, snapshot, cache)
+        for group in groups
+    ]
+    scores = np.concatenate(features) @ WEIGHTS
+    bounds = np.cumsum([len(matrix) for matrix in features])[:-1]
+    return [
+        [
+            {**group.candidates[index], "rerank_score": round(float(group_scores[index]), 4)}
+            for index in top_k_order(group_scores, group.top_k).tolist()
+        ]
+        for group, group_scores in zip(groups, np.split(scores, bounds), strict=True)
+    ]
+
+
+def rerank(
+    query: str,
+    candidates: Sequence[dict],
+    context: dict | None,
+    snapshot: OntologySnapshot,
+    cache: LRUCache[TextFeatures] | None = None,
+    top_k: int | None = None,
+) -> list[dict]:
+    """
+    Order candidates by a weighted sum of their features.
+
+    Args:
+        query: Raw query text
+        candidates: Candidates to rerank
+        context: Optional scoring context, see ``candidate_features``
+        snapshot: Ontology snapshot the candidates come from
+        cache: Memo of lexical features
+        top_k: Return only the k best candidates
+
+    Returns:
+        Copies of the candidates with a ``rerank_score``, best first
+    """
+    return rerank_many([RerankGroup(query, candidates, context, top_k)], snapshot, cache)[0]
+
+
+def update_feature_cache(
+    cache: LRUCache[TextFeatures],
+    diff: SnapshotDiff,
+    previous: OntologySnapshot,
+    snapshot: OntologySnapshot,
+) -> LRUCache[TextFeatures] | None:
+    """Keep memoized features when no existing node's label or synonyms changed."""
+    if diff.removed:
+        return None
+    for node_id in diff.changed:
+        old, new = previous.get(node_id), snapshot.get(node_id)
+        if old is None or new is None or (old.label, old.synonyms) != (new.label, new.synonyms):
+            return None
+    return cache
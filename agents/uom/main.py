@@ -1,17 +1,88 @@
 """UoM Agent - Handles unit of measure conversions and normalization."""
 
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, Field, ValidationError
 
+from shared.ontology.reload import release_router
+from shared.ontology.snapshot import (
+    OntologySnapshot,
+    SnapshotDiff,
+    get_snapshot_store,
+    register_incremental,
+)
+from shared.ontology.units import (
+    IncompatibleUnitsError,
+    MissingItemDataError,
+    Unit,
+    UnitTable,
+    UnknownUnitError,
+    item_factor,
+)
 from shared.schemas.base import HealthResponse
+from shared.utils.cache import LRUCache
+from shared.utils.database import engine_lifespan, pool_metrics
+from shared.utils.http import DeadlineMiddleware
+from shared.utils.logging import RequestIdMiddleware, logging_lifespan
+from shared.utils.metrics import MetricsMiddleware, metrics_router
+
+ITEM_FACTOR_CACHE_SIZE = int(os.getenv("UOM_ITEM_FACTOR_CACHE_SIZE", "65536"))
+
+
+def get_unit_table() -> UnitTable:
+    """Get the unit table compiled from the active ontology snapshot."""
+    return get_snapshot_store().current().derived("unit_table", UnitTable.from_snapshot)
+
+
+def get_item_factor_cache() -> LRUCache[float]:
+    """Get the (item, from_unit, to_unit) factor cache of the active snapshot."""
+    return (
+        get_snapshot_store()
+        .current()
+        .derived("item_factor_cache", lambda _: LRUCache(ITEM_FACTOR_CACHE_SIZE))
+    )
+
+
+def _update_item_factor_cache(
+    cache: LRUCache[float],
+    diff: SnapshotDiff,
+    previous: OntologySnapshot,
+    snapshot: OntologySnapshot,
+) -> LRUCache[float] | None:
+    """Keep cached factors when the release only adds nodes that are not units."""
+    if diff.removed or diff.changed or diff.touches_category("unit_of_measure", previous, snapshot):
+        return None
+    return cache
+
+
+register_incremental("unit_table", UnitTable.updated)
+register_incremental("item_factor_cache", _update_item_factor_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Compile the unit table and own the shared database pool."""
+    get_unit_table()
+    async with logging_lifespan(), engine_lifespan():
+        yield
+
 
 app = FastAPI(
     title="UoM Agent",
     description="Handles unit of measure conversions and normalization",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.include_router(release_router)
+app.add_middleware(DeadlineMiddleware)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 
 class ConversionRequest(BaseModel):
@@ -20,6 +91,9 @@ class ConversionRequest(BaseModel):
     value: float = Field(..., description="Value to convert")
     from_unit: str = Field(..., description="Source unit")
     to_unit: str = Field(..., description="Target unit")
+    ontology_node_id: str | None = Field(
+        None, description="Item being measured, enabling mass/volume/count conversion"
+    )
 
 
 class ConversionResponse(BaseModel):
@@ -31,6 +105,41 @@ class ConversionResponse(BaseModel):
     converted_unit: str
 
 
+class BatchConversionRequest(BaseModel):
+    """Columnar request converting many values at once."""
+
+    values: list[float] = Field(..., description="Values to convert")
+    from_units: list[str] | str = Field(..., description="Source unit per value, or one unit")
+    to_units: list[str] | str = Field(..., description="Target unit per value, or one unit")
+
+
+class BatchConversionResponse(BaseModel):
+    """Columnar response from batch conversion."""
+
+    values: list[float | None] = Field(..., description="Converted values, null on error")
+    errors: list[dict] = Field(default_factory=list, description="Per-row conversion errors")
+
+
+class UnitDefinition(BaseModel):
+    """Definition of a unit relative to a base unit."""
+
+    id: str = Field(..., description="Unit identifier")
+    label: str = Field(..., description="Human-readable label")
+    dimension: str = Field(..., description="Physical dimension (mass, volume, length, count)")
+    base_unit: str | None = Field(None, description="Unit this one is defined against")
+    conversion_factor: float = Field(1.0, gt=0, description="Base units per one of this unit")
+    synonyms: list[str] = Field(default_factory=list, description="Alternative names")
+
+
+def _unit_to_dict(unit: Unit) -> dict:
+    return {
+        "id": unit.id,
+        "label": unit.label,
+        "dimension": unit.dimension,
+        "to_base": unit.to_base,
+    }
+
+
 @app.get("/", response_model=HealthResponse)
 async def root() -> HealthResponse:
     """Root endpoint returning service health."""
@@ -51,6 +160,12 @@ async def health() -> HealthResponse:
     )
 
 
+@app.get("/metrics/db")
+async def database_metrics() -> dict:
+    """Connection pool metrics for this service."""
+    return pool_metrics()
+
+
 @app.post("/api/v1/convert", response_model=ConversionResponse)
 async def convert_unit(request: ConversionRequest) -> ConversionResponse:
     """
@@ -62,15 +177,89 @@ async def convert_unit(request: ConversionRequest) -> ConversionResponse:
     Returns:
         Converted value
     """
-    # Stub implementation - will use ontology unit definitions
+    try:
+        if request.ontology_node_id is None:
+            factor = get_unit_table().factor(request.from_unit, request.to_unit)
+        else:
+            factor = _item_factor(request.ontology_node_id, request.from_unit, request.to_unit)
+    except (UnknownUnitError, IncompatibleUnitsError, MissingItemDataError) as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
     return ConversionResponse(
         original_value=request.value,
         original_unit=request.from_unit,
-        converted_value=request.value,
+        converted_value=request.value * factor,
         converted_unit=request.to_unit,
     )
 
 
+def _item_factor(node_id: str, from_unit: str, to_unit: str) -> float:
+    cache = get_item_factor_cache()
+    key = (node_id, from_unit, to_unit)
+    factor = cache.get(key)
+    if factor is None:
+        node = get_snapshot_store().current().get(node_id)
+        if node is None:
+            raise HTTPException(status_code=404, detail=f"Unknown ontology node: {node_id}")
+        factor = item_factor(get_unit_table(), node, from_unit, to_unit)
+        cache.put(key, factor)
+    return factor
+
+
+@app.post("/api/v1/convert/batch", response_model=BatchConversionResponse)
+async def convert_batch(
+    request: Request,
+    from_unit: str | None = None,
+    to_unit: str | None = None,
+) -> BatchConversionResponse | Response:
+    """
+    Convert a column of values in one vectorized pass.
+
+    The body is either a JSON ``BatchConversionRequest`` with parallel arrays,
+    or, with ``Content-Type: application/octet-stream``, packed little-endian
+    float64 values converted from ``from_unit`` to ``to_unit`` (query
+    parameters). Binary requests get a packed float64 body back, with NaN for
+    rows that failed and the failure count in ``X-Conversion-Errors``.
+
+    Args:
+        request: Raw HTTP request carrying the batch body
+        from_unit: Source unit for binary bodies
+        to_unit: Target unit for binary bodies
+
+    Returns:
+        Converted values and per-row errors
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/octet-stream"):
+        if from_unit is None or to_unit is None:
+            raise HTTPException(status_code=422, detail="from_unit and to_unit are required")
+        if len(body) % 8:
+            raise HTTPException(status_code=422, detail="Body is not packed float64 values")
+        result = get_unit_table().convert_many(np.frombuffer(body, dtype="<f8"), from_unit, to_unit)
+        return Response(
+            content=result.values.astype("<f8").tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Conversion-Errors": str(len(result.errors))},
+        )
+
+    try:
+        batch = BatchConversionRequest.model_validate_json(body)
+        result = get_unit_table().convert_many(
+            np.asarray(batch.values), batch.from_units, batch.to_units
+        )
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    converted = result.values.tolist()
+    for row in result.errors:
+        converted[row] = None
+    return BatchConversionResponse(
+        values=converted,
+        errors=[{"index": row, "error": error} for row, error in result.errors.items()],
+    )
+
+
 @app.get("/api/v1/units")
 async def list_units(dimension: str | None = None) -> dict:
     """
@@ -82,5 +271,32 @@ async def list_units(dimension: str | None = None) -> dict:
     Returns:
         List of available units
     """
-    # Stub implementation
-    return {"units": []}
+    return {"units": [_unit_to_dict(unit) for unit in get_unit_table().units(dimension)]}
+
+
+@app.post("/api/v1/units", status_code=201)
+async def add_unit(definition: UnitDefinition) -> dict:
+    """
+    Add or update a unit in this process's conversion table.
+
+    Only the new unit's row and column of the factor table are computed.
+
+    Args:
+        definition: Unit definition
+
+    Returns:
+        The resolved unit
+    """
+    try:
+        unit = get_unit_table().add_unit(
+            unit_id=definition.id,
+            label=definition.label,
+            dimension=definition.dimension,
+            base_unit=definition.base_unit,
+            conversion_factor=definition.conversion_factor,
+            aliases=(definition.label, *definition.synonyms),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    get_item_factor_cache().clear()
+    return _unit_to_dict(unit)
@@ -0,0 +1,109 @@
+"""
+Benchmark the Conformance Agent's compiled node validator.
+
+Validates a reproducible corpus of nodes (valid and invalid) derived from the
+golden release with the compiled validator and, when ``jsonschema`` is
+installed, with a generic jsonschema validator enforcing the same rules.
+
+Usage:
+    python -m benchmarks.bench_conformance --nodes 200000
+"""
+
+import argparse
+import copy
+import json
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+from agents.conformance.rules import ATTRIBUTE_DICTIONARY, NODE_REF, RELEASES_DIR, get_validator
+from shared.ontology.release import load_release
+
+_CORRUPTIONS: list[Callable[[dict], None]] = [
+    lambda node: node.pop("label"),
+    lambda node: node.update(category="beverage"),
+    lambda node: node.setdefault("attributes", {}).update(shelf_life_days=-3),
+    lambda node: node.setdefault("attributes", {}).update(storage_temp="warm"),
+    lambda node: node.update(synonyms=["ok", 7]),
+]
+
+
+def generate_corpus(nodes: int, invalid_ratio: float = 0.2, seed: int = 42) -> list[dict]:
+    """
+    Generate node documents, a share of them with one rule violation.
+
+    Args:
+        nodes: Number of nodes
+        invalid_ratio: Share of nodes to corrupt
+        seed: Random seed for reproducibility
+
+    Returns:
+        Generated nodes
+    """
+    golden = load_release().nodes
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(nodes):
+        node = copy.deepcopy(rng.choice(golden))
+        node["id"] = f"{node['id']}_{index}"
+        if rng.random() < invalid_ratio:
+            rng.choice(_CORRUPTIONS)(node)
+        corpus.append(node)
+    return corpus
+
+
+def reference_schema() -> dict:
+    """
+    The node schema with the attribute dictionary inlined, for jsonschema.
+
+    Returns:
+        A draft-07 schema equivalent to the compiled node validator
+    """
+    document = json.loads((RELEASES_DIR / "ontology_v1.schema.json").read_text())
+    dictionary = json.loads((RELEASES_DIR / ATTRIBUTE_DICTIONARY).read_text())
+    schema: dict[str, Any] = dict(document["definitions"]["OntologyNode"])
+    schema["allOf"] = [
+        {
+            "if": {"properties": {"category": {"const": category}}},
+            "then": {"properties": {"attributes": {"properties": spec["attributes"]}}},
+        }
+        for category, spec in dictionary["categories"].items()
+    ]
+    return schema
+
+
+def _measure(name: str, validate: Callable[[dict], bool], corpus: list[dict]) -> float:
+    start = time.perf_counter()
+    invalid = sum(1 for node in corpus if not validate(node))
+    elapsed = time.perf_counter() - start
+    throughput = len(corpus) / elapsed
+    print(f"{name:<12} {elapsed:8.2f}s {throughput:14,.0f} nodes/s {invalid:10,} invalid")
+    return throughput
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=200_000, help="Corpus size")
+    parser.add_argument("--invalid-ratio", type=float, default=0.2, help="Share of bad nodes")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.nodes, args.invalid_ratio, args.seed)
+    validator = get_validator(NODE_REF)
+    compiled = _measure("compiled", lambda node: not validator(node)[0], corpus)
+
+    try:
+        import jsonschema
+    except ImportError:
+        print("jsonschema is not installed; skipping the generic validator")
+        return
+
+    generic = jsonschema.Draft7Validator(reference_schema())
+    baseline = _measure("jsonschema", generic.is_valid, corpus)
+    print(f"speedup:     {compiled / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
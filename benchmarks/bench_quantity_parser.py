@@ -0,0 +1,72 @@
+"""
+Benchmark the Mapping Agent's quantity/unit parser.
+
+Generates a reproducible corpus of noisy lines from the golden release and
+measures bulk parsing throughput.
+
+Usage:
+    python -m benchmarks.bench_quantity_parser --lines 1000000
+"""
+
+import argparse
+import random
+import time
+
+from agents.mapping.parser import QuantityParser
+from shared.ontology.snapshot import get_snapshot_store
+
+_QUANTITIES = ["2", "1 1/2", "½", "1½", "3/4", "0.25", "12", "2-3", "2 to 3", ".5"]
+_LEADING = ["{q} {u} {i}", "{q}{u} {i}", "{q} {u} of {i}", "{q} {i}", "{i}"]
+_TRAILING = ["{i} {q} {u}", "{i}, {q}{u}", "{i} ({q} {u})"]
+
+
+def generate_corpus(lines: int, seed: int = 42) -> list[str]:
+    """
+    Generate noisy item lines such as "1 1/2 lbs boneless chicken".
+
+    Args:
+        lines: Number of lines
+        seed: Random seed for reproducibility
+
+    Returns:
+        Generated lines
+    """
+    snapshot = get_snapshot_store().current()
+    items = [form for node in snapshot.in_category("food_item") for form in node.synonyms]
+    units = [form for node in snapshot.in_category("unit_of_measure") for form in node.synonyms]
+    templates = _LEADING + _TRAILING
+    rng = random.Random(seed)
+    return [
+        rng.choice(templates).format(
+            q=rng.choice(_QUANTITIES), u=rng.choice(units), i=rng.choice(items)
+        )
+        for _ in range(lines)
+    ]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=1_000_000, help="Corpus size")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.lines, args.seed)
+    quantity_parser = QuantityParser.from_snapshot(get_snapshot_store().current())
+
+    start = time.perf_counter()
+    parsed = quantity_parser.parse_many(corpus)
+    elapsed = time.perf_counter() - start
+
+    with_quantity = sum(1 for result in parsed if result.quantity is not None)
+    with_unit = sum(1 for result in parsed if result.unit_node_id is not None)
+    print(f"lines:          {len(corpus):,}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"throughput:     {len(corpus) / elapsed:,.0f} lines/s")
+    print(f"mean latency:   {elapsed / len(corpus) * 1e6:.2f}us")
+    print(f"with quantity:  {with_quantity / len(corpus):.1%}")
+    print(f"with unit:      {with_unit / len(corpus):.1%}")
+
+
+if __name__ == "__main__":
+    main()
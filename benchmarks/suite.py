@@ -0,0 +1,373 @@
+"""
+Load and latency benchmark of every agent, in-process and over HTTP.
+
+Generates a synthetic release and a noisy corpus, serves all agents from
+the combined app, and drives one endpoint per agent with concurrent
+requests: in-process through the ASGI interface, and over HTTP against a
+uvicorn server started for the run. Throughput, p50/p95/p99 latency and
+peak RSS are written to a JSON report and compared against a baseline.
+
+Usage:
+    python -m benchmarks.suite --nodes 100000 --compare benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+
+from agents.conformance.rules import NODE_REF
+from benchmarks.synthetic import generate_release, noisy_corpus, write_release
+from shared.ontology.release import Release
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# Throughput may drop and p95 latency may grow by this share before a result
+# counts as a regression; runs on shared CI hardware are noisy
+DEFAULT_TOLERANCE = 0.25
+
+Call = tuple[str, str, dict[str, Any]]
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """One endpoint of one agent and how to build its requests."""
+
+    name: str
+    build: Callable[[random.Random], Call]
+    needs_database: bool = False
+
+
+def scenarios(release: Release, corpus: list[str]) -> list[Scenario]:
+    """
+    Requests per agent, drawn from the release and the corpus.
+
+    Args:
+        release: Release the agents serve
+        corpus: Noisy item lines
+
+    Returns:
+        One scenario per agent endpoint
+    """
+    foods = [node for node in release.nodes if node["category"] == "food_item"]
+    units = [node for node in release.nodes if node["category"] == "unit_of_measure"]
+    by_dimension: dict[str, list[str]] = {}
+    for unit in units:
+        by_dimension.setdefault(unit["attributes"]["dimension"], []).append(unit["id"])
+    pairs = [(a, b) for ids in by_dimension.values() for a in ids for b in ids]
+
+    def node(rng: random.Random) -> Call:
+        return "GET", f"/ontology/api/v1/nodes/{rng.choice(foods)['id']}", {}
+
+    def search(rng: random.Random) -> Call:
+        return "GET", "/ontology/api/v1/search", {"params": {"q": rng.choice(corpus)}}
+
+    def map_text(rng: random.Random) -> Call:
+        return "POST", "/mapping/api/v1/map", {"json": {"text": rng.choice(corpus)}}
+
+    def convert(rng: random.Random) -> Call:
+        source, target = rng.choice(pairs)
+        body = {"value": rng.uniform(0.1, 100), "from_unit": source, "to_unit": target}
+        return "POST", "/uom/api/v1/convert", {"json": body}
+
+    def rerank(rng: random.Random) -> Call:
+        candidates = [{"id": item["id"]} for item in rng.sample(foods, min(20, len(foods)))]
+        body = {"query": rng.choice(corpus), "candidates": candidates, "top_k": 5}
+        return "POST", "/reranking/api/v1/rerank", {"json": body}
+
+    def validate(rng: random.Random) -> Call:
+        body = {"data": rng.choice(foods), "schema_ref": NODE_REF}
+        return "POST", "/conformance/api/v1/validate", {"json": body}
+
+    def totals(rng: random.Random) -> Call:
+        params = {"node_id": rng.choice(foods)["id"], "unit": "unit_001"}
+        return "GET", "/inventory/api/v1/inventory/totals", {"params": params}
+
+    return [
+        Scenario("ontology.get_node", node),
+        Scenario("ontology.search", search),
+        Scenario("mapping.map", map_text),
+        Scenario("uom.convert", convert),
+        Scenario("reranking.rerank", rerank),
+        Scenario("conformance.validate", validate),
+        Scenario("inventory.totals", totals, needs_database=True),
+    ]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    warmup: int = 50,
+) -> dict[str, Any]:
+    """
+    Send requests of a scenario from ``concurrency`` workers.
+
+    Args:
+        client: Client bound to the combined app
+        scenario: Endpoint to drive
+        requests: Measured requests
+        concurrency: Requests in flight at a time
+        seed: Random seed of the request stream
+        warmup: Unmeasured requests sent first
+
+    Returns:
+        Request count, errors, throughput and latency percentiles in milliseconds
+    """
+    rng = random.Random(seed)
+    calls = [scenario.build(rng) for _ in range(warmup + requests)]
+    for method, path, kwargs in calls[:warmup]:
+        await client.request(method, path, **kwargs)
+
+    pending = iter(calls[warmup:])
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, path, kwargs in pending:
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": round(requests / elapsed, 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient, selected: list[Scenario], args: argparse.Namespace
+) -> dict[str, Any]:
+    """Drive every selected scenario in turn and print a line per result."""
+    results = {}
+    for index, scenario in enumerate(selected):
+        result = await drive(client, scenario, args.requests, args.concurrency, args.seed + index)
+        print(
+            f"  {scenario.name:<22} {result['throughput']:>10,.0f} req/s"
+            f"  p50 {result['p50_ms']:7.2f}ms  p95 {result['p95_ms']:7.2f}ms"
+            f"  p99 {result['p99_ms']:7.2f}ms  errors {result['errors']}"
+        )
+        results[scenario.name] = result
+    return results
+
+
+async def run_inprocess(selected: list[Scenario], args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Drive the combined app through its ASGI interface, without sockets.
+
+    Returns:
+        Results per scenario and the peak RSS of this process in MB
+    """
+    from agents.combined.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = await run_scenarios(client, selected, args)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"scenarios": results, "peak_rss_mb": round(peak / scale, 1)}
+
+
+@asynccontextmanager
+async def uvicorn_server(env: dict[str, str]) -> AsyncIterator[tuple[str, int]]:
+    """
+    Serve the combined app from a uvicorn subprocess on a free port.
+
+    Yields:
+        Base URL and process id of the server
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    command = [sys.executable, "-m", "uvicorn", "agents.combined.main:app"]
+    command += ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    process = subprocess.Popen(command, env=env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=url) as client:
+            for _ in range(600):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError("The benchmark server exited during startup")
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("The benchmark server did not start within 60s")
+        yield url, process.pid
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Peak resident set size of a process in MB, 0 where /proc is unavailable."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return 0.0
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+async def run_http(selected: list[Scenario], args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Drive the combined app over HTTP on the loopback interface.
+
+    Returns:
+        Results per scenario and the peak RSS of the server process in MB
+    """
+    async with uvicorn_server(dict(os.environ)) as (url, pid):
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            results = await run_scenarios(client, selected, args)
+        peak = peak_rss_mb(pid)
+    return {"scenarios": results, "peak_rss_mb": peak}
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """
+    Find results that are worse than the baseline beyond ``tolerance``.
+
+    Only results present in both reports are compared.
+
+    Args:
+        report: Report of this run
+        baseline: Report to compare against
+        tolerance: Allowed relative throughput drop and p95 latency growth
+
+    Returns:
+        One description per regression
+    """
+    regressions = []
+    for mode, run in report["modes"].items():
+        reference = baseline.get("modes", {}).get(mode, {}).get("scenarios", {})
+        for name, result in run["scenarios"].items():
+            expected = reference.get(name)
+            if expected is None:
+                continue
+            label = f"{mode}/{name}"
+            if result["throughput"] < expected["throughput"] * (1 - tolerance):
+                regressions.append(
+                    f"{label}: throughput {result['throughput']:,.0f} req/s, "
+                    f"baseline {expected['throughput']:,.0f} req/s"
+                )
+            if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{label}: p95 {result['p95_ms']:.2f}ms, baseline {expected['p95_ms']:.2f}ms"
+                )
+            if result["errors"] > expected["errors"]:
+                regressions.append(
+                    f"{label}: {result['errors']} errors, baseline {expected['errors']}"
+                )
+    return regressions
+
+
+def main() -> None:
+    """Run the suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=10_000, help="Release size, 1k to 1M")
+    parser.add_argument("--lines", type=int, default=10_000, help="Noisy corpus size")
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument(
+        "--mode", choices=["inprocess", "http", "both"], default="both", help="How to drive"
+    )
+    parser.add_argument("--database", action="store_true", help="Include database scenarios")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/latest.json"))
+    parser.add_argument("--compare", type=Path, help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline", action="store_true", help=f"Also write the report to {BASELINE_PATH}"
+    )
+    args = parser.parse_args()
+
+    release = generate_release(args.nodes, args.seed)
+    corpus = noisy_corpus(release, args.lines, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        # Agents load their release lazily, so this must be set before the
+        # in-process app first touches the snapshot; the HTTP server inherits it
+        os.environ["ONTOLOGY_RELEASE_PATH"] = str(
+            write_release(release, Path(directory) / "release.jsonl")
+        )
+        os.environ.setdefault("ONTOLOGY_WATCH_INTERVAL", "0")
+        os.environ.setdefault("INVENTORY_SNAPSHOT_INTERVAL", "0")
+        selected = [s for s in scenarios(release, corpus) if args.database or not s.needs_database]
+
+        modes = {}
+        for mode, run in (("inprocess", run_inprocess), ("http", run_http)):
+            if args.mode in (mode, "both"):
+                print(f"{mode}:")
+                modes[mode] = asyncio.run(run(selected, args))
+
+    report = {
+        "meta": {
+            "nodes": len(release.nodes),
+            "lines": args.lines,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "modes": modes,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"report written to {args.output}")
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline updated at {BASELINE_PATH}")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"]["nodes"] != report["meta"]["nodes"]:
+            print(f"warning: baseline was run with {baseline['meta']['nodes']:,} nodes")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
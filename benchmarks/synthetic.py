@@ -0,0 +1,170 @@
+"""
+Synthetic ontology releases and noisy text corpora scaled from the golden release.
+
+Food items and their ``is_a`` hierarchy are replicated under generated
+variety names ("Milk Kalomi", "Dairy Kalomi") until the release reaches the
+requested size; units of measure and properties are shared by all replicas,
+so unit parsing and conversion behave as in the golden release.
+
+Usage:
+    python -m benchmarks.synthetic --nodes 100000 --output /tmp/release.jsonl
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+from shared.ontology.release import Release, load_release
+
+_SYLLABLES = ["ka", "lo", "mi", "ren", "su", "ta", "vi", "no", "pe", "dor", "xa", "zu"]
+_QUANTITIES = ["1", "2", "12", "0.5", "1 1/2", "3/4", "2-3", "½"]
+_TEMPLATES = ["{q} {u} {i}", "{q}{u} {i}", "{i}, {q} {u}", "{i} ({q}{u})", "{i}", "{q} {i}"]
+
+
+def variety(index: int) -> str:
+    """Pronounceable variety name of a replica, unique per index."""
+    syllables = []
+    index += 1
+    while index:
+        index, digit = divmod(index - 1, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+    return "".join(syllables).capitalize()
+
+
+def generate_release(nodes: int, seed: int = 42) -> Release:
+    """
+    Generate a release of about ``nodes`` nodes.
+
+    Args:
+        nodes: Target number of nodes; whole replicas are added, so the
+            release may be a few nodes larger
+        seed: Random seed for reproducibility
+
+    Returns:
+        Release with replicated food items and the golden units and properties
+    """
+    golden = load_release()
+    foods = [node for node in golden.nodes if node["category"] == "food_item"]
+    food_ids = {node["id"] for node in foods}
+    offset = random.Random(seed).randrange(len(_SYLLABLES) ** 3)
+
+    generated = list(golden.nodes)
+    relationships = list(golden.relationships)
+    replica = 0
+    while len(generated) < nodes:
+        replica += 1
+        name = variety(offset + replica)
+        suffix = f"_r{replica}"
+        for node in foods:
+            generated.append(
+                {
+                    **node,
+                    "id": node["id"] + suffix,
+                    "label": f"{node['label']} {name}",
+                    "synonyms": [f"{synonym} {name.lower()}" for synonym in node["synonyms"]],
+                }
+            )
+        for relationship in golden.relationships:
+            if relationship["source_id"] in food_ids:
+                target = relationship["target_id"]
+                relationships.append(
+                    {
+                        **relationship,
+                        "source_id": relationship["source_id"] + suffix,
+                        "target_id": target + suffix if target in food_ids else target,
+                    }
+                )
+
+    checksum = f"synthetic-{len(generated)}-{seed}"
+    return Release(
+        version=checksum, nodes=generated, relationships=relationships, checksum=checksum
+    )
+
+
+def write_release(release: Release, path: Path) -> Path:
+    """
+    Write a release in the JSONL layout of the golden release.
+
+    Args:
+        release: Release to write
+        path: Target ``.jsonl`` file
+
+    Returns:
+        The path written
+    """
+    with path.open("w", encoding="utf-8") as file:
+        for record in [*release.nodes, *release.relationships]:
+            file.write(json.dumps(record) + "\n")
+    return path
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    if len(text) < 4:
+        return text
+    position = rng.randrange(1, len(text) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:position] + text[position + 1] + text[position] + text[position + 2 :]
+    if kind == 1:
+        return text[:position] + text[position + 1 :]
+    return text[:position] + text[position] + text[position:]
+
+
+def noisy_corpus(release: Release, lines: int, seed: int = 42, typo_rate: float = 0.2) -> list[str]:
+    """
+    Generate item lines with quantities, units and noise.
+
+    Lines look like "2 lbs Chicken breast kalomi" or "milk, 1 1/2 l", with
+    random casing and, at ``typo_rate``, one swapped, dropped or doubled
+    character.
+
+    Args:
+        release: Release whose synonyms the lines are built from
+        lines: Number of lines
+        seed: Random seed for reproducibility
+        typo_rate: Share of lines with a typo
+
+    Returns:
+        Generated lines
+    """
+    rng = random.Random(seed)
+    items = [
+        synonym
+        for node in release.nodes
+        if node["category"] == "food_item"
+        for synonym in node["synonyms"]
+    ]
+    units = [
+        synonym
+        for node in release.nodes
+        if node["category"] == "unit_of_measure"
+        for synonym in node["synonyms"]
+    ]
+    corpus = []
+    for _ in range(lines):
+        item = rng.choice(items)
+        if rng.random() < typo_rate:
+            item = _typo(item, rng)
+        if rng.random() < 0.3:
+            item = item.title() if rng.random() < 0.5 else item.upper()
+        line = rng.choice(_TEMPLATES).format(q=rng.choice(_QUANTITIES), u=rng.choice(units), i=item)
+        corpus.append(line)
+    return corpus
+
+
+def main() -> None:
+    """Write a synthetic release."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=100_000, help="Release size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", type=Path, required=True, help="Target .jsonl file")
+    args = parser.parse_args()
+
+    release = generate_release(args.nodes, args.seed)
+    write_release(release, args.output)
+    print(f"wrote {len(release.nodes):,} nodes and {len(release.relationships):,} relationships")
+
+
+if __name__ == "__main__":
+    main()
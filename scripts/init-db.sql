@@ -16,3 +16,102 @@ GRANT ALL PRIVILEGES ON SCHEMA uom TO fodeen;
 GRANT ALL PRIVILEGES ON SCHEMA reranking TO fodeen;
 GRANT ALL PRIVILEGES ON SCHEMA conformance TO fodeen;
 GRANT ALL PRIVILEGES ON SCHEMA inventory TO fodeen;
+
+-- Ontology nodes with embeddings, used when vector search falls back to
+-- pgvector. The dimension must match EMBEDDING_DIMENSION (default 384)
+CREATE TABLE IF NOT EXISTS ontology.nodes (
+    id TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    category TEXT NOT NULL,
+    attributes JSONB NOT NULL DEFAULT '{}'::jsonb,
+    embedding vector(384)
+);
+
+CREATE INDEX IF NOT EXISTS nodes_category_idx ON ontology.nodes (category);
+-- Approximate nearest neighbours for the cosine distance (<=>) searches use
+CREATE INDEX IF NOT EXISTS nodes_embedding_hnsw_idx
+    ON ontology.nodes USING hnsw (embedding vector_cosine_ops);
+
+-- Release currently held by ontology.nodes
+CREATE TABLE IF NOT EXISTS ontology.vector_release (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    release_checksum TEXT NOT NULL,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Mapping results shared between Mapping Agent workers, per ontology release
+CREATE TABLE IF NOT EXISTS mapping.result_cache (
+    release_checksum TEXT NOT NULL,
+    text_key TEXT NOT NULL,
+    context_hash TEXT NOT NULL,
+    response JSONB NOT NULL,
+    mapped BOOLEAN NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (release_checksum, text_key, context_hash)
+);
+
+CREATE INDEX IF NOT EXISTS result_cache_expiry_idx
+    ON mapping.result_cache (release_checksum, expires_at);
+
+-- Inventory items; the composite indexes serve both the filters and keyset
+-- pagination in id order. base_quantity is the quantity in the base unit of
+-- its dimension, computed when the row is written so aggregations only sum
+CREATE TABLE IF NOT EXISTS inventory.items (
+    id TEXT PRIMARY KEY,
+    ontology_node_id TEXT NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    unit TEXT NOT NULL,
+    location TEXT,
+    base_quantity DOUBLE PRECISION,
+    base_unit TEXT,
+    dimension TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS items_location_idx ON inventory.items (location, id);
+CREATE INDEX IF NOT EXISTS items_ontology_node_idx ON inventory.items (ontology_node_id, id);
+
+-- Append-only log of stock changes, quantities normalized like inventory.items
+CREATE TABLE IF NOT EXISTS inventory.events (
+    seq BIGSERIAL PRIMARY KEY,
+    event_type TEXT NOT NULL CHECK (event_type IN ('receive', 'consume', 'adjust', 'transfer')),
+    ontology_node_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    to_location TEXT,
+    quantity DOUBLE PRECISION NOT NULL,
+    unit TEXT NOT NULL,
+    base_quantity DOUBLE PRECISION NOT NULL,
+    base_unit TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    reference TEXT,
+    occurred_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Running totals per (node, location, dimension), updated with each event
+CREATE TABLE IF NOT EXISTS inventory.totals (
+    ontology_node_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    base_unit TEXT NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    last_seq BIGINT NOT NULL,
+    PRIMARY KEY (ontology_node_id, location, dimension)
+);
+
+-- Periodic copies of the totals; point-in-time queries replay events after one
+CREATE TABLE IF NOT EXISTS inventory.snapshots (
+    seq BIGINT PRIMARY KEY,
+    taken_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS snapshots_taken_at_idx ON inventory.snapshots (taken_at);
+
+CREATE TABLE IF NOT EXISTS inventory.snapshot_totals (
+    seq BIGINT NOT NULL REFERENCES inventory.snapshots (seq) ON DELETE CASCADE,
+    ontology_node_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    base_unit TEXT NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (seq, ontology_node_id, location, dimension)
+);
@@ -0,0 +1 @@
+"""Ontology release loading and in-process snapshots shared across agents."""
@@ -0,0 +1,417 @@
+"""
+Columnar binary ontology releases, memory-mapped read-only.
+
+A compiled release is a small header, a JSON manifest and a set of aligned
+little-endian arrays:
+
+* a deduplicated UTF-8 string table (``strings`` blob and ``string_offsets``);
+* node columns holding string ids: ``node_id``, ``node_label``,
+  ``node_category`` and CSR-encoded ``synonym_ptr``/``synonym_ids``;
+* one column per attribute key holding the string id of the JSON-encoded
+  value, or -1 when a node lacks the attribute;
+* sorted lookup tables: ``id_order`` (positions sorted by id), ``form_keys``
+  with ``form_ptr``/``form_positions`` for synonyms, and ``category_keys``
+  with ``category_ptr``/``category_positions``;
+* relationship columns ``rel_source``, ``rel_target``, ``rel_type`` and
+  ``rel_attributes`` (string ids);
+* an optional L2-normalized float32 ``embeddings`` block.
+
+Opening a release maps the file and wraps the arrays without reading them,
+so every worker of every agent shares the same page cache and startup cost
+does not depend on ontology size. Records are decoded on access.
+
+Usage:
+    python -m shared.ontology.binary data/golden/sample_nodes.jsonl
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, overload
+
+import numpy as np
+
+from shared.ontology.release import load_release
+from shared.ontology.snapshot import (
+    NodeRecord,
+    OntologySnapshot,
+    RelationshipRecord,
+    build_snapshot,
+)
+from shared.ontology.text import normalize_text
+
+MAGIC = b"FODEENOB"
+FORMAT_VERSION = 1
+BINARY_SUFFIX = ".bin"
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def binary_path(path: Path) -> Path:
+    """Default location of the compiled form of a release."""
+    return path.with_suffix(BINARY_SUFFIX)
+
+
+def is_binary_release(path: Path | str) -> bool:
+    """Whether a file is a compiled binary release."""
+    with open(path, "rb") as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.ids)
+        return string_id
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        encoded = [value.encode("utf-8") for value in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _encode_value(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _postings(
+    keys: dict[str, list[int]], strings: _StringTable, ordered: bool
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    names = sorted(keys) if ordered else list(keys)
+    ptr = np.zeros(len(names) + 1, dtype="<i8")
+    np.cumsum([len(keys[name]) for name in names], out=ptr[1:])
+    positions = [position for name in names for position in keys[name]]
+    return (
+        np.array([strings.add(name) for name in names], dtype="<i4"),
+        ptr,
+        np.array(positions, dtype="<i4"),
+    )
+
+
+def compile_snapshot(snapshot: OntologySnapshot, target: Path | str) -> Path:
+    """
+    Write a snapshot as a binary release.
+
+    The file is written next to ``target`` and renamed into place, so
+    processes that have the previous release mapped keep reading it intact.
+
+    Args:
+        snapshot: Snapshot to compile
+        target: Output file
+
+    Returns:
+        Path of the written release
+    """
+    target = Path(target)
+    strings = _StringTable()
+    nodes = snapshot.nodes
+    size = len(nodes)
+
+    node_id = np.array([strings.add(node.id) for node in nodes], dtype="<i4")
+    node_label = np.array([strings.add(node.label) for node in nodes], dtype="<i4")
+    node_category = np.array([strings.add(node.category) for node in nodes], dtype="<i4")
+    synonym_ptr = np.zeros(size + 1, dtype="<i8")
+    np.cumsum([len(node.synonyms) for node in nodes], out=synonym_ptr[1:])
+    synonym_ids = np.array(
+        [strings.add(synonym) for node in nodes for synonym in node.synonyms], dtype="<i4"
+    )
+
+    attribute_keys = sorted({key for node in nodes for key in node.attributes})
+    attribute_columns = {}
+    for key in attribute_keys:
+        column = np.full(size, -1, dtype="<i4")
+        for position, node in enumerate(nodes):
+            if key in node.attributes:
+                column[position] = strings.add(_encode_value(node.attributes[key]))
+        attribute_columns[f"attribute:{key}"] = column
+
+    forms: dict[str, list[int]] = {}
+    categories: dict[str, list[int]] = {}
+    for position, node in enumerate(nodes):
+        for form in dict.fromkeys((normalize_text(node.label), *node.synonyms)):
+            if form:
+                forms.setdefault(form, []).append(position)
+        categories.setdefault(node.category, []).append(position)
+    form_keys, form_ptr, form_positions = _postings(forms, strings, ordered=True)
+    category_keys, category_ptr, category_positions = _postings(categories, strings, ordered=False)
+    id_order = np.array(sorted(range(size), key=lambda position: nodes[position].id), dtype="<i4")
+
+    relationships = snapshot.relationships
+    sections: dict[str, np.ndarray] = {
+        "node_id": node_id,
+        "node_label": node_label,
+        "node_category": node_category,
+        "synonym_ptr": synonym_ptr,
+        "synonym_ids": synonym_ids,
+        **attribute_columns,
+        "id_order": id_order,
+        "form_keys": form_keys,
+        "form_ptr": form_ptr,
+        "form_positions": form_positions,
+        "category_keys": category_keys,
+        "category_ptr": category_ptr,
+        "category_positions": category_positions,
+        "rel_source": np.array([strings.add(r.source_id) for r in relationships], dtype="<i4"),
+        "rel_target": np.array([strings.add(r.target_id) for r in relationships], dtype="<i4"),
+        "rel_type": np.array(
+            [strings.add(r.relationship_type) for r in relationships], dtype="<i4"
+        ),
+        "rel_attributes": np.array(
+            [
+                strings.add(_encode_value(dict(r.attributes))) if r.attributes else -1
+                for r in relationships
+            ],
+            dtype="<i4",
+        ),
+    }
+    if snapshot.embeddings is not None:
+        matrix = np.array(snapshot.embeddings, dtype="<f4")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        sections["embeddings"] = matrix
+    sections["strings"], sections["string_offsets"] = strings.arrays()
+
+    layout: dict[str, dict[str, Any]] = {}
+    offset = 0
+    for name, array in sections.items():
+        offset = _align(offset)
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+    manifest = json.dumps(
+        {
+            "version": snapshot.version,
+            "checksum": snapshot.checksum,
+            "nodes": size,
+            "relationships": len(relationships),
+            "attribute_keys": attribute_keys,
+            "sections": layout,
+        }
+    ).encode("utf-8")
+
+    data_start = _align(_HEADER.size + len(manifest))
+    partial = target.with_name(f".{target.name}.partial")
+    with open(partial, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest)))
+        handle.write(manifest)
+        for name, array in sections.items():
+            handle.seek(data_start + layout[name]["offset"])
+            handle.write(np.ascontiguousarray(array).tobytes())
+    os.replace(partial, target)
+    return target
+
+
+class _Strings(Sequence[str]):
+    """Lazily decoded view of string ids."""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray, ids: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return decode_string(self._blob, self._offsets, int(self._ids[index]))
+
+
+def decode_string(blob: memoryview, offsets: np.ndarray, string_id: int) -> str:
+    """Decode one entry of a string table."""
+    return str(blob[offsets[string_id] : offsets[string_id + 1]], "utf-8")
+
+
+class _MappedRecords(Sequence[Any]):
+    """Read-only sequence decoding one record per access."""
+
+    def __init__(self, size: int, decode: Any) -> None:
+        self._size = size
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return tuple(self._decode(i) for i in range(*index.indices(self._size)))
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._decode(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        decode = self._decode
+        return (decode(i) for i in range(self._size))
+
+
+class MappedSnapshot(OntologySnapshot):
+    """
+    Snapshot served from a memory-mapped binary release.
+
+    Offers the ``OntologySnapshot`` API; lookups binary-search the sorted
+    tables in the file instead of building hash indexes at load time.
+    """
+
+    __slots__ = ("path", "_mmap", "_blob", "_arrays", "_attribute_keys", "_ids", "_forms")
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format_version, manifest_length = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a binary ontology release")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary release format {format_version}")
+        manifest = json.loads(self._mmap[_HEADER.size : _HEADER.size + manifest_length])
+        data_start = _align(_HEADER.size + manifest_length)
+
+        arrays: dict[str, np.ndarray] = {}
+        for name, section in manifest["sections"].items():
+            if name == "embeddings":
+                continue
+            dtype = np.dtype(section["dtype"])
+            arrays[name] = np.frombuffer(
+                self._mmap,
+                dtype=dtype,
+                count=int(np.prod(section["shape"])),
+                offset=data_start + section["offset"],
+            )
+        self._arrays = arrays
+        self._blob = memoryview(self._mmap)[
+            data_start + manifest["sections"]["strings"]["offset"] :
+        ]
+        self._attribute_keys = tuple(manifest["attribute_keys"])
+        offsets = arrays["string_offsets"]
+        self._ids = _Strings(self._blob, offsets, arrays["node_id"][arrays["id_order"]])
+        self._forms = _Strings(self._blob, offsets, arrays["form_keys"])
+
+        embeddings = None
+        if "embeddings" in manifest["sections"]:
+            section = manifest["sections"]["embeddings"]
+            embeddings = np.memmap(
+                self.path,
+                dtype=np.dtype(section["dtype"]),
+                mode="r",
+                offset=data_start + section["offset"],
+                shape=tuple(section["shape"]),
+            )
+
+        self.version = manifest["version"]
+        self.checksum = manifest["checksum"]
+        self.nodes = _MappedRecords(manifest["nodes"], self._node)
+        self.relationships = _MappedRecords(manifest["relationships"], self._relationship)
+        self.embeddings = embeddings
+        self._derived = {}
+
+    def __contains__(self, node_id: object) -> bool:
+        return isinstance(node_id, str) and self.position(node_id) is not None
+
+    def position(self, node_id: str) -> int | None:
+        """Get the position of a node in ``nodes``."""
+        index = bisect.bisect_left(self._ids, node_id)
+        if index < len(self._ids) and self._ids[index] == node_id:
+            return int(self._arrays["id_order"][index])
+        return None
+
+    def lookup_synonym(self, text: str) -> tuple[NodeRecord, ...]:
+        """Get the nodes whose label or a synonym normalizes to ``text``."""
+        key = normalize_text(text)
+        index = bisect.bisect_left(self._forms, key)
+        if index == len(self._forms) or self._forms[index] != key:
+            return ()
+        ptr = self._arrays["form_ptr"]
+        positions = self._arrays["form_positions"][ptr[index] : ptr[index + 1]]
+        return tuple(self.nodes[position] for position in positions.tolist())
+
+    def category_positions(self, category: str) -> tuple[int, ...]:
+        """Get the positions of all nodes of a category."""
+        categories = self.categories()
+        if category not in categories:
+            return ()
+        index = categories.index(category)
+        ptr = self._arrays["category_ptr"]
+        return tuple(self._arrays["category_positions"][ptr[index] : ptr[index + 1]].tolist())
+
+    def in_category(self, category: str) -> tuple[NodeRecord, ...]:
+        """Get all nodes of a category, in release order."""
+        return tuple(self.nodes[position] for position in self.category_positions(category))
+
+    def categories(self) -> list[str]:
+        """List the categories present in the snapshot."""
+        return list(
+            _Strings(self._blob, self._arrays["string_offsets"], self._arrays["category_keys"])
+        )
+
+    def _string(self, string_id: int) -> str:
+        return decode_string(self._blob, self._arrays["string_offsets"], string_id)
+
+    def _node(self, position: int) -> NodeRecord:
+        arrays = self._arrays
+        string = self._string
+        start, end = arrays["synonym_ptr"][position : position + 2]
+        attributes = {}
+        for key in self._attribute_keys:
+            value_id = int(arrays[f"attribute:{key}"][position])
+            if value_id >= 0:
+                attributes[key] = json.loads(string(value_id))
+        return NodeRecord(
+            id=string(int(arrays["node_id"][position])),
+            label=string(int(arrays["node_label"][position])),
+            category=string(int(arrays["node_category"][position])),
+            synonyms=tuple(string(i) for i in arrays["synonym_ids"][start:end].tolist()),
+            attributes=MappingProxyType(attributes),
+        )
+
+    def _relationship(self, index: int) -> RelationshipRecord:
+        arrays = self._arrays
+        string = self._string
+        attributes_id = int(arrays["rel_attributes"][index])
+        return RelationshipRecord(
+            source_id=string(int(arrays["rel_source"][index])),
+            target_id=string(int(arrays["rel_target"][index])),
+            relationship_type=string(int(arrays["rel_type"][index])),
+            attributes=MappingProxyType(
+                json.loads(string(attributes_id)) if attributes_id >= 0 else {}
+            ),
+        )
+
+
+def main() -> None:
+    """Compile a JSON or JSONL release into the binary format."""
+    parser = argparse.ArgumentParser(description="Compile an ontology release to binary")
+    parser.add_argument("release", type=Path, help="JSON or JSONL release to compile")
+    parser.add_argument("-o", "--output", type=Path, help="Output file (default: <release>.bin)")
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(load_release(args.release))
+    target = compile_snapshot(snapshot, args.output or binary_path(args.release))
+    print(f"compiled {len(snapshot):,} nodes, {len(snapshot.relationships):,} relationships")
+    print(f"wrote {target} ({target.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""Vector similarity search over node embeddings."""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from shared.ontology.snapshot import OntologySnapshot, SnapshotDiff, register_incremental
+from shared.utils.database import get_engine
+
+SYNC_BATCH_SIZE = int(os.getenv("EMBEDDING_SYNC_BATCH_SIZE", "5000"))
+# Dimension of ontology.nodes.embedding in scripts/init-db.sql
+PGVECTOR_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+# Upper bound on the float32 score block allocated per chunk of queries
+SCORE_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class EmbeddingsUnavailableError(Exception):
+    """Raised when there are no embeddings to search."""
+
+
+@dataclass(frozen=True, slots=True)
+class VectorHit:
+    """A node matched by vector similarity."""
+
+    node_id: str
+    score: float
+
+
+def get_max_index_rows() -> int:
+    """Largest catalog kept in memory, from ``EMBEDDING_INDEX_MAX_ROWS``."""
+    return int(os.getenv("EMBEDDING_INDEX_MAX_ROWS", "500000"))
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized: np.ndarray = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    return normalized
+
+
+class EmbeddingIndex:
+    """
+    In-process cosine similarity index.
+
+    Embeddings are held as one contiguous, L2-normalized float32 matrix, so
+    a chunk of queries is scored with a single matrix product and the top k
+    per query is selected with ``argpartition`` instead of a full sort.
+    Chunks are sized so their score block stays under ``SCORE_BLOCK_BYTES``.
+    """
+
+    def __init__(
+        self,
+        node_ids: tuple[str, ...],
+        categories: tuple[str, ...],
+        matrix: np.ndarray,
+        normalized: bool = False,
+    ) -> None:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if not normalized:
+            matrix = _normalize_rows(matrix)
+        self.node_ids = node_ids
+        self.categories = categories
+        self.matrix = np.ascontiguousarray(matrix)
+        self._present = np.linalg.norm(self.matrix, axis=1) > 0
+        labels = np.asarray(categories)
+        self._category_masks = {
+            category: self._present & (labels == category) for category in dict.fromkeys(categories)
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "EmbeddingIndex | None":
+        """
+        Build an index over a snapshot's embeddings.
+
+        Returns ``None`` when the snapshot has no embeddings, or when it is
+        larger than ``EMBEDDING_INDEX_MAX_ROWS`` and searches go to pgvector.
+
+        Args:
+            snapshot: Ontology snapshot
+
+        Returns:
+            Index, or None when the catalog is not served from memory
+        """
+        if snapshot.embeddings is None or len(snapshot) > get_max_index_rows():
+            return None
+        return cls(
+            node_ids=tuple(node.id for node in snapshot.nodes),
+            categories=tuple(node.category for node in snapshot.nodes),
+            matrix=snapshot.embeddings,
+            # Memory-mapped sidecars are written normalized; use them in place
+            normalized=isinstance(snapshot.embeddings, np.memmap),
+        )
+
+    def __len__(self) -> int:
+        return int(self._present.sum())
+
+    def updated(
+        self, diff: SnapshotDiff, previous: OntologySnapshot, snapshot: OntologySnapshot
+    ) -> "EmbeddingIndex | None":
+        """
+        Follow a release change without renormalizing existing rows.
+
+        Only appended nodes are supported: their rows are normalized and
+        stacked under the existing matrix.
+
+        Args:
+            diff: Changes from ``previous`` to ``snapshot``
+            previous: Snapshot this index was built from
+            snapshot: New snapshot
+
+        Returns:
+            Index for ``snapshot``, or None when it must be rebuilt
+        """
+        if not diff.appended or diff.embeddings_changed or snapshot.embeddings is None:
+            return None
+        if len(snapshot) > get_max_index_rows():
+            return None
+        if diff.recategorized(previous, snapshot):
+            return None
+        if not diff.added:
+            return self
+        added = snapshot.nodes[len(previous) :]
+        rows = _normalize_rows(np.asarray(snapshot.embeddings[len(previous) :], dtype=np.float32))
+        return EmbeddingIndex(
+            node_ids=self.node_ids + tuple(node.id for node in added),
+            categories=self.categories + tuple(node.category for node in added),
+            matrix=np.concatenate([self.matrix, rows]),
+            normalized=True,
+        )
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimensionality."""
+        return int(self.matrix.shape[1])
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        category: str | None = None,
+    ) -> list[list[VectorHit]]:
+        """
+        Find the nearest nodes for a batch of query vectors.
+
+        Args:
+            queries: Array of shape (n, dimension), or a single vector
+            k: Results per query
+            category: Restrict results to one category
+
+        Returns:
+            Hits per query, best first
+        """
+        queries = _normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        check_dimension(queries, self.dimension)
+
+        mask = self._present if category is None else self._category_masks.get(category)
+        if mask is None or k <= 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, int(mask.sum()))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        chunk = max(1, SCORE_BLOCK_BYTES // (4 * len(self.matrix)))
+        results: list[list[VectorHit]] = []
+        for start in range(0, len(queries), chunk):
+            scores = queries[start : start + chunk] @ self.matrix.T
+            scores[:, ~mask] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            results.extend(
+                [
+                    VectorHit(node_id=self.node_ids[column], score=float(score))
+                    for column, score in zip(row, row_scores, strict=True)
+                ]
+                for row, row_scores in zip(top.tolist(), top_scores.tolist(), strict=True)
+            )
+        return results
+
+
+def check_dimension(queries: np.ndarray, dimension: int) -> None:
+    """
+    Check query vectors against the dimension of the embeddings searched.
+
+    Args:
+        queries: Array of shape (n, dimension)
+        dimension: Dimension of the embeddings
+
+    Raises:
+        ValueError: If the queries have another dimension
+    """
+    if queries.shape[1] != dimension:
+        raise ValueError(f"Expected {dimension}-dimensional queries")
+
+
+_PGVECTOR_QUERY = text("""
+    SELECT id, 1 - (embedding <=> CAST(:query AS vector)) AS score
+    FROM ontology.nodes
+    WHERE embedding IS NOT NULL
+      AND (CAST(:category AS text) IS NULL OR category = :category)
+    ORDER BY embedding <=> CAST(:query AS vector)
+    LIMIT :k
+    """)
+
+
+async def search_pgvector(
+    queries: np.ndarray,
+    k: int,
+    category: str | None = None,
+) -> list[list[VectorHit]]:
+    """
+    Find the nearest nodes using pgvector's cosine distance.
+
+    Args:
+        queries: Array of shape (n, dimension), or a single vector
+        k: Results per query
+        category: Restrict results to one category
+
+    Returns:
+        Hits per query, best first
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    results: list[list[VectorHit]] = []
+    async with get_engine().connect() as connection:
+        for query in queries:
+            literal = "[" + ",".join(map(str, query.tolist())) + "]"
+            rows = await connection.execute(
+                _PGVECTOR_QUERY, {"query": literal, "category": category, "k": k}
+            )
+            results.append([VectorHit(node_id=row.id, score=float(row.score)) for row in rows])
+    return results
+
+
+async def search_vectors(
+    snapshot: OntologySnapshot,
+    queries: np.ndarray,
+    k: int,
+    category: str | None = None,
+) -> list[list[VectorHit]]:
+    """
+    Search the in-process index, falling back to pgvector.
+
+    The fallback is used when the catalog exceeds
+    ``EMBEDDING_INDEX_MAX_ROWS``; ``ontology.nodes`` is then filled from the
+    release by ``sync_pgvector``. Both paths return the same shape.
+
+    Args:
+        snapshot: Active ontology snapshot
+        queries: Array of shape (n, dimension), or a single vector
+        k: Results per query
+        category: Restrict results to one category
+
+    Returns:
+        Hits per query, best first
+
+    Raises:
+        ValueError: If the queries do not match the embedding dimension
+        EmbeddingsUnavailableError: If the release has no embeddings or
+            pgvector cannot be queried
+    """
+    if snapshot.embeddings is None:
+        raise EmbeddingsUnavailableError("The active ontology release has no embeddings")
+    index = snapshot.derived("embedding_index", EmbeddingIndex.from_snapshot)
+    if index is not None:
+        return index.search(queries, k, category)
+    # Checked here too so both paths reject a wrong dimension the same way
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    check_dimension(queries, snapshot.embeddings.shape[1])
+    try:
+        return await search_pgvector(queries, k, category)
+    except (SQLAlchemyError, OSError) as exc:
+        raise EmbeddingsUnavailableError(f"pgvector search failed: {exc}") from exc
+
+
+def uses_pgvector(snapshot: OntologySnapshot) -> bool:
+    """Whether searches over a snapshot go to pgvector instead of memory."""
+    return snapshot.embeddings is not None and len(snapshot) > get_max_index_rows()
+
+
+_LOCK_SYNC = text("SELECT pg_advisory_xact_lock(hashtext('ontology.nodes'))")
+
+_SYNCED_RELEASE = text("SELECT release_checksum FROM ontology.vector_release")
+
+_CLEAR_NODES = text("DELETE FROM ontology.nodes")
+
+_INSERT_NODES = text("""
+    INSERT INTO ontology.nodes (id, label, category, embedding)
+    SELECT id, label, category, CAST(embedding AS vector)
+    FROM unnest(
+        CAST(:ids AS text[]), CAST(:labels AS text[]),
+        CAST(:categories AS text[]), CAST(:embeddings AS text[])
+    ) AS batch(id, label, category, embedding)
+    """)
+
+_MARK_SYNCED = text("""
+    INSERT INTO ontology.vector_release (singleton, release_checksum)
+    VALUES (TRUE, :checksum)
+    ON CONFLICT (singleton) DO UPDATE SET
+        release_checksum = EXCLUDED.release_checksum, synced_at = now()
+    """)
+
+
+def _vector_literal(vector: np.ndarray) -> str | None:
+    if not np.any(vector):
+        return None
+    return "[" + ",".join(map(str, vector.tolist())) + "]"
+
+
+async def sync_pgvector(snapshot: OntologySnapshot, batch_size: int = SYNC_BATCH_SIZE) -> bool:
+    """
+    Replace the rows of ``ontology.nodes`` with a release's nodes and embeddings.
+
+    The table is rewritten in one transaction, so searches keep seeing the
+    previous release until it commits. An advisory lock serializes agents
+    syncing at the same time, and a release already synced is skipped.
+
+    Args:
+        snapshot: Snapshot with embeddings
+        batch_size: Rows per insert statement
+
+    Returns:
+        True if the table was rewritten, False if it already held the release
+
+    Raises:
+        ValueError: If the embeddings do not have ``PGVECTOR_DIMENSION`` dimensions
+    """
+    assert snapshot.embeddings is not None
+    if snapshot.embeddings.shape[1] != PGVECTOR_DIMENSION:
+        raise ValueError(
+            f"Release embeddings have {snapshot.embeddings.shape[1]} dimensions, "
+            f"ontology.nodes holds {PGVECTOR_DIMENSION}"
+        )
+    async with get_engine().begin() as connection:
+        await connection.execute(_LOCK_SYNC)
+        synced = (await connection.execute(_SYNCED_RELEASE)).scalar()
+        if synced == snapshot.checksum:
+            return False
+        await connection.execute(_CLEAR_NODES)
+        for start in range(0, len(snapshot), batch_size):
+            stop = min(start + batch_size, len(snapshot))
+            nodes = [snapshot.nodes[position] for position in range(start, stop)]
+            vectors = np.asarray(snapshot.embeddings[start:stop], dtype=np.float32)
+            await connection.execute(
+                _INSERT_NODES,
+                {
+                    "ids": [node.id for node in nodes],
+                    "labels": [node.label for node in nodes],
+                    "categories": [node.category for node in nodes],
+                    "embeddings": [_vector_literal(vector) for vector in vectors],
+                },
+            )
+        await connection.execute(_MARK_SYNCED, {"checksum": snapshot.checksum})
+    return True
+
+
+def _update_index(
+    index: EmbeddingIndex | None,
+    diff: SnapshotDiff,
+    previous: OntologySnapshot,
+    snapshot: OntologySnapshot,
+) -> EmbeddingIndex | None:
+    return index.updated(diff, previous, snapshot) if index is not None else None
+
+
+register_incremental("embedding_index", _update_index)
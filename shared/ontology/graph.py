@@ -0,0 +1,298 @@
+"""Adjacency and transitive closure indexes over ontology relationships."""
+
+from collections import deque
+from typing import Literal, get_args
+
+import numpy as np
+
+from shared.ontology.snapshot import OntologySnapshot, SnapshotDiff, register_incremental
+
+RelationshipType = Literal["is_a", "part_of", "measured_in", "has_property"]
+RELATIONSHIP_TYPES: tuple[str, ...] = get_args(RelationshipType)
+
+
+def _csr(size: int, rows: np.ndarray, columns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Compressed sparse row arrays (indptr, indices) for the edges rows -> columns."""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32)
+
+
+class RelationshipGraph:
+    """
+    Edges of one relationship type, as CSR adjacency in both directions.
+
+    An edge points from ``source_id`` to ``target_id``, so for ``is_a`` the
+    target is the parent: ancestors follow edges forward, descendants follow
+    them backwards.
+
+    Transitive closure is precomputed so that subsumption is O(1). When every
+    node has at most one parent (a forest, the usual taxonomy shape), nodes
+    are numbered in DFS pre-order: a node's descendants are exactly the
+    contiguous pre-order range after it, so subsumption is two integer
+    comparisons and listing descendants is a slice. Graphs with multiple
+    parents or cycles fall back to a per-node set of ancestor positions.
+    """
+
+    def __init__(self, size: int, sources: np.ndarray, targets: np.ndarray) -> None:
+        self.size = size
+        self.edges = len(sources)
+        self._parent_ptr, self._parents = _csr(size, sources, targets)
+        self._child_ptr, self._children = _csr(size, targets, sources)
+        self._pre: list[int] | None = None
+        self._last: list[int] | None = None
+        self._order: np.ndarray | None = None
+        self._ancestor_sets: list[frozenset[int]] | None = None
+
+        if not self._build_intervals():
+            self._build_closure()
+
+    def parents(self, position: int) -> np.ndarray:
+        """Positions of the direct targets of a node."""
+        return self._parents[self._parent_ptr[position] : self._parent_ptr[position + 1]]
+
+    def children(self, position: int) -> np.ndarray:
+        """Positions of the direct sources pointing at a node."""
+        return self._children[self._child_ptr[position] : self._child_ptr[position + 1]]
+
+    @property
+    def is_forest(self) -> bool:
+        """Whether the interval encoding is in use."""
+        return self._pre is not None
+
+    def subsumes(self, ancestor: int, descendant: int) -> bool:
+        """
+        Whether ``descendant`` reaches ``ancestor`` by following edges.
+
+        A node subsumes itself.
+        """
+        if ancestor == descendant:
+            return True
+        if self._pre is not None and self._last is not None:
+            pre = self._pre[descendant]
+            return self._pre[ancestor] < pre <= self._last[ancestor]
+        assert self._ancestor_sets is not None
+        return ancestor in self._ancestor_sets[descendant]
+
+    def ancestors(self, position: int) -> list[int]:
+        """Positions of all nodes reachable forwards, nearest first."""
+        if self._ancestor_sets is not None:
+            return self._walk(position, self._parent_ptr, self._parents)
+        chain = []
+        parents = self.parents(position)
+        while len(parents):
+            position = int(parents[0])
+            chain.append(position)
+            parents = self.parents(position)
+        return chain
+
+    def descendants(self, position: int) -> list[int]:
+        """Positions of all nodes reaching this one, in pre-order or nearest first."""
+        if self._pre is not None and self._last is not None and self._order is not None:
+            subtree: list[int] = self._order[
+                self._pre[position] + 1 : self._last[position] + 1
+            ].tolist()
+            return subtree
+        return self._walk(position, self._child_ptr, self._children)
+
+    def _walk(self, start: int, indptr: np.ndarray, indices: np.ndarray) -> list[int]:
+        seen = {start}
+        found = []
+        queue = deque([start])
+        while queue:
+            position = queue.popleft()
+            for neighbour in indices[indptr[position] : indptr[position + 1]].tolist():
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    found.append(neighbour)
+                    queue.append(neighbour)
+        return found
+
+    def _build_intervals(self) -> bool:
+        parent_counts = np.diff(self._parent_ptr)
+        if parent_counts.max(initial=0) > 1:
+            return False
+
+        pre = [-1] * self.size
+        last = [-1] * self.size
+        order = np.empty(self.size, dtype=np.int32)
+        counter = 0
+        child_ptr, children = self._child_ptr, self._children
+        for root in np.flatnonzero(parent_counts == 0).tolist():
+            stack = [(root, False)]
+            while stack:
+                position, done = stack.pop()
+                if done:
+                    last[position] = counter - 1
+                    continue
+                pre[position] = counter
+                order[counter] = position
+                counter += 1
+                stack.append((position, True))
+                stack.extend(
+                    (child, False)
+                    for child in children[child_ptr[position] : child_ptr[position + 1]].tolist()
+                )
+
+        if counter < self.size:
+            # Nodes on a cycle have a parent yet are unreachable from any root
+            return False
+        self._pre, self._last, self._order = pre, last, order
+        return True
+
+    def _build_closure(self) -> None:
+        ancestor_sets: list[frozenset[int] | None] = [None] * self.size
+        remaining = np.diff(self._parent_ptr).tolist()
+        queue = deque(position for position, count in enumerate(remaining) if count == 0)
+        # Kahn's algorithm from the roots down: a node's closure is the union
+        # of its parents' closures once all of them are known
+        while queue:
+            position = queue.popleft()
+            closure: set[int] = set()
+            for parent in self.parents(position).tolist():
+                closure.add(parent)
+                closure.update(ancestor_sets[parent] or ())
+            ancestor_sets[position] = frozenset(closure)
+            for child in self.children(position).tolist():
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    queue.append(child)
+
+        for position, closure_or_none in enumerate(ancestor_sets):
+            if closure_or_none is None:
+                # On or below a cycle: plain reachability
+                reachable = self._walk(position, self._parent_ptr, self._parents)
+                ancestor_sets[position] = frozenset(reachable)
+        self._ancestor_sets = [closure or frozenset() for closure in ancestor_sets]
+
+
+class OntologyGraph:
+    """Relationship graphs of a snapshot, one per relationship type."""
+
+    def __init__(self, snapshot: OntologySnapshot) -> None:
+        self._snapshot = snapshot
+        edges: dict[str, tuple[list[int], list[int]]] = {}
+        for relationship in snapshot.relationships:
+            source = snapshot.position(relationship.source_id)
+            target = snapshot.position(relationship.target_id)
+            if source is None or target is None:
+                # Dangling references are reported by the Conformance Agent
+                continue
+            sources, targets = edges.setdefault(relationship.relationship_type, ([], []))
+            sources.append(source)
+            targets.append(target)
+
+        size = len(snapshot)
+        self._graphs = {
+            relationship_type: RelationshipGraph(
+                size, np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+            )
+            for relationship_type, (sources, targets) in edges.items()
+        }
+        self._empty = RelationshipGraph(
+            size, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "OntologyGraph":
+        """Build the graph indexes for a snapshot."""
+        return cls(snapshot)
+
+    def updated(
+        self, diff: SnapshotDiff, previous: OntologySnapshot, snapshot: OntologySnapshot
+    ) -> "OntologyGraph | None":
+        """
+        Reuse the adjacency for a new snapshot when node positions and edges are unchanged.
+
+        Args:
+            diff: Changes from ``previous`` to ``snapshot``
+            previous: Snapshot this graph was built from
+            snapshot: New snapshot
+
+        Returns:
+            Graph bound to ``snapshot``, or None when it must be rebuilt
+        """
+        if diff.added or not diff.appended or diff.relationships_changed:
+            return None
+        graph = object.__new__(OntologyGraph)
+        graph._snapshot = snapshot
+        graph._graphs = self._graphs
+        graph._empty = self._empty
+        return graph
+
+    def graph(self, relationship_type: str) -> RelationshipGraph:
+        """Get the graph of one relationship type (empty if it has no edges)."""
+        return self._graphs.get(relationship_type, self._empty)
+
+    def ancestors(self, node_id: str, relationship_type: str = "is_a") -> list[str]:
+        """
+        Get the ids of all nodes a node reaches by following relationships.
+
+        Args:
+            node_id: Starting node
+            relationship_type: Relationship to follow
+
+        Returns:
+            Node ids, nearest first
+
+        Raises:
+            KeyError: If the node does not exist
+        """
+        position = self._position(node_id)
+        return self._ids(self.graph(relationship_type).ancestors(position))
+
+    def descendants(self, node_id: str, relationship_type: str = "is_a") -> list[str]:
+        """
+        Get the ids of all nodes reaching a node by following relationships.
+
+        Args:
+            node_id: Starting node, e.g. the id of "Dairy"
+            relationship_type: Relationship to follow backwards
+
+        Returns:
+            Node ids
+
+        Raises:
+            KeyError: If the node does not exist
+        """
+        position = self._position(node_id)
+        return self._ids(self.graph(relationship_type).descendants(position))
+
+    def subsumes(
+        self, ancestor_id: str, descendant_id: str, relationship_type: str = "is_a"
+    ) -> bool:
+        """
+        Whether ``ancestor_id`` is ``descendant_id`` or one of its ancestors.
+
+        Args:
+            ancestor_id: Candidate ancestor, e.g. "Dairy"
+            descendant_id: Candidate descendant, e.g. "Milk"
+            relationship_type: Relationship to follow
+
+        Returns:
+            True if subsumed; unknown ids are never subsumed
+        """
+        ancestor = self._snapshot.position(ancestor_id)
+        descendant = self._snapshot.position(descendant_id)
+        if ancestor is None or descendant is None:
+            return False
+        return self.graph(relationship_type).subsumes(ancestor, descendant)
+
+    def _position(self, node_id: str) -> int:
+        position = self._snapshot.position(node_id)
+        if position is None:
+            raise KeyError(node_id)
+        return position
+
+    def _ids(self, positions: list[int]) -> list[str]:
+        nodes = self._snapshot.nodes
+        return [nodes[position].id for position in positions]
+
+
+def get_graph(snapshot: OntologySnapshot) -> OntologyGraph:
+    """Get the graph indexes of a snapshot, building them on first use."""
+    return snapshot.derived("graph", OntologyGraph.from_snapshot)
+
+
+register_incremental("graph", OntologyGraph.updated)
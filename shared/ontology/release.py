@@ -0,0 +1,190 @@
+"""Loading of ontology releases from the files under ``data/``."""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_RELEASE_PATH = DATA_DIR / "golden" / "sample_nodes.jsonl"
+DEFAULT_RELEASE_VERSION = "v1"
+
+
+@dataclass(frozen=True, slots=True)
+class Release:
+    """Raw contents of an ontology release."""
+
+    version: str
+    nodes: list[dict]
+    relationships: list[dict]
+    checksum: str
+    embeddings: np.ndarray | None = None
+
+
+class ReleaseValidationError(ValueError):
+    """Raised when a release fails the checks run before it goes live."""
+
+    def __init__(self, path: Path, errors: list[str]) -> None:
+        super().__init__(f"Release {path} failed validation: {'; '.join(errors)}")
+        self.errors = errors
+
+
+def get_release_path() -> Path:
+    """Get the ontology release path from environment."""
+    return Path(os.getenv("ONTOLOGY_RELEASE_PATH", str(DEFAULT_RELEASE_PATH)))
+
+
+def embeddings_path(path: Path) -> Path:
+    """Sidecar ``.embeddings.npy`` file holding a release's embedding matrix."""
+    return path.with_suffix(".embeddings.npy")
+
+
+def save_embeddings(path: Path | str, matrix: np.ndarray) -> Path:
+    """
+    Write the embedding sidecar for a release.
+
+    Rows are L2-normalized and stored as contiguous float32 so the file can
+    be memory-mapped and searched without a copy.
+
+    Args:
+        path: Release file the embeddings belong to
+        matrix: One row per node, in release order
+
+    Returns:
+        Path of the written sidecar
+    """
+    matrix = np.array(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    target = embeddings_path(Path(path))
+    np.save(target, np.ascontiguousarray(matrix))
+    return target
+
+
+def is_relationship(record: dict) -> bool:
+    """Whether a release record is a relationship rather than a node."""
+    return "relationship_type" in record
+
+
+_NODE_FIELDS = ("id", "label", "category")
+_RELATIONSHIP_FIELDS = ("source_id", "target_id", "relationship_type")
+# Records reported before the rest of a broken release is skipped
+_MAX_RECORD_ERRORS = 20
+
+
+def _record_error(record: Any) -> str | None:
+    """What is wrong with a decoded node or relationship, None if it can be loaded."""
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    fields = _RELATIONSHIP_FIELDS if is_relationship(record) else _NODE_FIELDS
+    missing = [name for name in fields if not isinstance(record.get(name), str) or not record[name]]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    synonyms = record.get("synonyms", [])
+    if not isinstance(synonyms, list) or not all(isinstance(value, str) for value in synonyms):
+        return "synonyms must be a list of strings"
+    if not isinstance(record.get("attributes", {}), dict):
+        return "attributes must be an object"
+    return None
+
+
+def release_checksum(path: Path, raw: bytes) -> str:
+    """SHA-256 of a release file and, when present, its embedding sidecar."""
+    digest = hashlib.sha256(raw)
+    sidecar = embeddings_path(path)
+    if sidecar.exists():
+        with sidecar.open("rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_release(path: Path | str | None = None) -> Release:
+    """
+    Load an ontology release.
+
+    Two layouts are supported: a JSON document following
+    ``ontology_v1.schema.json`` (``version``, ``nodes``, ``relationships``),
+    and JSONL with one node or relationship per line as in
+    ``data/golden/sample_nodes.jsonl``. A ``.embeddings.npy`` sidecar next
+    to the release is memory-mapped read-only rather than read into memory,
+    and is part of the checksum.
+
+    Args:
+        path: Release file (default: ``ONTOLOGY_RELEASE_PATH``)
+
+    Returns:
+        Parsed release
+
+    Raises:
+        ReleaseValidationError: If the release is not valid UTF-8 JSON, the
+            document lacks its nodes, or records lack their required fields;
+            the errors name the offending lines or records
+    """
+    path = Path(path) if path is not None else get_release_path()
+    raw = path.read_bytes()
+    checksum = release_checksum(path, raw)
+    sidecar = embeddings_path(path)
+    embeddings = np.load(sidecar, mmap_mode="r") if sidecar.exists() else None
+    errors: list[str] = []
+
+    if path.suffix == ".jsonl":
+        nodes: list[dict] = []
+        relationships: list[dict] = []
+        try:
+            lines = raw.decode("utf-8").splitlines()
+        except UnicodeDecodeError as exc:
+            raise ReleaseValidationError(path, [f"not UTF-8: {exc}"]) from exc
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                errors.append(f"line {number}: {exc}")
+                continue
+            error = _record_error(record)
+            if error is not None:
+                errors.append(f"line {number}: {error}")
+            elif not errors:
+                (relationships if is_relationship(record) else nodes).append(record)
+            if len(errors) >= _MAX_RECORD_ERRORS:
+                break
+        if errors:
+            raise ReleaseValidationError(path, errors)
+        return Release(
+            version=DEFAULT_RELEASE_VERSION,
+            nodes=nodes,
+            relationships=relationships,
+            checksum=checksum,
+            embeddings=embeddings,
+        )
+
+    try:
+        document = json.loads(raw)
+        version, nodes = document["version"], document["nodes"]
+        relationships = document.get("relationships", [])
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ReleaseValidationError(path, [str(exc)]) from exc
+    except (KeyError, TypeError, AttributeError) as exc:
+        raise ReleaseValidationError(path, ["document needs version and nodes"]) from exc
+    if not isinstance(nodes, list) or not isinstance(relationships, list):
+        raise ReleaseValidationError(path, ["nodes and relationships must be lists"])
+    for section, records in (("nodes", nodes), ("relationships", relationships)):
+        for index, record in enumerate(records):
+            error = _record_error(record)
+            if error is not None:
+                errors.append(f"{section}[{index}]: {error}")
+    if errors:
+        raise ReleaseValidationError(path, errors[:_MAX_RECORD_ERRORS])
+    return Release(
+        version=version,
+        nodes=nodes,
+        relationships=relationships,
+        checksum=checksum,
+        embeddings=embeddings,
+    )
@@ -0,0 +1,232 @@
+"""Hot reload of ontology releases: file watching and cross-agent notification."""
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from shared.ontology.release import DATA_DIR, embeddings_path
+from shared.ontology.snapshot import (
+    ReleaseValidationError,
+    ReloadResult,
+    SnapshotStore,
+    get_snapshot_store,
+)
+
+logger = logging.getLogger(__name__)
+
+RELEASE_NOTIFICATION_PATH = "/api/v1/admin/release"
+_SUBSCRIBER_URL_VARS = ("MAPPING_AGENT_URL", "UOM_AGENT_URL")
+
+
+class ReleaseNotification(BaseModel):
+    """Announcement of a newly active release, sent by the Ontology Agent."""
+
+    version: str = Field(..., description="Release version")
+    checksum: str = Field(..., description="Release checksum")
+    path: str | None = Field(None, description="Release file, relative to the data directory")
+
+
+def get_watch_interval() -> float:
+    """Seconds between release file checks, from ``ONTOLOGY_WATCH_INTERVAL`` (0 disables)."""
+    return float(os.getenv("ONTOLOGY_WATCH_INTERVAL", "5"))
+
+
+def get_subscriber_urls() -> list[str]:
+    """
+    Base URLs of agents to notify of new releases.
+
+    Taken from ``ONTOLOGY_SUBSCRIBER_URLS`` (comma-separated), or else the
+    URLs of the agents keeping derived ontology caches.
+    """
+    configured = os.getenv("ONTOLOGY_SUBSCRIBER_URLS")
+    if configured is not None:
+        return [url.strip() for url in configured.split(",") if url.strip()]
+    return [os.environ[name] for name in _SUBSCRIBER_URL_VARS if os.getenv(name)]
+
+
+def resolve_release_path(path: str | None) -> Path | None:
+    """
+    Resolve a release path received over HTTP.
+
+    Args:
+        path: Path relative to the data directory, or None for the current release
+
+    Returns:
+        Absolute path inside the data directory
+
+    Raises:
+        ValueError: If the path escapes the data directory
+    """
+    if path is None:
+        return None
+    resolved = (DATA_DIR / path).resolve()
+    if not resolved.is_relative_to(DATA_DIR.resolve()):
+        raise ValueError(f"Release path must be inside {DATA_DIR}")
+    return resolved
+
+
+def _relative_path(path: Path) -> str | None:
+    try:
+        return str(path.resolve().relative_to(DATA_DIR.resolve()))
+    except ValueError:
+        return None
+
+
+async def notify_subscribers(result: ReloadResult, path: Path) -> dict[str, str]:
+    """
+    Tell other agents that a new release is active.
+
+    Each agent loads the release itself and updates its derived caches from
+    the diff. Failures are logged and reported, never raised: an agent that
+    misses a notification keeps serving its current release.
+
+    Args:
+        result: Reload that produced the new release
+        path: Release file
+
+    Returns:
+        Outcome per subscriber URL
+    """
+    notification = ReleaseNotification(
+        version=result.snapshot.version,
+        checksum=result.snapshot.checksum,
+        path=_relative_path(path),
+    )
+    urls = get_subscriber_urls()
+    if not urls:
+        return {}
+
+    async def notify(client: httpx.AsyncClient, url: str) -> str:
+        try:
+            response = await client.post(
+                url.rstrip("/") + RELEASE_NOTIFICATION_PATH, json=notification.model_dump()
+            )
+            response.raise_for_status()
+            return str(response.json().get("status", "ok"))
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.warning("Could not notify %s of release %s: %s", url, notification.version, exc)
+            return f"error: {exc}"
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        outcomes = await asyncio.gather(*(notify(client, url) for url in urls))
+    return dict(zip(urls, outcomes, strict=True))
+
+
+class ReleaseWatcher:
+    """
+    Polls the release file and reloads the store when it changes.
+
+    Polling the size and modification time of the file and its embedding
+    sidecar is cheap, needs no extra dependency, and works on bind mounts
+    where inotify events are unreliable.
+    Releases are written by renaming a complete file into place, so a change
+    is never observed half-written.
+    """
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        interval: float,
+        on_reload: Callable[[ReloadResult], Awaitable[object]] | None = None,
+    ) -> None:
+        self._store = store
+        self._interval = interval
+        self._on_reload = on_reload
+        self._task: asyncio.Task[None] | None = None
+        self._signature: tuple[int, ...] | None = None
+
+    def _stat(self) -> tuple[int, ...] | None:
+        path = self._store.path
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        try:
+            sidecar = embeddings_path(path).stat()
+        except OSError:
+            return stat.st_mtime_ns, stat.st_size
+        return stat.st_mtime_ns, stat.st_size, sidecar.st_mtime_ns, sidecar.st_size
+
+    async def check(self) -> ReloadResult | None:
+        """
+        Reload if the release file changed since the last check.
+
+        Returns:
+            The reload result, or None when nothing changed or the new
+            release was rejected
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            result = await asyncio.to_thread(self._store.reload)
+        except (ReleaseValidationError, ValueError, OSError) as exc:
+            logger.error("Rejected release %s: %s", self._store.path, exc)
+            return None
+        if result.changed and self._on_reload is not None:
+            await self._on_reload(result)
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Release watcher check failed")
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        self._signature = self._stat()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+release_router = APIRouter()
+
+
+@release_router.post(RELEASE_NOTIFICATION_PATH)
+async def receive_release(notification: ReleaseNotification) -> dict:
+    """
+    Switch to a release announced by the Ontology Agent.
+
+    The release is loaded in a worker thread; derived caches registered for
+    incremental updates are carried over from the current snapshot.
+
+    Args:
+        notification: Announced release
+
+    Returns:
+        Reload summary
+    """
+    store = get_snapshot_store()
+    try:
+        path = resolve_release_path(notification.path)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if store.current().checksum == notification.checksum and path in (None, store.path):
+        return {"status": "unchanged", "version": notification.version}
+    try:
+        result = await asyncio.to_thread(store.reload, path)
+    except ReleaseValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors) from exc
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Release not found") from exc
+    return result.to_dict()
@@ -0,0 +1,600 @@
+"""Immutable in-process snapshot of an ontology release."""
+
+import logging
+import sys
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, TypeVar
+
+import numpy as np
+
+from shared.ontology.release import (
+    Release,
+    ReleaseValidationError,
+    get_release_path,
+    load_release,
+)
+from shared.ontology.text import normalize_text
+from shared.schemas.base import OntologyNode
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class NodeRecord:
+    """Compact, read-only ontology node."""
+
+    id: str
+    label: str
+    category: str
+    synonyms: tuple[str, ...]
+    attributes: MappingProxyType[str, Any]
+
+    def to_model(self) -> OntologyNode:
+        """Convert to the public ``OntologyNode`` schema."""
+        return OntologyNode.model_construct(
+            id=self.id,
+            label=self.label,
+            category=self.category,
+            synonyms=list(self.synonyms),
+            attributes=dict(self.attributes),
+            embedding=None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RelationshipRecord:
+    """Compact, read-only relationship between two nodes."""
+
+    source_id: str
+    target_id: str
+    relationship_type: str
+    attributes: MappingProxyType[str, Any]
+
+
+class OntologySnapshot:
+    """
+    Immutable view of one ontology release with hash indexes.
+
+    Nodes are stored once in a tuple; the id, synonym and category indexes
+    hold positions into it. Strings are interned so repeated ids and
+    categories across indexes share storage. ``embeddings``, when present,
+    is a float32 matrix with one row per node in the same order.
+    """
+
+    __slots__ = (
+        "version",
+        "checksum",
+        "nodes",
+        "relationships",
+        "embeddings",
+        "_by_id",
+        "_by_synonym",
+        "_by_category",
+        "_derived",
+    )
+
+    def __init__(
+        self,
+        version: str,
+        checksum: str,
+        nodes: tuple[NodeRecord, ...],
+        relationships: tuple[RelationshipRecord, ...] = (),
+        embeddings: np.ndarray | None = None,
+    ) -> None:
+        if embeddings is not None and embeddings.shape[0] != len(nodes):
+            raise ValueError(
+                f"Embedding matrix has {embeddings.shape[0]} rows for {len(nodes)} nodes"
+            )
+        self.version = version
+        self.checksum = checksum
+        self.nodes: Sequence[NodeRecord] = nodes
+        self.relationships: Sequence[RelationshipRecord] = relationships
+        self.embeddings = embeddings
+        self._derived: dict[str, Any] = {}
+
+        by_id: dict[str, int] = {}
+        by_synonym: dict[str, list[int]] = {}
+        by_category: dict[str, list[int]] = {}
+        for position, node in enumerate(nodes):
+            if node.id in by_id:
+                raise ValueError(f"Duplicate node id: {node.id}")
+            by_id[node.id] = position
+            by_category.setdefault(node.category, []).append(position)
+            for key in {normalize_text(node.label), *node.synonyms}:
+                if key:
+                    by_synonym.setdefault(key, []).append(position)
+
+        self._by_id = by_id
+        self._by_synonym = {key: tuple(value) for key, value in by_synonym.items()}
+        self._by_category = {key: tuple(value) for key, value in by_category.items()}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[NodeRecord]:
+        return iter(self.nodes)
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._by_id
+
+    def get(self, node_id: str) -> NodeRecord | None:
+        """Get a node by id."""
+        position = self.position(node_id)
+        return None if position is None else self.nodes[position]
+
+    def position(self, node_id: str) -> int | None:
+        """Get the position of a node in ``nodes``."""
+        return self._by_id.get(node_id)
+
+    def lookup_synonym(self, text: str) -> tuple[NodeRecord, ...]:
+        """Get the nodes whose label or a synonym normalizes to ``text``."""
+        positions = self._by_synonym.get(normalize_text(text), ())
+        return tuple(self.nodes[position] for position in positions)
+
+    def in_category(self, category: str) -> tuple[NodeRecord, ...]:
+        """Get all nodes of a category, in release order."""
+        positions = self._by_category.get(category, ())
+        return tuple(self.nodes[position] for position in positions)
+
+    def category_positions(self, category: str) -> tuple[int, ...]:
+        """Get the positions of all nodes of a category."""
+        return self._by_category.get(category, ())
+
+    def categories(self) -> list[str]:
+        """List the categories present in the snapshot."""
+        return list(self._by_category)
+
+    def derived(self, name: str, build: Callable[["OntologySnapshot"], T]) -> T:
+        """
+        Get a structure derived from this snapshot, building it on first use.
+
+        Derived indexes live and die with the snapshot they were built from,
+        so swapping in a new release never serves a stale index.
+
+        Args:
+            name: Cache key for the derived structure
+            build: Factory called with the snapshot when not yet built
+
+        Returns:
+            The derived structure
+        """
+        try:
+            return self._derived[name]  # type: ignore[no-any-return]
+        except KeyError:
+            value = self._derived[name] = build(self)
+            return value
+
+
+def _freeze_node(record: dict) -> NodeRecord:
+    synonyms = dict.fromkeys(
+        sys.intern(normalize_text(synonym)) for synonym in record.get("synonyms", [])
+    )
+    return NodeRecord(
+        id=sys.intern(record["id"]),
+        label=record["label"],
+        category=sys.intern(record["category"]),
+        synonyms=tuple(synonym for synonym in synonyms if synonym),
+        attributes=MappingProxyType(dict(record.get("attributes", {}))),
+    )
+
+
+def _freeze_relationship(record: dict) -> RelationshipRecord:
+    return RelationshipRecord(
+        source_id=sys.intern(record["source_id"]),
+        target_id=sys.intern(record["target_id"]),
+        relationship_type=sys.intern(record["relationship_type"]),
+        attributes=MappingProxyType(dict(record.get("attributes", {}))),
+    )
+
+
+def _stack_embeddings(release: Release) -> np.ndarray | None:
+    if release.embeddings is not None:
+        return release.embeddings
+    vectors = [record.get("embedding") for record in release.nodes]
+    present = [vector for vector in vectors if vector]
+    if not present:
+        return None
+    matrix = np.zeros((len(vectors), len(present[0])), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        if vector:
+            matrix[row] = vector
+    return matrix
+
+
+def build_snapshot(release: Release) -> OntologySnapshot:
+    """
+    Compile a release into an immutable snapshot.
+
+    Args:
+        release: Parsed release
+
+    Returns:
+        Snapshot with id, synonym and category indexes
+    """
+    return OntologySnapshot(
+        version=release.version,
+        checksum=release.checksum,
+        nodes=tuple(_freeze_node(record) for record in release.nodes),
+        relationships=tuple(_freeze_relationship(record) for record in release.relationships),
+        embeddings=_stack_embeddings(release),
+    )
+
+
+def open_snapshot(path: Path) -> OntologySnapshot:
+    """
+    Open a release file as a snapshot.
+
+    Compiled binary releases are memory-mapped; JSON and JSONL releases are
+    parsed and indexed in memory.
+
+    Args:
+        path: Release file
+
+    Returns:
+        Snapshot of the release
+    """
+    # The binary format builds on the records defined in this module
+    from shared.ontology.binary import MappedSnapshot, is_binary_release
+
+    if is_binary_release(path):
+        return MappedSnapshot(path)
+    return build_snapshot(load_release(path))
+
+
+@dataclass(frozen=True, slots=True)
+class SnapshotDiff:
+    """Node-level differences between two snapshots."""
+
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    changed: tuple[str, ...]
+    appended: bool
+    relationships_changed: bool
+    embeddings_changed: bool
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the snapshots hold the same nodes, relationships and embeddings."""
+        return not (
+            self.added
+            or self.removed
+            or self.changed
+            or self.relationships_changed
+            or self.embeddings_changed
+        )
+
+    def touches_category(
+        self, category: str, previous: OntologySnapshot, snapshot: OntologySnapshot
+    ) -> bool:
+        """Whether a node of ``category`` was added, removed or changed."""
+        for node_id in (*self.added, *self.changed):
+            node = snapshot.get(node_id)
+            if node is not None and node.category == category:
+                return True
+        for node_id in (*self.removed, *self.changed):
+            node = previous.get(node_id)
+            if node is not None and node.category == category:
+                return True
+        return False
+
+    def recategorized(self, previous: OntologySnapshot, snapshot: OntologySnapshot) -> bool:
+        """Whether a changed node moved to another category."""
+        for node_id in self.changed:
+            old, new = previous.get(node_id), snapshot.get(node_id)
+            if old is None or new is None or old.category != new.category:
+                return True
+        return False
+
+    def to_dict(self) -> dict:
+        """Summarize as counts."""
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "appended": self.appended,
+            "relationships_changed": self.relationships_changed,
+            "embeddings_changed": self.embeddings_changed,
+        }
+
+
+def diff_snapshots(previous: OntologySnapshot, snapshot: OntologySnapshot) -> SnapshotDiff:
+    """
+    Compare two snapshots node by node.
+
+    Args:
+        previous: Snapshot being replaced
+        snapshot: Snapshot replacing it
+
+    Returns:
+        Added, removed and changed node ids; ``appended`` is set when every
+        surviving node keeps its position and new nodes come after them
+    """
+    added: list[str] = []
+    changed: list[str] = []
+    appended = True
+    for position, node in enumerate(snapshot.nodes):
+        old_position = previous.position(node.id)
+        if old_position is None:
+            added.append(node.id)
+            appended = appended and position >= len(previous)
+            continue
+        appended = appended and old_position == position
+        if previous.nodes[old_position] != node:
+            changed.append(node.id)
+    removed = [node.id for node in previous.nodes if node.id not in snapshot]
+    appended = appended and not removed
+
+    old_embeddings, new_embeddings = previous.embeddings, snapshot.embeddings
+    if old_embeddings is None or new_embeddings is None:
+        embeddings_changed = old_embeddings is not new_embeddings
+    else:
+        embeddings_changed = not (
+            appended
+            and old_embeddings.shape[1] == new_embeddings.shape[1]
+            and np.array_equal(old_embeddings, new_embeddings[: len(previous)])
+        )
+
+    return SnapshotDiff(
+        added=tuple(added),
+        removed=tuple(removed),
+        changed=tuple(changed),
+        appended=appended,
+        relationships_changed=tuple(previous.relationships) != tuple(snapshot.relationships),
+        embeddings_changed=embeddings_changed,
+    )
+
+
+Updater = Callable[[Any, SnapshotDiff, OntologySnapshot, OntologySnapshot], Any]
+_updaters: dict[str, Updater] = {}
+
+
+def register_incremental(name: str, update: Updater) -> None:
+    """
+    Register how a derived structure follows a release change.
+
+    When a store swaps in a new snapshot, every structure already derived
+    from the previous one under ``name`` is passed to
+    ``update(value, diff, previous, snapshot)``. The updater returns the
+    structure for the new snapshot, or None to have it rebuilt from scratch
+    on first use. It must not mutate ``value``: requests still running on
+    the previous snapshot keep using it.
+
+    Args:
+        name: Derived structure key, as passed to ``OntologySnapshot.derived``
+        update: Updater function
+    """
+    _updaters[name] = update
+
+
+def _carry_over(
+    previous: OntologySnapshot, snapshot: OntologySnapshot, diff: SnapshotDiff
+) -> tuple[str, ...]:
+    carried = []
+    for name, value in list(previous._derived.items()):
+        update = _updaters.get(name)
+        if update is None:
+            continue
+        try:
+            updated = update(value, diff, previous, snapshot)
+        except Exception:
+            logger.exception("Incremental update of %s failed; rebuilding it", name)
+            continue
+        if updated is not None:
+            snapshot._derived[name] = updated
+            carried.append(name)
+    return tuple(carried)
+
+
+def validate_snapshot(snapshot: OntologySnapshot, max_errors: int = 20) -> list[str]:
+    """
+    Check a snapshot before making it active.
+
+    Node-level problems (duplicate ids, embedding shape) already fail the
+    build; this adds release-level checks.
+
+    Args:
+        snapshot: Candidate snapshot
+        max_errors: Stop after this many errors
+
+    Returns:
+        Error messages, empty when the snapshot can go live
+    """
+    errors = []
+    if not len(snapshot):
+        errors.append("release has no nodes")
+    for relationship in snapshot.relationships:
+        for node_id in (relationship.source_id, relationship.target_id):
+            if node_id not in snapshot:
+                errors.append(f"{relationship.relationship_type} references unknown node {node_id}")
+        if len(errors) >= max_errors:
+            break
+    return errors[:max_errors]
+
+
+@dataclass(frozen=True, slots=True)
+class ReloadResult:
+    """Outcome of ``SnapshotStore.reload``."""
+
+    snapshot: OntologySnapshot
+    previous: OntologySnapshot | None
+    diff: SnapshotDiff | None
+    reused: tuple[str, ...]
+    changed: bool
+
+    def to_dict(self) -> dict:
+        """Summarize for admin endpoints."""
+        return {
+            "status": "reloaded" if self.changed else "unchanged",
+            "version": self.snapshot.version,
+            "checksum": self.snapshot.checksum,
+            "previous_version": self.previous.version if self.previous is not None else None,
+            "diff": self.diff.to_dict() if self.diff is not None else None,
+            "reused": list(self.reused),
+        }
+
+
+class SnapshotStore:
+    """
+    Holds the active snapshot of a process.
+
+    Readers take a reference with ``current()``, or a counted one with
+    ``lease()``, and keep using it for the duration of a request;
+    ``reload()`` builds and validates the next snapshot off to the side,
+    carries derived structures over, and replaces the reference in a single
+    assignment. A replaced snapshot lives on until its last lease ends.
+    """
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self._path = Path(path) if path is not None else None
+        self._snapshot: OntologySnapshot | None = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._leases: dict[int, int] = {}
+        self._listeners: list[Callable[[ReloadResult], None]] = []
+
+    @property
+    def path(self) -> Path:
+        """Release file the store loads from."""
+        return self._path if self._path is not None else get_release_path()
+
+    def current(self) -> OntologySnapshot:
+        """Get the active snapshot, loading the release on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = open_snapshot(self.path)
+                snapshot = self._snapshot
+        return snapshot
+
+    @contextmanager
+    def lease(self) -> Iterator[OntologySnapshot]:
+        """
+        Hold the active snapshot for the duration of a block.
+
+        The snapshot stays usable even if a reload replaces it meanwhile;
+        the store logs when the last lease on a replaced snapshot ends.
+
+        Yields:
+            The snapshot active when the lease was taken
+        """
+        self.current()
+        with self._lock:
+            snapshot = self._snapshot
+            assert snapshot is not None
+            self._leases[id(snapshot)] = self._leases.get(id(snapshot), 0) + 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                remaining = self._leases.pop(id(snapshot)) - 1
+                if remaining:
+                    self._leases[id(snapshot)] = remaining
+                drained = not remaining and snapshot is not self._snapshot
+            if drained:
+                logger.info("Release %s (%s) drained", snapshot.version, snapshot.checksum[:12])
+
+    def leases(self, snapshot: OntologySnapshot) -> int:
+        """Number of leases currently held on a snapshot."""
+        with self._lock:
+            return self._leases.get(id(snapshot), 0)
+
+    def subscribe(self, listener: Callable[[ReloadResult], None]) -> None:
+        """Call ``listener`` after every reload that changed the snapshot."""
+        self._listeners.append(listener)
+
+    def reload(self, path: Path | str | None = None, force: bool = False) -> ReloadResult:
+        """
+        Build, validate and activate a release.
+
+        Blocking; run it in a worker thread from async code. Reloads are
+        serialized, and readers are never blocked while the next snapshot
+        is built.
+
+        Args:
+            path: Release file (default: the store's current path)
+            force: Swap even if the release checksum is unchanged
+
+        Returns:
+            What changed, and which derived structures were carried over
+
+        Raises:
+            ReleaseValidationError: If the release fails validation; the
+                active snapshot is left in place
+        """
+        with self._reload_lock:
+            path = Path(path) if path is not None else self.path
+            snapshot = open_snapshot(path)
+            errors = validate_snapshot(snapshot)
+            if errors:
+                raise ReleaseValidationError(path, errors)
+
+            previous = self._snapshot
+            if (
+                not force
+                and previous is not None
+                and path == self.path
+                and previous.checksum == snapshot.checksum
+            ):
+                return ReloadResult(previous, previous, None, (), changed=False)
+
+            diff = diff_snapshots(previous, snapshot) if previous is not None else None
+            reused: tuple[str, ...] = ()
+            if previous is not None and diff is not None:
+                reused = _carry_over(previous, snapshot, diff)
+            with self._lock:
+                self._path = path
+                self._snapshot = snapshot
+
+        result = ReloadResult(snapshot, previous, diff, reused, changed=True)
+        logger.info(
+            "Release %s (%s) active, replacing %s",
+            snapshot.version,
+            snapshot.checksum[:12],
+            previous.version if previous is not None else None,
+        )
+        for listener in list(self._listeners):
+            listener(result)
+        return result
+
+    def load(self, path: Path | str | None = None) -> OntologySnapshot:
+        """
+        Load a release and make it the active snapshot.
+
+        Args:
+            path: Release file (default: the store's current path)
+
+        Returns:
+            Newly active snapshot
+        """
+        return self.reload(path, force=True).snapshot
+
+    def swap(self, snapshot: OntologySnapshot) -> OntologySnapshot | None:
+        """Replace the active snapshot, returning the previous one."""
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+        return previous
+
+
+_default_store: SnapshotStore | None = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Get the process-wide snapshot store."""
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
+
+
+async def leased_snapshot() -> AsyncIterator[OntologySnapshot]:
+    """FastAPI dependency holding a lease on the active snapshot for one request."""
+    with get_snapshot_store().lease() as snapshot:
+        yield snapshot
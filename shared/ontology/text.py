@@ -0,0 +1,27 @@
+"""Text normalization helpers for ontology lookups."""
+
+import re
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for index lookups.
+
+    Case-folds the input and collapses punctuation and whitespace runs into
+    single spaces, so "Chicken-Breast " and "chicken breast" share a key.
+
+    Args:
+        text: Raw input text
+
+    Returns:
+        Normalized text
+    """
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of normalized text, padded at the edges."""
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,489 @@
+"""Unit of measure conversion tables compiled from ontology units."""
+
+import copy
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from shared.ontology.snapshot import NodeRecord, OntologySnapshot, SnapshotDiff
+from shared.ontology.text import normalize_text
+
+
+class UnknownUnitError(ValueError):
+    """Raised when a unit code does not resolve to any known unit."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(f"Unknown unit: {code!r}")
+        self.code = code
+
+
+class IncompatibleUnitsError(ValueError):
+    """Raised when converting between units of different dimensions."""
+
+    def __init__(self, from_unit: "Unit", to_unit: "Unit") -> None:
+        super().__init__(
+            f"Cannot convert {from_unit.label} ({from_unit.dimension}) "
+            f"to {to_unit.label} ({to_unit.dimension})"
+        )
+        self.from_unit = from_unit
+        self.to_unit = to_unit
+
+
+class MissingItemDataError(ValueError):
+    """Raised when an item lacks the density or unit weight a conversion needs."""
+
+
+@dataclass(frozen=True, slots=True)
+class Unit:
+    """A unit resolved to its slot in a dimension table."""
+
+    id: str
+    label: str
+    dimension: str
+    index: int
+    to_base: float
+
+
+@dataclass(frozen=True, slots=True)
+class BatchConversion:
+    """Result of converting a column of values."""
+
+    values: np.ndarray
+    errors: dict[int, str]
+
+
+@dataclass(slots=True)
+class _DimensionTable:
+    """All-pairs conversion factors for one dimension."""
+
+    units: list[Unit] = field(default_factory=list)
+    scale: np.ndarray = field(default_factory=lambda: np.ones(4))
+    factors: np.ndarray = field(default_factory=lambda: np.ones((4, 4)))
+
+    def put(self, index: int, to_base: float) -> None:
+        """Set a unit's scale and refresh only its row and column."""
+        capacity = len(self.scale)
+        if index >= capacity:
+            grown = max(capacity * 2, index + 1)
+            scale = np.ones(grown)
+            scale[:capacity] = self.scale
+            factors = np.ones((grown, grown))
+            factors[:capacity, :capacity] = self.factors
+            self.scale, self.factors = scale, factors
+        self.scale[index] = to_base
+        size = len(self.units)
+        self.factors[index, :size] = to_base / self.scale[:size]
+        self.factors[:size, index] = self.scale[:size] / to_base
+
+
+def _in_dependency_order(nodes: Sequence[NodeRecord]) -> list[NodeRecord]:
+    """Order unit nodes so each comes after the node its ``base_unit`` names."""
+    by_alias: dict[str, NodeRecord] = {}
+    for node in nodes:
+        for alias in (node.id, node.label, *node.synonyms):
+            by_alias.setdefault(normalize_text(alias), node)
+    placed: set[str] = set()
+    ordered: list[NodeRecord] = []
+    for node in nodes:
+        # Each unit has at most one base, so its dependencies form a chain
+        chain: list[NodeRecord] = []
+        current: NodeRecord | None = node
+        while current is not None and current.id not in placed:
+            placed.add(current.id)
+            chain.append(current)
+            base_unit = current.attributes.get("base_unit")
+            current = by_alias.get(normalize_text(base_unit)) if base_unit else None
+        ordered.extend(reversed(chain))
+    return ordered
+
+
+class UnitTable:
+    """
+    Conversion graph of units, compiled into per-dimension factor matrices.
+
+    Each ``unit_of_measure`` node points at a base unit with a
+    ``conversion_factor``; following those edges gives every unit a scale
+    relative to the root of its dimension. The scales are then expanded into
+    an all-pairs matrix per dimension, so a conversion is one array lookup
+    and one multiply. Adding or changing a unit only refreshes that unit's
+    row and column.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[str, _DimensionTable] = {}
+        self._aliases: dict[str, Unit] = {}
+        self._units: dict[str, Unit] = {}
+        self._aliases_of: dict[str, list[str]] = {}
+        self._dependents: dict[str, list[str]] = {}
+        self._base_of: dict[str, tuple[str, float]] = {}
+        # Base units added implicitly as roots because no unit defines them
+        self._implicit: set[str] = set()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "UnitTable":
+        """Compile the units of a snapshot, each after the unit it is based on."""
+        table = cls()
+        for node in _in_dependency_order(snapshot.in_category("unit_of_measure")):
+            table.add_node(node)
+        return table
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def updated(
+        self, diff: SnapshotDiff, previous: OntologySnapshot, snapshot: OntologySnapshot
+    ) -> "UnitTable | None":
+        """
+        Follow a release change by re-adding only the units it touches.
+
+        Units defined at runtime with ``add_unit`` are kept. Removed units, or
+        units moving to another dimension, need a rebuild.
+
+        Args:
+            diff: Changes from ``previous`` to ``snapshot``
+            previous: Snapshot this table was built from
+            snapshot: New snapshot
+
+        Returns:
+            Table for ``snapshot``, or None when it must be rebuilt
+        """
+        if not diff.touches_category("unit_of_measure", previous, snapshot):
+            return self
+        touched = []
+        for node_id in diff.removed:
+            node = previous.get(node_id)
+            if node is not None and node.category == "unit_of_measure":
+                return None
+        for node_id in (*diff.changed, *diff.added):
+            old, new = previous.get(node_id), snapshot.get(node_id)
+            if old is not None and old.category == "unit_of_measure":
+                if new is None or new.category != old.category:
+                    return None
+                if new.attributes.get("dimension") != old.attributes.get("dimension"):
+                    return None
+            if new is not None and new.category == "unit_of_measure":
+                touched.append(new)
+        for node in touched:
+            for alias in (node.id, node.label, *node.synonyms):
+                held = self._aliases.get(normalize_text(alias))
+                if held is not None and held.id in self._implicit:
+                    # The unit now defines an implicit root; its dependents need its scale
+                    return None
+
+        # Copy so requests still on the previous snapshot see a stable table
+        table = copy.deepcopy(self)
+        for node in _in_dependency_order(touched):
+            table.add_node(node)
+        return table
+
+    def dimensions(self) -> list[str]:
+        """List the dimensions with at least one unit."""
+        return list(self._tables)
+
+    def add_node(self, node: NodeRecord) -> Unit:
+        """Add or update a unit from a ``unit_of_measure`` node."""
+        attributes = node.attributes
+        return self.add_unit(
+            unit_id=node.id,
+            label=node.label,
+            dimension=attributes["dimension"],
+            base_unit=attributes.get("base_unit"),
+            conversion_factor=float(attributes.get("conversion_factor", 1)),
+            aliases=(node.label, *node.synonyms),
+        )
+
+    def add_unit(
+        self,
+        unit_id: str,
+        label: str,
+        dimension: str,
+        base_unit: str | None = None,
+        conversion_factor: float = 1.0,
+        aliases: tuple[str, ...] = (),
+    ) -> Unit:
+        """
+        Add or update a unit.
+
+        A base unit that is not itself a known unit (e.g. "gram") is added as
+        the scale-1 root of the dimension, so a unit must be added after the
+        unit it is based on. Updating a unit also refreshes every unit
+        defined relative to it.
+
+        Args:
+            unit_id: Unit identifier (ontology node id)
+            label: Human-readable label
+            dimension: Physical dimension (mass, volume, length, count)
+            base_unit: Unit this one is defined against
+            conversion_factor: Base units per one of this unit
+            aliases: Labels and synonyms that resolve to this unit
+
+        Returns:
+            The resolved unit
+        """
+        if conversion_factor <= 0:
+            raise ValueError(f"Conversion factor of {unit_id!r} must be positive")
+
+        to_base = conversion_factor
+        if base_unit is not None and normalize_text(base_unit) != normalize_text(label):
+            base = self._aliases.get(normalize_text(base_unit))
+            if base is None:
+                base = self.add_unit(base_unit, base_unit, dimension, aliases=(base_unit,))
+                self._implicit.add(base.id)
+            elif base.dimension != dimension:
+                raise ValueError(f"Base unit of {unit_id!r} is not a {dimension} unit")
+            to_base *= base.to_base
+            self._base_of[unit_id] = (base.id, conversion_factor)
+            if unit_id not in self._dependents.setdefault(base.id, []):
+                self._dependents[base.id].append(unit_id)
+
+        existing = self._units.get(unit_id)
+        if existing is not None and existing.dimension != dimension:
+            raise ValueError(f"Unit {unit_id!r} cannot change dimension")
+
+        table = self._tables.setdefault(dimension, _DimensionTable())
+        index = existing.index if existing is not None else len(table.units)
+        unit = Unit(id=unit_id, label=label, dimension=dimension, index=index, to_base=to_base)
+        if existing is None:
+            table.units.append(unit)
+        else:
+            table.units[index] = unit
+        table.put(index, to_base)
+
+        self._units[unit_id] = unit
+        keys = self._aliases_of.setdefault(unit_id, [])
+        for alias in (unit_id, *aliases):
+            key = normalize_text(alias)
+            if key and key not in keys:
+                keys.append(key)
+        for key in keys:
+            self._aliases.setdefault(key, unit)
+            if self._aliases[key].id == unit_id:
+                self._aliases[key] = unit
+
+        if existing is not None and existing.to_base != to_base:
+            for dependent_id in self._dependents.get(unit_id, ()):
+                dependent = self._units[dependent_id]
+                _, factor = self._base_of[dependent_id]
+                self.add_unit(dependent_id, dependent.label, dimension, unit_id, factor)
+        return unit
+
+    def resolve(self, code: str) -> Unit:
+        """
+        Resolve a unit id, label or synonym.
+
+        Args:
+            code: Unit code such as "kg", "Kilogram" or "unit_001"
+
+        Returns:
+            The resolved unit
+
+        Raises:
+            UnknownUnitError: If the code matches no unit
+        """
+        unit = self._units.get(code) or self._aliases.get(normalize_text(code))
+        if unit is None:
+            raise UnknownUnitError(code)
+        return unit
+
+    def factor(self, from_unit: str, to_unit: str) -> float:
+        """
+        Get the multiplier converting ``from_unit`` values to ``to_unit``.
+
+        Raises:
+            UnknownUnitError: If either unit is unknown
+            IncompatibleUnitsError: If the units measure different dimensions
+        """
+        source = self.resolve(from_unit)
+        target = self.resolve(to_unit)
+        if source.dimension != target.dimension:
+            raise IncompatibleUnitsError(source, target)
+        return float(self._tables[source.dimension].factors[source.index, target.index])
+
+    def convert(self, value: float, from_unit: str, to_unit: str) -> float:
+        """Convert a value between two units of the same dimension."""
+        return value * self.factor(from_unit, to_unit)
+
+    def base_unit(self, dimension: str) -> Unit:
+        """Get the scale-1 root unit of a dimension."""
+        for unit in self._tables[dimension].units:
+            if unit.to_base == 1.0 and unit.id not in self._base_of:
+                return unit
+        return self._tables[dimension].units[0]
+
+    def units(self, dimension: str | None = None) -> list[Unit]:
+        """List units, optionally restricted to one dimension."""
+        if dimension is not None:
+            table = self._tables.get(dimension)
+            return list(table.units) if table is not None else []
+        return [unit for table in self._tables.values() for unit in table.units]
+
+    def matrix(self, dimension: str) -> np.ndarray:
+        """Get the all-pairs factor matrix of a dimension, in unit index order."""
+        table = self._tables[dimension]
+        size = len(table.units)
+        return table.factors[:size, :size]
+
+    def convert_many(
+        self,
+        values: np.ndarray,
+        from_units: str | Sequence[str],
+        to_units: str | Sequence[str],
+    ) -> BatchConversion:
+        """
+        Convert a column of values in one vectorized pass.
+
+        Unit code columns are factorized into integer codes and each distinct
+        code is resolved once; rows are then converted per dimension with
+        fancy indexing into the factor matrices. Rows that cannot be converted are
+        NaN in the output and listed in ``errors``.
+
+        Args:
+            values: Values to convert
+            from_units: Source unit code per row, or one code for all rows
+            to_units: Target unit code per row, or one code for all rows
+
+        Returns:
+            Converted values and per-row errors
+        """
+        values = np.asarray(values, dtype=np.float64)
+        source_dims, source_index, source_errors = self._resolve_column(from_units, len(values))
+        target_dims, target_index, target_errors = self._resolve_column(to_units, len(values))
+
+        valid = (source_dims >= 0) & (target_dims >= 0) & (source_dims == target_dims)
+        converted = np.full(len(values), np.nan)
+        dimensions = list(self._tables)
+        for dimension_id in np.unique(source_dims[valid]):
+            rows = valid & (source_dims == dimension_id)
+            factors = self._tables[dimensions[dimension_id]].factors
+            converted[rows] = values[rows] * factors[source_index[rows], target_index[rows]]
+
+        errors: dict[int, str] = {}
+        for row in np.flatnonzero(~valid).tolist():
+            if source_dims[row] < 0:
+                errors[row] = source_errors[row]
+            elif target_dims[row] < 0:
+                errors[row] = target_errors[row]
+            else:
+                errors[row] = (
+                    f"Cannot convert {dimensions[source_dims[row]]} "
+                    f"to {dimensions[target_dims[row]]}"
+                )
+        return BatchConversion(values=converted, errors=errors)
+
+    def _resolve_column(
+        self, codes: str | Sequence[str], rows: int
+    ) -> tuple[np.ndarray, np.ndarray, "_ErrorLookup"]:
+        if isinstance(codes, str):
+            distinct, inverse = [codes], np.zeros(rows, dtype=np.intp)
+        else:
+            if len(codes) != rows:
+                raise ValueError(f"Expected {rows} unit codes, got {len(codes)}")
+            positions: dict[str, int] = {}
+            inverse = np.fromiter(
+                (positions.setdefault(code, len(positions)) for code in codes),
+                dtype=np.intp,
+                count=rows,
+            )
+            distinct = list(positions)
+
+        dimension_ids = {dimension: i for i, dimension in enumerate(self._tables)}
+        distinct_dims = np.full(len(distinct), -1, dtype=np.intp)
+        distinct_index = np.zeros(len(distinct), dtype=np.intp)
+        messages: dict[int, str] = {}
+        for position, code in enumerate(distinct):
+            try:
+                unit = self.resolve(code)
+            except UnknownUnitError as exc:
+                messages[position] = str(exc)
+                continue
+            distinct_dims[position] = dimension_ids[unit.dimension]
+            distinct_index[position] = unit.index
+        return distinct_dims[inverse], distinct_index[inverse], _ErrorLookup(inverse, messages)
+
+
+def item_factor(
+    table: UnitTable,
+    node: NodeRecord | None,
+    from_unit: str,
+    to_unit: str,
+) -> float:
+    """
+    Get the conversion multiplier for a specific item, across dimensions.
+
+    Within one dimension this is the plain unit factor. Across dimensions both
+    units are expressed in grams of the item: volume through its
+    ``density_g_per_ml`` attribute and count through its ``unit_weight_g``
+    attribute, so "2 cups rice" can be stocked in grams.
+
+    Args:
+        table: Unit table
+        node: Ontology node of the item, required across dimensions
+        from_unit: Source unit code
+        to_unit: Target unit code
+
+    Returns:
+        Multiplier converting ``from_unit`` values of the item to ``to_unit``
+
+    Raises:
+        UnknownUnitError: If either unit is unknown
+        IncompatibleUnitsError: If the dimensions differ and no item is given
+        MissingItemDataError: If the item lacks the attribute a bridge needs,
+            or it is not a positive finite number
+    """
+    source = table.resolve(from_unit)
+    target = table.resolve(to_unit)
+    if source.dimension == target.dimension:
+        return table.factor(source.id, target.id)
+    if node is None:
+        raise IncompatibleUnitsError(source, target)
+    return _grams_per_unit(table, node, source) / _grams_per_unit(table, node, target)
+
+
+_ITEM_BRIDGES = {
+    "mass": ("gram", None),
+    "volume": ("milliliter", "density_g_per_ml"),
+    "count": ("each", "unit_weight_g"),
+}
+
+
+def _grams_per_unit(table: UnitTable, node: NodeRecord, unit: Unit) -> float:
+    bridge = _ITEM_BRIDGES.get(unit.dimension)
+    if bridge is None:
+        raise MissingItemDataError(f"No item conversion for {unit.dimension} units")
+    base_unit, attribute = bridge
+    factor = table.factor(unit.id, base_unit)
+    if attribute is None:
+        return factor
+    value = node.attributes.get(attribute)
+    if value is None:
+        raise MissingItemDataError(
+            f"{node.label} has no {attribute} for {unit.dimension} conversion"
+        )
+    return factor * _positive_grams(node, attribute, value)
+
+
+def _positive_grams(node: NodeRecord, attribute: str, value: object) -> float:
+    grams = math.nan
+    if isinstance(value, int | float | str) and not isinstance(value, bool):
+        try:
+            grams = float(value)
+        except ValueError:
+            pass
+    if not math.isfinite(grams) or grams <= 0:
+        raise MissingItemDataError(
+            f"{node.label} has an invalid {attribute} {value!r}, expected a positive number"
+        )
+    return grams
+
+
+class _ErrorLookup:
+    """Maps a row to the resolution error of its distinct unit code."""
+
+    def __init__(self, inverse: np.ndarray, messages: dict[int, str]) -> None:
+        self._inverse = inverse
+        self._messages = messages
+
+    def __getitem__(self, row: int) -> str:
+        return self._messages[int(self._inverse[row])]
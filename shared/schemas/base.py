@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, FiniteFloat
 
 
 class HealthResponse(BaseModel):
@@ -28,6 +28,7 @@ class OntologyNode(BaseModel):
     id: str = Field(..., description="Unique identifier for the node")
     label: str = Field(..., description="Human-readable label")
     category: str = Field(..., description="Ontology category (e.g., food, unit, property)")
+    synonyms: list[str] = Field(default_factory=list, description="Alternative names")
     attributes: dict = Field(default_factory=dict, description="Additional attributes")
     embedding: list[float] | None = Field(None, description="Vector embedding")
 
@@ -46,3 +47,35 @@ class MappingResponse(BaseModel):
     mapped_node_id: str | None = Field(None, description="ID of matched ontology node")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score")
     alternatives: list[dict] = Field(default_factory=list, description="Alternative matches")
+    quantity: float | None = Field(None, description="Quantity parsed from the text")
+    unit_node_id: str | None = Field(None, description="ID of the parsed unit of measure node")
+
+
+class RerankContext(BaseModel):
+    """Scoring context of a rerank request; other keys are ignored."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    category: str | None = Field(None, description="Category favoured when no priors are given")
+    category_priors: dict[str, FiniteFloat] | None = Field(
+        None, description="Prior per candidate category"
+    )
+    query_embedding: list[FiniteFloat] | None = Field(
+        None, min_length=1, description="Embedding of the query"
+    )
+
+
+class RerankRequest(BaseModel):
+    """Request for reranking results."""
+
+    query: str = Field(..., description="Original search query")
+    candidates: list[dict] = Field(..., description="Candidate results to rerank")
+    context: RerankContext | None = Field(None, description="Scoring context")
+    top_k: int | None = Field(None, ge=1, description="Return only the k best candidates")
+
+
+class RerankResponse(BaseModel):
+    """Response from reranking."""
+
+    query: str
+    reranked_results: list[dict] = Field(..., description="Reranked results, best first")
@@ -1,9 +1,19 @@
 """Database utilities and connection management."""
 
 import os
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+_waiting = 0
 
 
 def get_database_url() -> str:
@@ -17,11 +27,113 @@ def get_database_url() -> str:
     return database_url
 
 
+def get_pool_settings() -> dict:
+    """
+    Get connection pool settings from environment.
+
+    Environment variables:
+        DB_POOL_SIZE: Persistent connections kept per process (default: 5)
+        DB_MAX_OVERFLOW: Extra connections allowed under load (default: 10)
+        DB_POOL_TIMEOUT: Seconds to wait for a free connection (default: 30)
+        DB_POOL_RECYCLE: Seconds before a connection is replaced (default: 1800)
+        DB_POOL_PRE_PING: Check connections on checkout (default: true)
+        DB_STATEMENT_CACHE_SIZE: Prepared statements cached per connection (default: 100)
+
+    Returns:
+        Keyword arguments for ``create_async_engine``
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+        "connect_args": {
+            "prepared_statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+        },
+    }
+
+
+def init_engine() -> AsyncEngine:
+    """
+    Create the process-wide engine and session factory.
+
+    Safe to call more than once; later calls return the existing engine.
+
+    Returns:
+        Shared async engine
+    """
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = create_async_engine(get_database_url(), echo=False, **get_pool_settings())
+        _sessionmaker = async_sessionmaker(
+            bind=_engine, class_=AsyncSession, expire_on_commit=False
+        )
+    return _engine
+
+
+def get_engine() -> AsyncEngine:
+    """Get the process-wide engine, creating it on first use."""
+    return _engine if _engine is not None else init_engine()
+
+
+async def dispose_engine() -> None:
+    """Close all pooled connections and drop the process-wide engine."""
+    global _engine, _sessionmaker
+    engine, _engine, _sessionmaker = _engine, None, None
+    if engine is not None:
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def engine_lifespan() -> AsyncIterator[AsyncEngine]:
+    """Create the shared engine for an app's lifespan and dispose it on shutdown."""
+    engine = init_engine()
+    try:
+        yield engine
+    finally:
+        await dispose_engine()
+
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session for dependency injection."""
-    database_url = get_database_url()
-    engine = create_async_engine(database_url, echo=False)
-    async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    global _waiting
+    get_engine()
+    assert _sessionmaker is not None
 
-    async with async_session() as session:
+    async with _sessionmaker() as session:
+        _waiting += 1
+        try:
+            await session.connection()
+        finally:
+            _waiting -= 1
         yield session
+
+
+def pool_metrics() -> dict:
+    """
+    Get connection pool metrics for this process.
+
+    Returns:
+        Pool size, checked-in/checked-out connections, overflow in use and
+        sessions waiting for a connection
+    """
+    if _engine is None:
+        return {
+            "initialized": False,
+            "size": 0,
+            "checked_in": 0,
+            "checked_out": 0,
+            "overflow": 0,
+            "waiting": _waiting,
+        }
+
+    pool = _engine.pool
+    return {
+        "initialized": True,
+        "size": pool.size(),  # type: ignore[attr-defined]
+        "checked_in": pool.checkedin(),  # type: ignore[attr-defined]
+        "checked_out": pool.checkedout(),  # type: ignore[attr-defined]
+        "overflow": max(pool.overflow(), 0),  # type: ignore[attr-defined]
+        "waiting": _waiting,
+    }
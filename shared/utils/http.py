@@ -0,0 +1,568 @@
+"""Pooled HTTP clients for calls between agents, or in-process calls when combined."""
+
+import asyncio
+import math
+import os
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+import httpx
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from shared.utils.logging import REQUEST_ID_HEADER, get_request_id
+
+# Remaining time budget of a request in milliseconds, relative rather than an
+# absolute timestamp so agents do not need synchronized clocks
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
+LocalHandler = Callable[[Any], Awaitable[BaseModel]]
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+_clients: dict[str, "AgentClient | LocalAgentClient"] = {}
+_handlers: dict[tuple[str, str], LocalHandler] = {}
+_local_agents: set[str] = set()
+
+
+class AgentUnavailableError(Exception):
+    """Raised when another agent cannot answer a call."""
+
+
+class CircuitOpenError(AgentUnavailableError):
+    """Raised without calling when an agent's circuit breaker is open."""
+
+
+class DeadlineExceededError(AgentUnavailableError):
+    """Raised when the deadline of the current request has passed."""
+
+
+class AgentCallError(Exception):
+    """Raised when another agent rejects a call."""
+
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_client_settings() -> dict:
+    """
+    Get inter-agent client settings from environment.
+
+    Environment variables:
+        AGENT_HTTP_TIMEOUT: Seconds per call when no deadline is set (default: 5)
+        AGENT_HTTP_MAX_CONNECTIONS: Connections per target agent (default: 100)
+        AGENT_HTTP_MAX_KEEPALIVE: Idle connections kept open per target (default: 20)
+        AGENT_HTTP_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default: 30)
+        AGENT_HTTP_RETRIES: Retries of idempotent calls (default: 2)
+        AGENT_HTTP_BACKOFF: Base retry delay in seconds, doubled per retry (default: 0.05)
+        AGENT_BREAKER_THRESHOLD: Consecutive failures that open the circuit (default: 5)
+        AGENT_BREAKER_RESET: Seconds before an open circuit lets a probe through (default: 30)
+
+    Returns:
+        Keyword arguments for ``AgentClient``
+    """
+    return {
+        "timeout": float(os.getenv("AGENT_HTTP_TIMEOUT", "5")),
+        "max_connections": int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", "100")),
+        "max_keepalive": int(os.getenv("AGENT_HTTP_MAX_KEEPALIVE", "20")),
+        "keepalive_expiry": float(os.getenv("AGENT_HTTP_KEEPALIVE_EXPIRY", "30")),
+        "retries": int(os.getenv("AGENT_HTTP_RETRIES", "2")),
+        "backoff": float(os.getenv("AGENT_HTTP_BACKOFF", "0.05")),
+        "failure_threshold": int(os.getenv("AGENT_BREAKER_THRESHOLD", "5")),
+        "reset_timeout": float(os.getenv("AGENT_BREAKER_RESET", "30")),
+    }
+
+
+def remaining() -> float | None:
+    """Seconds left until the current request's deadline, None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Bound the calls made inside the block to ``seconds`` from now.
+
+    An enclosing deadline that is earlier still applies. Infinite or NaN
+    ``seconds`` add no bound.
+    """
+    current = _deadline.get()
+    at = time.monotonic() + seconds if math.isfinite(seconds) else current
+    if current is not None and at is not None:
+        at = min(current, at)
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineMiddleware:
+    """
+    Adopt the deadline sent by the calling agent.
+
+    Requests whose budget is already spent are answered with 504 before any
+    work is done; otherwise calls this request makes to other agents inherit
+    the remaining budget. Values that are not finite numbers are ignored
+    like a missing header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = DEADLINE_HEADER.lower().encode()
+        value = next((v for k, v in scope["headers"] if k == header), None)
+        try:
+            budget = float(value) / 1000 if value is not None else None
+        except ValueError:
+            budget = None
+        if budget is None or not math.isfinite(budget):
+            await self.app(scope, receive, send)
+            return
+        if budget <= 0:
+            response = JSONResponse({"detail": "Deadline exceeded"}, status_code=504)
+            await response(scope, receive, send)
+            return
+        token = _deadline.set(time.monotonic() + budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+
+class CircuitBreaker:
+    """
+    Stops calling an agent after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately, so a slow agent does not tie up connections and
+    callers' time. After ``reset_timeout`` seconds one probe call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._clock = clock
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """Closed, open, or half-open when a probe is due or in flight."""
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Check whether a call may go through now, claiming the probe if one is due."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back a claimed probe whose call ended without an outcome."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold or on a failed probe."""
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                self.opened += 1
+            self._opened_at = self._clock()
+            self._probing = False
+
+
+class AgentClient:
+    """
+    Client of one target agent.
+
+    One pooled ``httpx.AsyncClient`` per target keeps connections alive
+    between calls. Every call carries the remaining deadline in
+    ``DEADLINE_HEADER`` and never waits past it. Idempotent calls are
+    retried on connection errors, timeouts and 502/503/504 with full-jitter
+    exponential backoff, so retries from many callers do not synchronize.
+    Those failures and other 5xx answers feed a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.05,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self._sleep = sleep
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the target agent."""
+        return str(self._client.base_url)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        idempotent: bool | None = None,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Call the target agent.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the agent's base URL
+            idempotent: Whether the call may be retried, by default true for
+                GET, HEAD, OPTIONS, PUT and DELETE
+            timeout: Seconds for the whole call including retries, by default
+                the client timeout; the request's deadline still applies
+            **kwargs: Passed to ``httpx.AsyncClient.request``
+
+        Returns:
+            Response, which may have an error status other than 502-504
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            DeadlineExceededError: If the deadline passes before an answer
+            AgentUnavailableError: If the agent fails on every attempt
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        with deadline(self.timeout if timeout is None else timeout):
+            attempts = 1 + (self.retries if idempotent else 0)
+            for attempt in range(attempts):
+                if attempt:
+                    await self._backoff(attempt)
+                try:
+                    return await self._attempt(method, path, kwargs)
+                except DeadlineExceededError:
+                    raise
+                except AgentUnavailableError as exc:
+                    if attempt + 1 == attempts or isinstance(exc, CircuitOpenError):
+                        raise
+                    self.retried += 1
+        raise AssertionError("unreachable")
+
+    async def call(
+        self,
+        path: str,
+        body: BaseModel,
+        response_model: type[ResponseModel],
+        *,
+        idempotent: bool = False,
+        timeout: float | None = None,
+    ) -> ResponseModel:
+        """
+        POST a request model to an endpoint and parse its response model.
+
+        Args:
+            path: Endpoint path
+            body: Request model of the endpoint
+            response_model: Response model of the endpoint
+            idempotent: Whether the call may be retried
+            timeout: Seconds for the whole call, see ``request``
+
+        Returns:
+            Parsed response
+
+        Raises:
+            AgentCallError: If the agent rejects the call or answers something
+                that does not parse
+            AgentUnavailableError: If the agent cannot answer
+        """
+        response = await self.request(
+            "POST",
+            path,
+            json=body.model_dump(mode="json"),
+            idempotent=idempotent,
+            timeout=timeout,
+        )
+        if response.is_error:
+            raise AgentCallError(
+                f"{self.name} answered {response.status_code}: {response.text}",
+                response.status_code,
+            )
+        try:
+            return response_model.model_validate_json(response.content)
+        except ValidationError as exc:
+            raise AgentCallError(f"Unexpected answer from {self.name}: {exc}", 502) from exc
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a GET request, retried on failure."""
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a POST request, retried only when marked ``idempotent``."""
+        return await self.request("POST", path, **kwargs)
+
+    async def _attempt(self, method: str, path: str, kwargs: dict[str, Any]) -> httpx.Response:
+        budget = remaining()
+        if budget is not None and budget <= 0:
+            raise DeadlineExceededError(f"Deadline exceeded before calling {self.name}")
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit to {self.name} is open")
+        headers = dict(kwargs.get("headers", {}))
+        if budget is not None:
+            headers[DEADLINE_HEADER] = str(int(budget * 1000))
+        request_id = get_request_id()
+        if request_id is not None:
+            headers[REQUEST_ID_HEADER] = request_id
+        self.calls += 1
+        try:
+            response = await self._client.request(
+                method,
+                path,
+                **{
+                    **kwargs,
+                    "headers": headers,
+                    "timeout": self.timeout if budget is None else budget,
+                },
+            )
+        except httpx.TimeoutException as exc:
+            self._failed()
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceededError(f"{self.name} did not answer in time") from exc
+            raise AgentUnavailableError(f"{self.name} timed out: {exc}") from exc
+        except httpx.TransportError as exc:
+            self._failed()
+            raise AgentUnavailableError(f"{self.name} is unreachable: {exc}") from exc
+        except BaseException:
+            self.breaker.release()
+            raise
+        if response.status_code < 500:
+            self.breaker.record_success()
+            return response
+        self._failed()
+        if response.status_code in RETRY_STATUSES:
+            raise AgentUnavailableError(f"{self.name} answered {response.status_code}")
+        return response
+
+    def _failed(self) -> None:
+        self.failed += 1
+        self.breaker.record_failure()
+
+    async def _backoff(self, attempt: int) -> None:
+        delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+        budget = remaining()
+        if budget is not None and delay >= budget:
+            raise DeadlineExceededError(f"No time left to retry {self.name}")
+        await self._sleep(delay)
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        """Get call counters and the circuit state."""
+        return {
+            "base_url": self.base_url,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+        }
+
+
+class LocalAgentClient:
+    """
+    Client of an agent running in the same process.
+
+    Calls go straight to the endpoint functions registered with
+    ``register_local_handler``, passing and returning the same request and
+    response models as over HTTP, so callers work unchanged in both
+    deployments. The deadline still applies.
+    """
+
+    def __init__(self, name: str, timeout: float = 5.0) -> None:
+        self.name = name
+        self.timeout = timeout
+        self.calls = 0
+        self.failed = 0
+
+    async def call(
+        self,
+        path: str,
+        body: BaseModel,
+        response_model: type[ResponseModel],
+        *,
+        idempotent: bool = False,
+        timeout: float | None = None,
+    ) -> ResponseModel:
+        """
+        Call a registered endpoint function.
+
+        Args:
+            path: Endpoint path the function is registered under
+            body: Request model of the endpoint
+            response_model: Response model of the endpoint
+            idempotent: Ignored, in-process calls are never retried
+            timeout: Seconds for the call, by default the client timeout
+
+        Returns:
+            Response of the endpoint
+
+        Raises:
+            AgentCallError: If no function is registered for the path or the
+                endpoint raises an HTTP error
+            DeadlineExceededError: If the deadline passes before an answer
+        """
+        handler = _handlers.get((self.name, path))
+        if handler is None:
+            raise AgentCallError(f"{self.name} has no local handler for {path}", 404)
+        self.calls += 1
+        with deadline(self.timeout if timeout is None else timeout):
+            budget = remaining()
+            try:
+                async with asyncio.timeout(None if budget is None else max(budget, 0)):
+                    response = await handler(body)
+            except TimeoutError as exc:
+                self.failed += 1
+                raise DeadlineExceededError(f"{self.name} did not answer in time") from exc
+            except HTTPException as exc:
+                self.failed += 1
+                raise AgentCallError(f"{self.name}: {exc.detail}", exc.status_code) from exc
+        if isinstance(response, response_model):
+            return response
+        return response_model.model_validate(response.model_dump())
+
+    async def aclose(self) -> None:
+        """Nothing to close."""
+
+    def stats(self) -> dict:
+        """Get call counters."""
+        return {"local": True, "calls": self.calls, "failed": self.failed}
+
+
+def register_local_handler(agent: str, path: str, handler: LocalHandler) -> None:
+    """
+    Make an endpoint function callable in-process by other agents.
+
+    Args:
+        agent: Name of the agent serving the endpoint
+        path: Endpoint path, as passed to ``call``
+        handler: Endpoint function taking the request model
+    """
+    _handlers[(agent, path)] = handler
+
+
+def use_local_agents(names: Iterable[str]) -> None:
+    """Call these agents in-process from now on; used by the combined deployment."""
+    _local_agents.update(names)
+    for name in _local_agents.intersection(_clients):
+        del _clients[name]
+
+
+def get_agent_client(name: str) -> "AgentClient | LocalAgentClient | None":
+    """
+    Get the shared client of an agent, creating it on first use.
+
+    Agents running in the same process are called directly. Otherwise the
+    target's base URL is read from ``<NAME>_AGENT_URL``, e.g.
+    ``RERANKING_AGENT_URL`` for "reranking".
+
+    Args:
+        name: Agent name
+
+    Returns:
+        Client, or None when the agent is neither local nor configured
+    """
+    client = _clients.get(name)
+    if client is None:
+        settings = get_client_settings()
+        if name in _local_agents:
+            client = _clients[name] = LocalAgentClient(name, settings["timeout"])
+            return client
+        url = os.getenv(f"{name.upper()}_AGENT_URL")
+        if not url:
+            return None
+        client = _clients[name] = AgentClient(name, url, **settings)
+    return client
+
+
+async def close_agent_clients() -> None:
+    """Close and drop all shared clients and forget which agents are local."""
+    clients = list(_clients.values())
+    _clients.clear()
+    _local_agents.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
+
+
+@asynccontextmanager
+async def agent_clients_lifespan() -> AsyncIterator[None]:
+    """Close the shared agent clients when an app shuts down."""
+    try:
+        yield
+    finally:
+        await close_agent_clients()
+
+
+def client_metrics() -> dict:
+    """Call counters and circuit state per target agent."""
+    return {name: client.stats() for name, client in _clients.items()}
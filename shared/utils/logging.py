@@ -1,7 +1,277 @@
 """Logging utilities for consistent logging across agents."""
 
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes every LogRecord has; anything else was passed with ``extra``
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def get_log_settings() -> dict:
+    """
+    Get logging settings from environment.
+
+    Environment variables:
+        LOG_LEVEL: Level of agent and shared loggers (default: INFO)
+        LOG_FORMAT: "json" or "text" (default: json)
+        LOG_QUEUE_SIZE: Records waiting for the writer thread before new
+            ones are dropped (default: 10000)
+        LOG_DEBUG_SAMPLE_RATE: Share of high-volume debug lines kept (default: 1)
+        LOG_RATE_LIMIT: Lines per second kept per high-volume message,
+            0 for no limit (default: 10)
+
+    Returns:
+        Dictionary of logging settings
+    """
+    return {
+        "level": os.getenv("LOG_LEVEL", "INFO").upper(),
+        "format": os.getenv("LOG_FORMAT", "json"),
+        "queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        "debug_sample_rate": float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1")),
+        "rate_limit": float(os.getenv("LOG_RATE_LIMIT", "10")),
+    }
+
+
+def get_request_id() -> str | None:
+    """Id of the request being handled, None outside requests."""
+    return _request_id.get()
+
+
+class RequestIdMiddleware:
+    """
+    Give every request an id, taken from ``X-Request-ID`` or generated.
+
+    The id is attached to every log record written while handling the
+    request, forwarded on calls to other agents, and returned in the
+    response header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = REQUEST_ID_HEADER.lower().encode()
+        value = next((v for k, v in scope["headers"] if k == header), None)
+        request_id = value.decode("latin-1")[:128] if value else uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (header, request_id.encode())]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Render the record with its request id, ``extra`` fields and traceback."""
+        entry: dict[str, Any] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class Lazy:
+    """
+    Log argument computed only when the record is actually written.
+
+    Use for expensive arguments of debug lines, e.g.
+    ``logger.debug("Candidates: %s", Lazy(lambda: summarize(candidates)))``;
+    the function runs on the writer thread, so it must only read data that
+    is no longer modified.
+    """
+
+    __slots__ = ("function",)
+
+    def __init__(self, function: Callable[[], Any]) -> None:
+        self.function = function
+
+    def __str__(self) -> str:
+        return str(self.function())
+
+    def __repr__(self) -> str:
+        return repr(self.function())
+
+
+class SampleFilter(logging.Filter):
+    """Keeps a random share of records at or below ``level``."""
+
+    def __init__(self, rate: float, level: int = logging.DEBUG) -> None:
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Keep records above ``level``, and others at ``rate``."""
+        return record.levelno > self.level or random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Keeps at most ``per_second`` records per message at or below ``level``.
+
+    Each message template (the unformatted ``msg``) has its own token bucket
+    holding up to ``burst`` records. The number of records dropped since the
+    last one kept is attached to the next kept record as ``suppressed``.
+    """
+
+    def __init__(self, per_second: float, burst: int = 20, level: int = logging.INFO) -> None:
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.level = level
+        self._buckets: dict[tuple[str, object], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Keep the record if its message still has budget."""
+        if record.levelno > self.level or self.per_second <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            # Bucket state: tokens, time of last refill, records suppressed
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = int(suppressed)
+        return True
+
+
+class QueueHandler(logging.Handler):
+    """
+    Hands records to a background thread that formats and writes them.
+
+    Emitting only stamps the request id on the record and puts it on a
+    bounded queue, so the event loop never waits on stdout. When the queue
+    is full the record is dropped and counted; the writer reports the count.
+    Message arguments are formatted on the writer thread, so they must not
+    be modified after logging.
+    """
+
+    def __init__(self, target: logging.Handler) -> None:
+        super().__init__()
+        self.target = target
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue the record for the writer thread."""
+        if "request_id" not in record.__dict__:
+            record.request_id = _request_id.get()
+        _writer.put(self.target, record)
+
+
+class _LogWriter:
+    """Background thread writing queued records to their target handlers."""
+
+    def __init__(self) -> None:
+        self.dropped = 0
+        self._queue: queue.Queue[tuple[logging.Handler, logging.LogRecord] | None] | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def put(self, target: logging.Handler, record: logging.LogRecord) -> None:
+        if self._queue is None:
+            self.start(get_log_settings()["queue_size"])
+        assert self._queue is not None
+        try:
+            self._queue.put_nowait((target, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self, queue_size: int) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None or self._queue is None:
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+        self._queue = None
+
+    def _run(
+        self, pending: "queue.Queue[tuple[logging.Handler, logging.LogRecord] | None]"
+    ) -> None:
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            target, record = item
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                target.handle(
+                    logging.makeLogRecord(
+                        {
+                            "name": __name__,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": "Dropped %d log records, the log queue was full",
+                            "args": (dropped,),
+                        }
+                    )
+                )
+            target.handle(record)
+
+
+_writer = _LogWriter()
+atexit.register(_writer.stop)
+
+
+def flush_logs(timeout: float = 5.0) -> None:
+    """Write every queued record and stop the writer thread; it restarts on the next record."""
+    _writer.stop(timeout)
 
 
 def setup_logger(
@@ -12,6 +282,9 @@ def setup_logger(
     """
     Set up a logger with consistent formatting.
 
+    Records are written to stdout by a background thread. Without
+    ``format_string`` they are written as JSON unless ``LOG_FORMAT`` is "text".
+
     Args:
         name: Logger name (typically __name__)
         level: Logging level (default: INFO)
@@ -23,8 +296,15 @@ def setup_logger(
     if level is None:
         level = logging.INFO
 
-    if format_string is None:
-        format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter: logging.Formatter
+    if format_string is not None:
+        formatter = logging.Formatter(format_string)
+    elif get_log_settings()["format"] == "text":
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s"
+        )
+    else:
+        formatter = JsonFormatter()
 
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -32,15 +312,52 @@ def setup_logger(
     # Remove existing handlers
     logger.handlers.clear()
 
-    # Create console handler
-    handler = logging.StreamHandler(sys.stdout)
+    # Create console handler, fed through the writer thread
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+    handler = QueueHandler(stream)
     handler.setLevel(level)
 
-    # Create formatter
-    formatter = logging.Formatter(format_string)
-    handler.setFormatter(formatter)
-
     # Add handler to logger
     logger.addHandler(handler)
 
     return logger
+
+
+def configure_logging() -> None:
+    """Set up the agent and shared loggers from ``LOG_LEVEL`` and ``LOG_FORMAT``."""
+    level = logging.getLevelName(get_log_settings()["level"])
+    for name in ("agents", "shared"):
+        setup_logger(name, level if isinstance(level, int) else logging.INFO)
+
+
+def limit_logger(logger: logging.Logger) -> logging.Logger:
+    """
+    Sample and rate-limit a logger with high-volume lines on a hot path.
+
+    Debug records are kept at ``LOG_DEBUG_SAMPLE_RATE``, then debug and info
+    records are limited to ``LOG_RATE_LIMIT`` per second per message.
+    Warnings and errors always pass.
+
+    Args:
+        logger: Logger to limit
+
+    Returns:
+        The same logger
+    """
+    settings = get_log_settings()
+    if settings["debug_sample_rate"] < 1:
+        logger.addFilter(SampleFilter(settings["debug_sample_rate"]))
+    if settings["rate_limit"] > 0:
+        logger.addFilter(RateLimitFilter(settings["rate_limit"]))
+    return logger
+
+
+@asynccontextmanager
+async def logging_lifespan() -> AsyncIterator[None]:
+    """Configure logging on startup and write every queued record on shutdown."""
+    configure_logging()
+    try:
+        yield
+    finally:
+        flush_logs()
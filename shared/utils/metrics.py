@@ -0,0 +1,312 @@
+"""Request and stage metrics in the Prometheus text format, and an opt-in sampling profiler."""
+
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_profile_settings() -> dict:
+    """
+    Get sampling profiler settings from environment.
+
+    Environment variables:
+        PROFILE_SLOW_REQUEST_MS: Dump a stack profile of requests slower than
+            this (default: 0, profiler off)
+        PROFILE_INTERVAL_MS: Milliseconds between stack samples (default: 5)
+        PROFILE_DIR: Directory for profiles (default: /tmp/fodeen-profiles)
+
+    Returns:
+        Keyword arguments for ``SamplingProfiler``, with ``threshold`` in seconds
+    """
+    return {
+        "threshold": float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0")) / 1000,
+        "interval": float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+        "directory": Path(os.getenv("PROFILE_DIR", "/tmp/fodeen-profiles")),
+    }
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one duration."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Bucket upper bounds with the number of observations at or below each."""
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """Request counts, latencies, in-flight requests and stage spans of a process."""
+
+    def __init__(self) -> None:
+        self.requests: dict[tuple[str, str, str], Histogram] = {}
+        self.spans: dict[str, Histogram] = {}
+        self.in_flight: Counter[str] = Counter()
+
+    def observe_request(self, method: str, route: str, status: int, duration: float) -> None:
+        """Record a finished request."""
+        key = (method, route, str(status))
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests.setdefault(key, Histogram())
+        histogram.observe(duration)
+
+    def observe_span(self, name: str, duration: float) -> None:
+        """Record a finished stage."""
+        histogram = self.spans.get(name)
+        if histogram is None:
+            histogram = self.spans.setdefault(name, Histogram())
+        histogram.observe(duration)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = [
+            "# HELP http_requests_total Requests handled, by method, route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), histogram in sorted(self.requests.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by method, route and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(self.requests.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines += _histogram("http_request_duration_seconds", labels, histogram)
+        lines += [
+            "# HELP http_requests_in_flight Requests being handled, by method.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for method, count in sorted(self.in_flight.items()):
+            lines.append(f"http_requests_in_flight{{{_labels(method=method)}}} {count}")
+        lines += [
+            "# HELP span_duration_seconds Time spent in named internal stages.",
+            "# TYPE span_duration_seconds histogram",
+        ]
+        for name, histogram in sorted(self.spans.items()):
+            lines += _histogram("span_duration_seconds", _labels(span=name), histogram)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels.items()
+    )
+
+
+def _histogram(name: str, labels: str, histogram: Histogram) -> list[str]:
+    lines = [
+        f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in histogram.cumulative()
+    ]
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _registry
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a named internal stage such as "mapping.parse" or "db.list_items".
+
+    Works around awaits too, measuring wall time including time spent
+    waiting. The cost is two clock reads and one histogram update.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe_span(name, time.perf_counter() - start)
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack while requests are in flight.
+
+    A daemon thread records the stack of the profiled thread every
+    ``interval`` seconds into a ring buffer. When a request takes longer
+    than ``threshold``, the samples taken during it are written as folded
+    stacks (one "frame;frame;frame count" line per distinct stack), the
+    input format of flamegraph.pl and speedscope. Requests share the event
+    loop, so the profile also shows whatever ran concurrently.
+    """
+
+    def __init__(
+        self, threshold: float, interval: float, directory: Path, capacity: int = 20_000
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.directory = directory
+        self.dumped = 0
+        self._samples: deque[tuple[float, str]] = deque(maxlen=capacity)
+        self._thread_id: int | None = None
+        self._sampler: threading.Thread | None = None
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        """Mark a request as started on the current thread, starting the sampler if needed."""
+        with self._lock:
+            self._active += 1
+            if self._sampler is None:
+                self._thread_id = threading.get_ident()
+                self._sampler = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._sampler.start()
+
+    def exit(self, started: float, finished: float, label: str) -> Path | None:
+        """
+        Mark a request as finished and dump its samples if it was slow.
+
+        Args:
+            started: ``time.perf_counter()`` when the request started
+            finished: ``time.perf_counter()`` when it finished
+            label: Method and route of the request, used in the file name
+
+        Returns:
+            Profile written, or None
+        """
+        with self._lock:
+            self._active -= 1
+        if finished - started < self.threshold:
+            return None
+        stacks = Counter(stack for at, stack in list(self._samples) if started <= at <= finished)
+        if not stacks:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        path = self.directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{self.dumped}.folded"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+        self.dumped += 1
+        return path
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not self._active or self._thread_id is None:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), _fold(frame)))
+
+
+def _fold(frame: FrameType | None) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+_profiler: SamplingProfiler | None = None
+
+
+def get_profiler() -> SamplingProfiler | None:
+    """Get the process-wide profiler, None unless ``PROFILE_SLOW_REQUEST_MS`` is set."""
+    global _profiler
+    if _profiler is None:
+        settings = get_profile_settings()
+        if settings["threshold"] <= 0:
+            return None
+        _profiler = SamplingProfiler(**settings)
+    return _profiler
+
+
+class MetricsMiddleware:
+    """
+    Count and time every request by method, route template and status.
+
+    Routes are labelled by their template ("/api/v1/nodes/{node_id}"),
+    prefixed with the mount path in the combined deployment, so label
+    cardinality stays bounded. Slow requests are profiled when the sampling
+    profiler is enabled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        profiler = get_profiler()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        _registry.in_flight[method] += 1
+        if profiler is not None:
+            profiler.enter()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finished = time.perf_counter()
+            _registry.in_flight[method] -= 1
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None)
+            label = scope.get("root_path", "") + template if template else "unmatched"
+            _registry.observe_request(method, label, status, finished - start)
+            if profiler is not None:
+                profiler.exit(start, finished, f"{method} {label}")
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics() -> PlainTextResponse:
+    """Request, in-flight and stage metrics of this process in the Prometheus format."""
+    return PlainTextResponse(_registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,46 @@
+"""Helpers for endpoints that stream NDJSON in and out."""
+
+from collections.abc import AsyncIterable, AsyncIterator
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response for endpoints that read their body while responding.
+
+    ``StreamingResponse`` watches ``receive`` for disconnects on older ASGI
+    servers, which races the endpoint for request body chunks. Here the body
+    iterator owns ``receive``; a gone client surfaces as a failed send.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError as exc:
+            raise ClientDisconnect() from exc
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Split a streamed body into lines without buffering more than one line.
+
+    Args:
+        chunks: Raw body chunks
+
+    Yields:
+        1-based line number and content of every non-blank line
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
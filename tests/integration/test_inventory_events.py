@@ -0,0 +1,128 @@
+"""Integration tests for the inventory event log against Postgres.
+
+They need a database initialized with ``scripts/init-db.sql`` and are skipped
+unless ``TEST_DATABASE_URL`` points at one. Each test runs in a transaction
+that is rolled back.
+"""
+
+import os
+import uuid
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from agents.inventory.events import (
+    EventRecord,
+    fetch_totals,
+    prune_snapshots,
+    record_events,
+    take_snapshot,
+)
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set"
+)
+
+NOW = datetime.now(UTC)
+DAY = timedelta(days=1)
+
+
+@pytest.fixture
+async def connection() -> AsyncIterator[AsyncConnection]:
+    """A connection inside a transaction that is rolled back afterwards."""
+    url = os.environ["TEST_DATABASE_URL"].replace("postgresql://", "postgresql+asyncpg://")
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                yield connection
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def node_id() -> str:
+    """A node no other data in the database refers to."""
+    return f"test_{uuid.uuid4().hex}"
+
+
+async def _record(
+    connection: AsyncConnection,
+    node_id: str,
+    event_type: str,
+    quantity: float,
+    at: datetime,
+    to_location: str | None = None,
+) -> None:
+    event = EventRecord(
+        event_type, node_id, "pantry", to_location, quantity, "g", quantity, "gram", "mass"
+    )
+    [(seq, _)] = await record_events(connection, [event])
+    await connection.execute(
+        text("UPDATE inventory.events SET occurred_at = :at WHERE seq = :seq"),
+        {"at": at, "seq": seq},
+    )
+
+
+async def _snapshot(connection: AsyncConnection, at: datetime) -> int:
+    seq = await take_snapshot(connection)
+    assert seq is not None
+    await connection.execute(
+        text("UPDATE inventory.snapshots SET taken_at = :at WHERE seq = :seq"),
+        {"at": at, "seq": seq},
+    )
+    return seq
+
+
+async def _totals(
+    connection: AsyncConnection, node_id: str, as_of: datetime | None = None
+) -> dict[str, float]:
+    rows = await fetch_totals(connection, [node_id], as_of=as_of)
+    return {row["location"]: float(row["quantity"]) for row in rows}
+
+
+async def test_totals_as_of_replay_events_after_snapshot(
+    connection: AsyncConnection, node_id: str
+) -> None:
+    """Test past totals combine the latest earlier snapshot with the events after it."""
+    await _record(connection, node_id, "receive", 10, NOW - 3 * DAY)
+    await _snapshot(connection, NOW - 2 * DAY)
+    await _record(connection, node_id, "consume", 4, NOW - DAY)
+    await _record(connection, node_id, "transfer", 3, NOW - DAY, to_location="fridge")
+
+    assert await _totals(connection, node_id, NOW - 2.5 * DAY) == {"pantry": 10}
+    assert await _totals(connection, node_id, NOW - 1.5 * DAY) == {"pantry": 10}
+    assert await _totals(connection, node_id, NOW - 0.5 * DAY) == {"pantry": 3, "fridge": 3}
+    assert await _totals(connection, node_id) == {"pantry": 3, "fridge": 3}
+    assert await _totals(connection, node_id, NOW - 4 * DAY) == {}
+
+
+async def test_pruned_snapshots_keep_answers(connection: AsyncConnection, node_id: str) -> None:
+    """Test pruning keeps the base snapshot of the retention window and past totals."""
+    await _record(connection, node_id, "receive", 1, NOW - 3.5 * DAY)
+    oldest = await _snapshot(connection, NOW - 3 * DAY)
+    await _record(connection, node_id, "receive", 1, NOW - 2.5 * DAY)
+    base = await _snapshot(connection, NOW - 2 * DAY)
+    await _record(connection, node_id, "receive", 1, NOW - 1.5 * DAY)
+    latest = await _snapshot(connection, NOW)
+    before = [await _totals(connection, node_id, NOW - days * DAY) for days in (3.2, 2.2, 1)]
+
+    assert await prune_snapshots(connection, retention=DAY.total_seconds()) >= 1
+
+    seqs = await connection.execute(
+        text("SELECT seq FROM inventory.snapshots WHERE seq = ANY(:seqs)"),
+        {"seqs": [oldest, base, latest]},
+    )
+    assert sorted(row.seq for row in seqs) == [base, latest]
+    orphans = await connection.execute(
+        text("SELECT COUNT(*) FROM inventory.snapshot_totals WHERE seq = :seq"), {"seq": oldest}
+    )
+    assert orphans.scalar_one() == 0
+    after = [await _totals(connection, node_id, NOW - days * DAY) for days in (3.2, 2.2, 1)]
+    assert after == before == [{"pantry": 1}, {"pantry": 2}, {"pantry": 3}]
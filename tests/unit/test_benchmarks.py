@@ -0,0 +1,39 @@
+"""Unit tests for the benchmark suite's generators and baseline comparison."""
+
+from benchmarks.suite import compare
+from benchmarks.synthetic import generate_release, noisy_corpus, variety
+from shared.ontology.snapshot import build_snapshot
+
+
+def test_generate_release_replicates_hierarchy() -> None:
+    """Test replicas keep their own is_a hierarchy and share the golden units."""
+    release = generate_release(1000, seed=7)
+    assert 1000 <= len(release.nodes) < 1020
+    assert len({node["id"] for node in release.nodes}) == len(release.nodes)
+    edges = {
+        (r["source_id"], r["target_id"], r["relationship_type"]) for r in release.relationships
+    }
+    assert ("food_004_r3", "food_104_r3", "is_a") in edges
+    assert ("food_004_r3", "unit_003", "measured_in") in edges
+    assert len(build_snapshot(release).in_category("unit_of_measure")) == 6
+    assert len({variety(index) for index in range(5000)}) == 5000
+
+
+def test_noisy_corpus_is_reproducible() -> None:
+    """Test the same seed gives the same lines."""
+    release = generate_release(100)
+    assert noisy_corpus(release, 50, seed=1) == noisy_corpus(release, 50, seed=1)
+    assert noisy_corpus(release, 50, seed=1) != noisy_corpus(release, 50, seed=2)
+
+
+def test_compare_flags_regressions() -> None:
+    """Test slower, higher-latency or failing results are reported beyond the tolerance."""
+
+    def report(throughput: float, p95: float, errors: int = 0) -> dict:
+        result = {"throughput": throughput, "p95_ms": p95, "errors": errors}
+        return {"modes": {"inprocess": {"scenarios": {"mapping.map": result}}}}
+
+    baseline = report(1000, 10)
+    assert compare(report(900, 11), baseline, tolerance=0.25) == []
+    assert len(compare(report(500, 20, errors=1), baseline, tolerance=0.25)) == 3
+    assert compare(report(500, 20), {"modes": {}}) == []
@@ -0,0 +1,71 @@
+"""Unit tests for compiled binary ontology releases."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from shared.ontology.binary import MappedSnapshot, compile_snapshot, is_binary_release
+from shared.ontology.release import DEFAULT_RELEASE_PATH, Release, load_release
+from shared.ontology.snapshot import SnapshotStore, build_snapshot
+
+
+@pytest.fixture
+def compiled(tmp_path: Path) -> Path:
+    """The golden release compiled to the binary format."""
+    return compile_snapshot(build_snapshot(load_release()), tmp_path / "golden.bin")
+
+
+def test_round_trip(compiled: Path) -> None:
+    """Test a mapped release matches the snapshot it was compiled from."""
+    expected = build_snapshot(load_release())
+    snapshot = MappedSnapshot(compiled)
+    assert snapshot.version == expected.version
+    assert snapshot.checksum == expected.checksum
+    assert list(snapshot.nodes) == list(expected.nodes)
+    assert list(snapshot.relationships) == list(expected.relationships)
+    assert snapshot.categories() == expected.categories()
+
+
+def test_lookups(compiled: Path) -> None:
+    """Test id, synonym and category lookups against the mapped tables."""
+    snapshot = MappedSnapshot(compiled)
+    assert snapshot.get("food_004").label == "Chicken Breast"
+    assert snapshot.get("missing") is None
+    assert "unit_001" in snapshot
+    assert [node.id for node in snapshot.lookup_synonym("Boneless  CHICKEN")] == ["food_004"]
+    assert snapshot.lookup_synonym("nothing") == ()
+    assert {node.id for node in snapshot.in_category("unit_of_measure")} >= {"unit_001", "unit_006"}
+    assert snapshot.category_positions("packaging") == ()
+    assert snapshot.nodes[-1].id == snapshot.nodes[len(snapshot) - 1].id
+
+
+def test_embeddings_are_mapped_normalized(tmp_path: Path) -> None:
+    """Test the embedding block is a normalized read-only memory map."""
+    nodes = [
+        {"id": "a", "label": "A", "category": "food_item", "embedding": [3.0, 4.0]},
+        {"id": "b", "label": "B", "category": "food_item", "embedding": [0.0, 2.0]},
+    ]
+    release = Release(version="v1", nodes=nodes, relationships=[], checksum="test")
+    snapshot = MappedSnapshot(compile_snapshot(build_snapshot(release), tmp_path / "e.bin"))
+    assert isinstance(snapshot.embeddings, np.memmap)
+    np.testing.assert_allclose(snapshot.embeddings, [[0.6, 0.8], [0.0, 1.0]], rtol=1e-6)
+    assert len(snapshot.relationships) == 0
+
+
+def test_store_opens_binary_releases(compiled: Path) -> None:
+    """Test the snapshot store detects the binary format by its header."""
+    assert is_binary_release(compiled)
+    assert not is_binary_release(DEFAULT_RELEASE_PATH)
+    snapshot = SnapshotStore(compiled).current()
+    assert isinstance(snapshot, MappedSnapshot)
+    assert snapshot.get("food_001").label == "Apple"
+
+
+def test_rejects_unknown_format(compiled: Path) -> None:
+    """Test files from a newer format version are refused."""
+    data = bytearray(compiled.read_bytes())
+    data[8] = 99
+    compiled.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="Unsupported binary release format"):
+        MappedSnapshot(compiled)
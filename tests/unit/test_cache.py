@@ -0,0 +1,52 @@
+"""Unit tests for shared caching utilities."""
+
+import pytest
+
+from shared.utils.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    """Test the least recently used entry is evicted first."""
+    cache: LRUCache[int] = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_stats() -> None:
+    """Test hit and miss counters."""
+    cache: LRUCache[int] = LRUCache(maxsize=4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    assert cache.stats() == {"size": 1, "maxsize": 4, "hits": 1, "misses": 1}
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_rejects_non_positive_size() -> None:
+    """Test a cache must hold at least one entry."""
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+def test_lru_ttl_expires_entries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test entries expire after the cache or per-entry TTL."""
+    now = [100.0]
+    monkeypatch.setattr("shared.utils.cache.time.monotonic", lambda: now[0])
+    cache: LRUCache[int] = LRUCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2, ttl=1)
+    now[0] += 5
+    assert cache.get("a") == 1
+    assert "b" not in cache
+    assert cache.get("b") is None
+    now[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        LRUCache(ttl=0)
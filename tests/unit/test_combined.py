@@ -0,0 +1,46 @@
+"""Unit tests for the combined deployment."""
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from agents.combined.main import AGENTS, app
+from shared.schemas.base import RerankRequest, RerankResponse
+from shared.utils import http
+
+
+def test_combined_mounts_every_agent() -> None:
+    """Test each agent is served under its own prefix and called in-process."""
+    with TestClient(app) as client:
+        for name in AGENTS:
+            assert client.get(f"/{name}/health").json()["service"] == f"{name}-agent"
+        assert isinstance(http.get_agent_client("reranking"), http.LocalAgentClient)
+
+        response = client.post("/mapping/api/v1/map", json={"text": "fresh cheese"})
+        assert response.status_code == 200
+        assert all("rerank_score" in alt for alt in response.json()["alternatives"])
+        assert client.get("/metrics/agents").json()["calls"]["reranking"]["calls"] >= 1
+    assert http.get_agent_client("reranking") is None
+
+
+class _Echo(BaseModel):
+    value: int
+
+
+async def test_local_client_calls_registered_handler(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test local calls pass models through and map HTTP errors."""
+
+    async def handler(body: _Echo) -> _Echo:
+        if body.value < 0:
+            raise HTTPException(status_code=422, detail="negative")
+        return body
+
+    monkeypatch.setitem(http._handlers, ("echo", "/echo"), handler)
+    client = http.LocalAgentClient("echo")
+    assert await client.call("/echo", _Echo(value=1), _Echo) == _Echo(value=1)
+    with pytest.raises(http.AgentCallError) as error:
+        await client.call("/echo", _Echo(value=-1), _Echo)
+    assert error.value.status_code == 422
+    with pytest.raises(http.AgentCallError):
+        await client.call("/missing", RerankRequest(query="q", candidates=[]), RerankResponse)
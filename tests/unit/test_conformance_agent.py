@@ -0,0 +1,227 @@
+"""Unit tests for Conformance agent."""
+
+import json
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.conformance import rules
+from agents.conformance.bulk import stream_validation
+from agents.conformance.rules import (
+    NODE_REF,
+    UnknownSchemaError,
+    compile_schema,
+    get_validator,
+    parse_schema_ref,
+)
+from shared.ontology.release import DEFAULT_RELEASE_PATH, load_release
+from shared.utils.cache import LRUCache
+
+
+def test_health_endpoint(conformance_client: TestClient) -> None:
+    """Test health check endpoint."""
+    response = conformance_client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["service"] == "conformance-agent"
+
+
+def test_parse_schema_ref() -> None:
+    """Test the accepted schema reference forms."""
+    assert parse_schema_ref(NODE_REF) == ("ontology_v1", "OntologyNode")
+    assert parse_schema_ref("Relationship") == ("ontology_v1", "Relationship")
+    assert parse_schema_ref("ontology_v1") == ("ontology_v1", None)
+
+
+def test_validator_is_cached() -> None:
+    """Test validators compile once per schema reference."""
+    assert get_validator(NODE_REF) is get_validator(NODE_REF)
+    assert get_validator(NODE_REF).version == "v1"
+
+
+def test_golden_nodes_are_valid() -> None:
+    """Test every node of the golden release conforms."""
+    validator = get_validator(NODE_REF)
+    for node in load_release().nodes:
+        assert validator(node) == ([], [])
+
+
+def test_node_errors() -> None:
+    """Test structural and attribute dictionary violations."""
+    errors, warnings = get_validator(NODE_REF)(
+        {
+            "id": 7,
+            "category": "food_item",
+            "synonyms": ["ok", 3],
+        }
+    )
+    assert errors == [
+        "label: is required",
+        "id: expected string",
+        "synonyms[1]: expected string",
+    ]
+    assert warnings == []
+
+    errors, warnings = get_validator(NODE_REF)(
+        {
+            "id": "food_x",
+            "label": "X",
+            "category": "food_item",
+            "attributes": {
+                "storage_temp": "warm",
+                "shelf_life_days": -1,
+                "allergens": ["eggs", "gluten"],
+                "density_g_per_ml": 0,
+                "colour": "red",
+            },
+        }
+    )
+    assert sorted(errors) == [
+        "attributes.allergens[1]: 'gluten' is not one of dairy, eggs, fish, shellfish, "
+        "tree_nuts, peanuts, wheat, soybeans",
+        "attributes.density_g_per_ml: must be > 0",
+        "attributes.shelf_life_days: must be >= 0",
+        "attributes.storage_temp: 'warm' is not one of frozen, refrigerated, room_temp",
+    ]
+    assert warnings == ["attributes.colour: not in the food_item dictionary"]
+
+
+def test_compile_schema_type_short_circuits() -> None:
+    """Test a type mismatch skips the remaining keywords."""
+    check = compile_schema({"type": "integer", "minimum": 0}, {})
+    errors: list[str] = []
+    check(True, "count", errors)
+    check(-2, "count", errors)
+    assert errors == ["count: expected integer", "count: must be >= 0"]
+
+
+def test_compile_schema_bounds_huge_integers() -> None:
+    """Test integers beyond float range are compared exactly instead of overflowing."""
+    check = compile_schema({"type": "number", "minimum": 0, "exclusiveMaximum": 1e6}, {})
+    errors: list[str] = []
+    check(10**400, "count", errors)
+    check(-(10**400), "count", errors)
+    check(10**6 - 1, "count", errors)
+    assert errors == ["count: must be < 1e+06", "count: must be >= 0"]
+
+
+def test_unknown_definition() -> None:
+    """Test unknown schema references raise."""
+    with pytest.raises(UnknownSchemaError):
+        get_validator("ontology_v1#/definitions/Missing")
+    with pytest.raises(UnknownSchemaError):
+        get_validator("ontology_v9#/definitions/OntologyNode")
+
+
+@pytest.mark.parametrize(
+    "schema_ref",
+    ["../releases/ontology_v1#/definitions/OntologyNode", "/etc/passwd#", "..\\ontology_v1#"],
+)
+def test_schema_names_cannot_leave_releases_dir(schema_ref: str) -> None:
+    """Test schema names with path separators are rejected."""
+    with pytest.raises(UnknownSchemaError, match="Invalid schema name"):
+        get_validator(schema_ref)
+
+
+def test_validators_cached_per_definition(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test spellings of one definition share a cache entry, and the cache is bounded."""
+    monkeypatch.setattr(rules, "_validators", LRUCache(2))
+    node = get_validator(NODE_REF)
+    for spelling in ("OntologyNode", "#/definitions/OntologyNode", "ontology_v1#/x/OntologyNode"):
+        assert get_validator(spelling) is node
+    assert node.schema_ref == NODE_REF
+    get_validator("Relationship")
+    get_validator("ontology_v1")
+    assert len(rules._validators) == 2
+
+
+def test_validate_endpoint(conformance_client: TestClient) -> None:
+    """Test validating data through the API."""
+    response = conformance_client.post(
+        "/api/v1/validate",
+        json={
+            "data": {"source_id": "a", "target_id": "b", "relationship_type": "likes"},
+            "schema_ref": "Relationship",
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["valid"] is False
+    assert data["errors"][0].startswith("relationship_type: 'likes' is not one of")
+
+    response = conformance_client.post(
+        "/api/v1/validate",
+        json={"data": {"version": "v1", "nodes": []}, "schema_ref": "ontology_v1"},
+    )
+    assert response.json() == {"valid": True, "errors": [], "warnings": []}
+
+
+def test_validate_unknown_schema(conformance_client: TestClient) -> None:
+    """Test unknown schema references return 404."""
+    response = conformance_client.post("/api/v1/validate", json={"data": {}, "schema_ref": "Nope"})
+    assert response.status_code == 404
+
+
+RELEASE_LINES = [
+    {"id": "a", "label": "A", "category": "food_item"},
+    {"source_id": "a", "target_id": "b", "relationship_type": "is_a"},
+    {"id": "b", "label": "B", "category": "food_item", "attributes": {"organic": "yes"}},
+    {"id": "a", "label": "A again", "category": "food_item"},
+    {"source_id": "b", "target_id": "z", "relationship_type": "is_a"},
+    {"id": "c", "label": "C", "category": "unit_of_measure", "attributes": {"colour": "red"}},
+]
+
+
+async def _lines(records: list[dict]) -> AsyncIterator[tuple[int, bytes]]:
+    for number, record in enumerate(records, start=1):
+        yield number, json.dumps(record).encode()
+    yield len(records) + 1, b"{not json"
+
+
+async def test_stream_validation_on_process_pool() -> None:
+    """Test bulk validation reports failing rows, references and a summary."""
+    with ProcessPoolExecutor(2) as executor:
+        output = [
+            json.loads(line)
+            async for line in stream_validation(
+                _lines(RELEASE_LINES), executor, chunk_size=2, max_pending=2
+            )
+        ]
+
+    *findings, summary = output
+    assert [(row["line"], row["valid"]) for row in findings] == [
+        (3, False),
+        (4, False),
+        (6, True),
+        (7, False),
+        (5, False),
+    ]
+    assert findings[0]["errors"] == ["attributes.organic: expected boolean"]
+    assert findings[1]["errors"] == ["id: duplicate node id a"]
+    assert findings[2]["warnings"] == ["attributes.colour: not in the unit_of_measure dictionary"]
+    assert findings[4]["errors"] == ["target_id: unknown node z"]
+    assert summary["summary"] == {
+        "rows": 7,
+        "nodes": 4,
+        "relationships": 2,
+        "invalid": 4,
+        "with_warnings": 1,
+        "unresolved_references": 1,
+        "valid": False,
+    }
+
+
+def test_validate_bulk_endpoint(conformance_client: TestClient) -> None:
+    """Test validating the golden release through the streaming endpoint."""
+    with DEFAULT_RELEASE_PATH.open("rb") as release:
+        response = conformance_client.post(
+            "/api/v1/validate/bulk",
+            content=release.read(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["summary"]["valid"] is True
+    assert lines[0]["summary"]["nodes"] > 0
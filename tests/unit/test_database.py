@@ -0,0 +1,60 @@
+"""Unit tests for shared database utilities."""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from shared.utils import database
+
+
+@pytest.fixture(autouse=True)
+async def reset_engine() -> AsyncIterator[None]:
+    """Ensure each test starts without a process-wide engine."""
+    await database.dispose_engine()
+    yield
+    await database.dispose_engine()
+
+
+def test_pool_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test pool settings are read from environment."""
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+    settings = database.get_pool_settings()
+    assert settings["pool_size"] == 20
+    assert settings["max_overflow"] == 0
+    assert settings["pool_pre_ping"] is False
+    assert settings["connect_args"] == {"prepared_statement_cache_size": 0}
+
+
+async def test_engine_is_shared() -> None:
+    """Test the engine is created once per process and disposed cleanly."""
+    engine = database.init_engine()
+    assert database.get_engine() is engine
+    assert database.init_engine() is engine
+    await database.dispose_engine()
+    assert database.get_engine() is not engine
+
+
+def test_pool_metrics() -> None:
+    """Test pool metrics before and after engine creation."""
+    assert database.pool_metrics()["initialized"] is False
+    database.init_engine()
+    metrics = database.pool_metrics()
+    assert metrics["initialized"] is True
+    assert metrics["checked_out"] == 0
+    assert metrics["overflow"] == 0
+    assert metrics["waiting"] == 0
+
+
+def test_lifespan_owns_engine() -> None:
+    """Test an agent creates the engine on startup and disposes it on shutdown."""
+    from agents.uom.main import app
+
+    with TestClient(app) as client:
+        response = client.get("/metrics/db")
+        assert response.status_code == 200
+        assert response.json()["initialized"] is True
+    assert database.pool_metrics()["initialized"] is False
@@ -0,0 +1,137 @@
+"""Unit tests for the in-process embedding index."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from shared.ontology.embeddings import (
+    EmbeddingIndex,
+    EmbeddingsUnavailableError,
+    search_vectors,
+    sync_pgvector,
+    uses_pgvector,
+)
+from shared.ontology.release import Release, load_release, save_embeddings
+from shared.ontology.snapshot import build_snapshot
+
+NODES = [
+    {"id": "a", "label": "Apple", "category": "food_item", "embedding": [1.0, 0.0, 0.0]},
+    {"id": "b", "label": "Banana", "category": "food_item", "embedding": [0.8, 0.6, 0.0]},
+    {"id": "g", "label": "Gram", "category": "unit_of_measure", "embedding": [0.0, 0.0, 2.0]},
+    {"id": "x", "label": "No Vector", "category": "food_item"},
+]
+
+
+def _snapshot():
+    release = Release(version="v1", nodes=NODES, relationships=[], checksum="test")
+    return build_snapshot(release)
+
+
+def test_search_orders_by_cosine() -> None:
+    """Test batched top-k search returns best matches first."""
+    index = EmbeddingIndex.from_snapshot(_snapshot())
+    assert index is not None
+    assert len(index) == 3
+    results = index.search(np.array([[1.0, 0.1, 0.0], [0.0, 0.0, 1.0]]), k=2)
+    assert [hit.node_id for hit in results[0]] == ["a", "b"]
+    assert results[1][0].node_id == "g"
+    assert results[1][0].score == pytest.approx(1.0)
+
+
+def test_search_category_mask() -> None:
+    """Test results are restricted to the requested category."""
+    index = EmbeddingIndex.from_snapshot(_snapshot())
+    assert index is not None
+    results = index.search(np.array([0.0, 0.0, 1.0]), k=5, category="food_item")
+    assert [hit.node_id for hit in results[0]] == ["a", "b"]
+    assert index.search(np.array([0.0, 0.0, 1.0]), k=5, category="missing") == [[]]
+
+
+def test_search_rejects_wrong_dimension() -> None:
+    """Test queries must match the index dimension."""
+    index = EmbeddingIndex.from_snapshot(_snapshot())
+    assert index is not None
+    with pytest.raises(ValueError):
+        index.search(np.array([1.0, 0.0]), k=1)
+
+
+def test_search_scores_queries_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test chunked scoring returns the same hits as one block."""
+    index = EmbeddingIndex.from_snapshot(_snapshot())
+    assert index is not None
+    queries = np.random.default_rng(7).normal(size=(9, 3))
+    expected = index.search(queries, k=2)
+    # One query row of scores per chunk
+    monkeypatch.setattr("shared.ontology.embeddings.SCORE_BLOCK_BYTES", 1)
+    chunked = index.search(queries, k=2)
+    assert [[hit.node_id for hit in hits] for hits in chunked] == [
+        [hit.node_id for hit in hits] for hits in expected
+    ]
+    assert [hit.score for hits in chunked for hit in hits] == pytest.approx(
+        [hit.score for hits in expected for hit in hits]
+    )
+
+
+def test_memory_mapped_sidecar(tmp_path: Path) -> None:
+    """Test embeddings are memory-mapped from a release sidecar."""
+    path = tmp_path / "release.jsonl"
+    path.write_text('{"id": "a", "label": "A", "category": "food_item"}\n')
+    save_embeddings(path, np.array([[3.0, 4.0]]))
+    snapshot = build_snapshot(load_release(path))
+    assert isinstance(snapshot.embeddings, np.memmap)
+    index = EmbeddingIndex.from_snapshot(snapshot)
+    assert index is not None
+    assert index.search(np.array([0.6, 0.8]), k=1)[0][0].score == pytest.approx(1.0)
+
+
+def test_large_catalog_not_indexed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test catalogs above the row threshold are left to pgvector."""
+    monkeypatch.setenv("EMBEDDING_INDEX_MAX_ROWS", "2")
+    assert EmbeddingIndex.from_snapshot(_snapshot()) is None
+
+
+async def test_search_vectors_uses_snapshot_index() -> None:
+    """Test the shared entry point serves from memory when an index exists."""
+    snapshot = _snapshot()
+    results = await search_vectors(snapshot, np.array([1.0, 0.0, 0.0]), k=1)
+    assert results[0][0].node_id == "a"
+
+
+async def test_search_vectors_without_embedding_source(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test releases without embeddings and failing pgvector searches are unavailable."""
+    release = Release(
+        version="v1",
+        nodes=[{k: v for k, v in NODES[0].items() if k != "embedding"}],
+        relationships=[],
+        checksum="none",
+    )
+    with pytest.raises(EmbeddingsUnavailableError):
+        await search_vectors(build_snapshot(release), np.array([1.0, 0.0, 0.0]), k=1)
+
+    async def unreachable(*args: object) -> None:
+        raise OSError("connection refused")
+
+    monkeypatch.setenv("EMBEDDING_INDEX_MAX_ROWS", "2")
+    monkeypatch.setattr("shared.ontology.embeddings.search_pgvector", unreachable)
+    snapshot = _snapshot()
+    assert uses_pgvector(snapshot)
+    with pytest.raises(EmbeddingsUnavailableError):
+        await search_vectors(snapshot, np.array([1.0, 0.0, 0.0]), k=1)
+
+
+async def test_wrong_dimension_is_rejected_on_both_paths(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the pgvector path rejects a wrong dimension like the in-memory index."""
+    snapshot = _snapshot()
+    with pytest.raises(ValueError, match="3-dimensional"):
+        await search_vectors(snapshot, np.array([1.0, 0.0]), k=1)
+
+    async def unexpected(*args: object) -> None:
+        raise AssertionError("pgvector must not be queried")
+
+    monkeypatch.setenv("EMBEDDING_INDEX_MAX_ROWS", "2")
+    monkeypatch.setattr("shared.ontology.embeddings.search_pgvector", unexpected)
+    with pytest.raises(ValueError, match="3-dimensional"):
+        await search_vectors(_snapshot(), np.array([1.0, 0.0]), k=1)
+    with pytest.raises(ValueError, match="384"):
+        await sync_pgvector(snapshot)
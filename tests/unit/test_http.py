@@ -0,0 +1,148 @@
+"""Unit tests for the inter-agent HTTP client."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from shared.utils.http import (
+    DEADLINE_HEADER,
+    AgentClient,
+    AgentUnavailableError,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    DeadlineMiddleware,
+    deadline,
+    remaining,
+)
+from shared.utils.logging import REQUEST_ID_HEADER, _request_id
+
+
+def _client(handler, **kwargs) -> AgentClient:
+    async def no_sleep(delay: float) -> None:
+        pass
+
+    return AgentClient(
+        "test", "http://agent", transport=httpx.MockTransport(handler), sleep=no_sleep, **kwargs
+    )
+
+
+async def test_retries_idempotent_calls() -> None:
+    """Test GETs are retried on 503 while POSTs are not unless marked idempotent."""
+    statuses = iter([503, 503, 200, 503, 503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert int(request.headers[DEADLINE_HEADER]) <= 5000
+        return httpx.Response(next(statuses))
+
+    client = _client(handler, retries=2)
+    assert (await client.get("/x")).status_code == 200
+    with pytest.raises(AgentUnavailableError):
+        await client.post("/x")
+    assert (await client.post("/x", idempotent=True)).status_code == 200
+    assert client.stats()["retried"] == 3
+    await client.aclose()
+
+
+async def test_request_id_is_forwarded() -> None:
+    """Test calls made while handling a request carry its id."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"id": request.headers.get(REQUEST_ID_HEADER)})
+
+    client = _client(handler)
+    assert (await client.get("/x")).json()["id"] is None
+    token = _request_id.set("abc123")
+    try:
+        assert (await client.get("/x")).json()["id"] == "abc123"
+    finally:
+        _request_id.reset(token)
+    await client.aclose()
+
+
+async def test_deadline_propagates() -> None:
+    """Test the enclosing deadline bounds the call and is sent downstream."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"budget": int(request.headers[DEADLINE_HEADER])})
+
+    client = _client(handler)
+    with deadline(0.25):
+        budget = (await client.get("/x")).json()["budget"]
+        assert 0 < budget <= 250
+        assert 0 < (remaining() or 0) <= 0.25
+    assert remaining() is None
+
+    with deadline(0), pytest.raises(DeadlineExceededError):
+        await client.get("/x")
+    await client.aclose()
+
+
+async def test_infinite_timeout_adds_no_deadline() -> None:
+    """Test an unbounded call sends no deadline while an enclosing one still applies."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"budget": request.headers.get(DEADLINE_HEADER)})
+
+    client = _client(handler)
+    assert (await client.get("/x", timeout=float("inf"))).json()["budget"] is None
+    with deadline(0.25):
+        budget = (await client.get("/x", timeout=float("nan"))).json()["budget"]
+        assert 0 < int(budget) <= 250
+    await client.aclose()
+
+
+async def test_circuit_breaker_opens() -> None:
+    """Test repeated failures open the circuit and stop calls."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = _client(handler, retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(AgentUnavailableError):
+            await client.get("/x")
+    with pytest.raises(CircuitOpenError):
+        await client.get("/x")
+    assert len(calls) == 2
+    assert client.stats()["circuit"] == "open"
+    await client.aclose()
+
+
+def test_circuit_breaker_probe() -> None:
+    """Test one probe is let through after the reset timeout."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.opened == 2
+
+
+def test_deadline_middleware() -> None:
+    """Test requests adopt the caller's deadline and spent budgets are refused."""
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+
+    @app.get("/budget")
+    async def budget() -> dict:
+        return {"remaining": remaining()}
+
+    client = TestClient(app)
+    assert client.get("/budget").json() == {"remaining": None}
+    assert 0 < client.get("/budget", headers={DEADLINE_HEADER: "500"}).json()["remaining"] <= 0.5
+    assert client.get("/budget", headers={DEADLINE_HEADER: "0"}).status_code == 504
+    for value in ("nan", "inf", "-inf", "soon"):
+        response = client.get("/budget", headers={DEADLINE_HEADER: value})
+        assert response.json() == {"remaining": None}
@@ -0,0 +1,141 @@
+"""Unit tests for the Inventory Agent."""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from agents.inventory.aggregation import roll_up, subtree
+from agents.inventory.events import EventRecord, merge_deltas
+from agents.inventory.main import InventoryEvent, get_normalizer
+from agents.inventory.store import (
+    InvalidCursorError,
+    ItemRecord,
+    chunked,
+    decode_cursor,
+    encode_cursor,
+)
+from shared.ontology.release import load_release
+from shared.ontology.snapshot import build_snapshot
+from shared.ontology.units import UnitTable
+
+
+def test_health_endpoint(inventory_client: TestClient) -> None:
+    """Test health check endpoint."""
+    response = inventory_client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["service"] == "inventory-agent"
+
+
+def test_cursor_round_trip() -> None:
+    """Test cursors are opaque, URL-safe and reversible."""
+    for item_id in ("item_001", "ünïcode/with?chars", ""):
+        cursor = encode_cursor(item_id)
+        assert "=" not in cursor and "/" not in cursor
+        assert decode_cursor(cursor) == item_id
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("a")
+
+
+async def test_chunked_groups_records() -> None:
+    """Test bulk rows are grouped into bounded chunks in order."""
+
+    async def records() -> AsyncIterator[ItemRecord]:
+        for index in range(5):
+            yield f"item_{index}", "food_001", float(index), "kg", None
+
+    chunks = [chunk async for chunk in chunked(records(), size=2)]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[2][0][0] == "item_4"
+
+
+def _row(location: str, node_id: str, quantity: float, unit: str, items: int = 1) -> dict:
+    return {
+        "location": location,
+        "ontology_node_id": node_id,
+        "unit": unit,
+        "quantity": quantity,
+        "items": items,
+    }
+
+
+def test_normalizer_converts_to_base_units() -> None:
+    """Test write-time normalization to the dimension's base unit."""
+    normalizer = get_normalizer(build_snapshot(load_release()))
+    base = normalizer.normalize(2.5, "kg")
+    assert base is not None
+    assert base.dimension == "mass"
+    assert base.quantity == pytest.approx(2500)
+    assert normalizer.normalize(1, "crate") is None
+
+
+def test_roll_up_converts_groups_across_dimensions() -> None:
+    """Test dairy held as litres and grams totals in kilograms per location."""
+    snapshot = build_snapshot(load_release())
+    normalizer = get_normalizer(snapshot)
+    litres = normalizer.normalize(2, "liter")
+    grams = normalizer.normalize(500, "gram")
+    assert litres is not None and grams is not None
+    rows = [
+        _row("A", "food_002", litres.quantity, litres.unit, items=2),
+        _row("B", "food_002", grams.quantity, grams.unit),
+        _row("A", "food_002", 3, "crate"),
+    ]
+    table = UnitTable.from_snapshot(snapshot)
+    rollup = roll_up(rows, snapshot, table, "food_100", "kg")
+    assert rollup.groups["A"] == (pytest.approx(2.06), 2)
+    assert rollup.groups["B"] == (pytest.approx(0.5), 1)
+    assert rollup.total == pytest.approx(2.56)
+    assert [row["unit"] for row in rollup.unconverted] == ["crate"]
+
+
+def test_roll_up_by_child() -> None:
+    """Test totals attributed to the direct children of the root."""
+    snapshot = build_snapshot(load_release())
+    rows = [_row("A", "food_004", 1000, "gram"), _row("A", "food_103", 1, "kg")]
+    table = UnitTable.from_snapshot(snapshot)
+    rollup = roll_up(rows, snapshot, table, "food_103", "kg", group_by="child")
+    assert rollup.groups == {"food_104": (1.0, 1), "food_103": (1.0, 1)}
+    assert subtree(snapshot, "food_103") == ["food_103", "food_104", "food_004"]
+
+
+def _event(event_type: str, location: str, quantity: float, to_location: str | None = None):
+    return EventRecord(
+        event_type, "food_002", location, to_location, quantity, "kg", quantity, "kg", "mass"
+    )
+
+
+def test_event_deltas() -> None:
+    """Test running-total deltas of each event type, merged per total."""
+    events = [
+        _event("receive", "B", 5),
+        _event("consume", "B", 2),
+        _event("transfer", "B", 1, to_location="A"),
+        _event("adjust", "A", -0.5),
+    ]
+    assert events[2].deltas() == [
+        ("food_002", "B", "mass", "kg", -1),
+        ("food_002", "A", "mass", "kg", 1),
+    ]
+    assert merge_deltas(events) == [
+        ("food_002", "A", "mass", "kg", 0.5),
+        ("food_002", "B", "mass", "kg", 2),
+    ]
+
+
+def test_event_validation() -> None:
+    """Test quantity signs and transfer locations are checked per event type."""
+    event = {"ontology_node_id": "food_002", "quantity": 1, "unit": "kg", "location": "A"}
+    InventoryEvent(**{**event, "event_type": "adjust", "quantity": -1})
+    InventoryEvent(**{**event, "event_type": "transfer", "to_location": "B"})
+    invalid = [
+        {**event, "event_type": "consume", "quantity": -1},
+        {**event, "event_type": "adjust", "quantity": 0},
+        {**event, "event_type": "transfer"},
+        {**event, "event_type": "transfer", "to_location": "A"},
+        {**event, "event_type": "receive", "to_location": "B"},
+    ]
+    for body in invalid:
+        with pytest.raises(ValidationError):
+            InventoryEvent(**body)
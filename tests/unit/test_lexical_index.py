@@ -0,0 +1,52 @@
+"""Unit tests for the mapping agent's lexical candidate generator."""
+
+from agents.mapping.lexical import LexicalIndex, confident_match
+from shared.ontology.release import Release, load_release
+from shared.ontology.snapshot import build_snapshot
+
+
+def _index() -> LexicalIndex:
+    return LexicalIndex.from_snapshot(build_snapshot(load_release()))
+
+
+def test_exact_synonym_is_confident() -> None:
+    """Test an exact synonym hit short-circuits to one node."""
+    candidates = _index().search("Boneless Chicken")
+    assert candidates[0].node_id == "food_004"
+    assert candidates[0].exact
+    assert confident_match(candidates) is candidates[0]
+
+
+def test_near_match_ranks_first() -> None:
+    """Test misspelled and partial text still ranks the right node first."""
+    index = _index()
+    assert index.search("chiken brest")[0].node_id == "food_004"
+    assert index.search("white ric")[0].node_id == "food_005"
+
+
+def test_category_filter() -> None:
+    """Test candidates are restricted to the requested category."""
+    candidates = _index().search("2 lbs apples", category="unit_of_measure")
+    assert candidates
+    assert {candidate.category for candidate in candidates} == {"unit_of_measure"}
+
+
+def test_ambiguous_exact_hit_is_not_confident() -> None:
+    """Test an exact hit shared by two nodes is left to later stages."""
+    release = Release(
+        version="v1",
+        nodes=[
+            {"id": "a", "label": "Orange", "category": "food_item"},
+            {"id": "b", "label": "Orange", "category": "property"},
+        ],
+        relationships=[],
+        checksum="test",
+    )
+    candidates = LexicalIndex.from_snapshot(build_snapshot(release)).search("orange")
+    assert len(candidates) == 2
+    assert confident_match(candidates) is None
+
+
+def test_empty_query() -> None:
+    """Test text without any word characters yields no candidates."""
+    assert _index().search(" -- ") == []
@@ -0,0 +1,98 @@
+"""Unit tests for queued JSON logging, sampling and rate limiting."""
+
+import io
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from shared.utils.logging import (
+    REQUEST_ID_HEADER,
+    JsonFormatter,
+    Lazy,
+    QueueHandler,
+    RateLimitFilter,
+    RequestIdMiddleware,
+    SampleFilter,
+    flush_logs,
+    get_request_id,
+)
+
+
+def _record(msg: str = "Mapped %r", level: int = logging.DEBUG) -> logging.LogRecord:
+    return logging.makeLogRecord(
+        {"name": "agents.test", "levelno": level, "levelname": "DEBUG", "msg": msg, "args": ("x",)}
+    )
+
+
+def test_queue_handler_writes_json_on_writer_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test records are formatted lazily as JSON with their request id and extras."""
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    logger = logging.getLogger("agents.test_logging")
+    logger.addHandler(QueueHandler(target))
+    logger.setLevel(logging.INFO)
+    monkeypatch.setattr(logger, "propagate", False)
+    calls = []
+
+    def expensive() -> str:
+        calls.append(1)
+        return "summary"
+
+    try:
+        logger.debug("Skipped: %s", Lazy(expensive))
+        logger.info("Mapped %r: %s", "milk", Lazy(expensive), extra={"node_id": "food_001"})
+        flush_logs()
+    finally:
+        logger.handlers.clear()
+    assert len(calls) == 1
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Mapped 'milk': summary"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "agents.test_logging"
+    assert entry["node_id"] == "food_001"
+    assert "request_id" not in entry
+
+
+def test_rate_limit_filter_counts_suppressed_records(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test each message keeps its own budget and reports what was dropped."""
+    now = [0.0]
+    monkeypatch.setattr("shared.utils.logging.time.monotonic", lambda: now[0])
+    limit = RateLimitFilter(per_second=1, burst=2)
+
+    assert [limit.filter(_record()) for _ in range(5)] == [True, True, False, False, False]
+    assert limit.filter(_record("Other %r"))
+    assert limit.filter(_record(level=logging.WARNING))
+    now[0] = 1.0
+    record = _record()
+    assert limit.filter(record)
+    assert record.suppressed == 3
+
+
+def test_sample_filter_only_samples_low_levels() -> None:
+    """Test debug records are sampled while warnings always pass."""
+    assert not any(SampleFilter(0).filter(_record()) for _ in range(10))
+    assert SampleFilter(0).filter(_record(level=logging.WARNING))
+    assert all(SampleFilter(1).filter(_record()) for _ in range(10))
+
+
+def test_request_id_middleware() -> None:
+    """Test the caller's request id is adopted and echoed, or one is generated."""
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/id")
+    async def request_id() -> dict:
+        return {"id": get_request_id()}
+
+    client = TestClient(app)
+    response = client.get("/id", headers={REQUEST_ID_HEADER: "abc123"})
+    assert response.json()["id"] == "abc123"
+    assert response.headers[REQUEST_ID_HEADER] == "abc123"
+    generated = client.get("/id")
+    assert len(generated.json()["id"]) == 32
+    assert generated.headers[REQUEST_ID_HEADER] == generated.json()["id"]
+    assert get_request_id() is None
@@ -1,7 +1,23 @@
 """Unit tests for mapping agent."""
 
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 
+import agents.mapping.cache as cache_module
+from agents.mapping.batch import stream_mappings
+from agents.mapping.cache import MappingCache, cache_key
+from agents.mapping.main import get_mapping_cache
+from shared.ontology.snapshot import get_snapshot_store
+from shared.schemas.base import MappingRequest, MappingResponse
+from shared.utils import http
+
 
 def test_health_endpoint(mapping_client: TestClient) -> None:
     """Test health check endpoint."""
@@ -21,3 +37,239 @@ def test_map_text(mapping_client: TestClient) -> None:
     assert data["text"] == "2 apples"
     assert "confidence" in data
     assert "alternatives" in data
+
+
+def test_map_batch_json_array(mapping_client: TestClient) -> None:
+    """Test batch mapping with a JSON array body."""
+    texts = ["2 apples", "milk", "2 apples"]
+    response = mapping_client.post("/api/v1/map/batch", json=[{"text": t} for t in texts])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["text"] for line in lines] == texts
+
+
+def test_map_batch_ndjson(mapping_client: TestClient) -> None:
+    """Test batch mapping with a streamed NDJSON body and an invalid row."""
+    body = '{"text": "Milk"}\n{"oops": 1}\n{"text": "milk "}\n'
+    response = mapping_client.post(
+        "/api/v1/map/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["text"] == "Milk"
+    assert "line 2" in lines[1]["error"]
+    assert lines[2]["text"] == "milk "
+
+
+def test_map_text_zero_denominator(mapping_client: TestClient) -> None:
+    """Test a quantity with a zero denominator is ignored instead of failing."""
+    response = mapping_client.post("/api/v1/map", json={"text": "1/0 apples"})
+    assert response.status_code == 200
+    assert response.json()["quantity"] is None
+
+
+def test_map_batch_keeps_distinct_quantities(mapping_client: TestClient) -> None:
+    """Test rows differing only in quantity punctuation are mapped separately."""
+    texts = ["3/4 cup rice", "3-4 cup rice", "3/4  CUP rice"]
+    response = mapping_client.post("/api/v1/map/batch", json=[{"text": t} for t in texts])
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["quantity"] for line in lines] == [0.75, 3.0, 0.75]
+    assert [line["text"] for line in lines] == texts
+
+
+async def test_stream_mappings_reports_failed_rows() -> None:
+    """Test a row whose mapping raises gets an error line and the rest still stream."""
+
+    async def mapper(request: MappingRequest) -> MappingResponse:
+        if request.text == "bad":
+            raise RuntimeError("boom")
+        return MappingResponse(text=request.text, confidence=0.5)
+
+    async def requests() -> AsyncIterator[MappingRequest]:
+        for text in ("a", "bad", "b"):
+            yield MappingRequest(text=text)
+
+    lines = [
+        json.loads(line)
+        async for line in stream_mappings(requests(), mapper, concurrency=2, dedupe_size=10)
+    ]
+    assert lines[0]["text"] == "a" and lines[2]["text"] == "b"
+    assert "boom" in lines[1]["error"]
+
+
+def test_map_batch_invalid_json_array(mapping_client: TestClient) -> None:
+    """Test a malformed JSON array is rejected up front."""
+    response = mapping_client.post("/api/v1/map/batch", json=[{"oops": 1}])
+    assert response.status_code == 422
+
+
+async def test_stream_mappings_dedupes_and_bounds_concurrency() -> None:
+    """Test identical normalized texts are mapped once and concurrency is bounded."""
+    calls: list[str] = []
+    in_flight = 0
+    peak = 0
+
+    async def mapper(request: MappingRequest) -> MappingResponse:
+        nonlocal in_flight, peak
+        calls.append(request.text)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return MappingResponse(text=request.text, confidence=0.5)
+
+    async def requests() -> AsyncIterator[MappingRequest]:
+        for index in range(40):
+            yield MappingRequest(text=f"Item {index % 10}")
+
+    lines = [
+        json.loads(line)
+        async for line in stream_mappings(requests(), mapper, concurrency=3, dedupe_size=100)
+    ]
+    assert [line["text"] for line in lines] == [f"Item {index % 10}" for index in range(40)]
+    assert len(calls) == 10
+    assert peak <= 3
+
+
+def test_map_text_exact_synonym(mapping_client: TestClient) -> None:
+    """Test an unambiguous synonym maps straight to its node."""
+    response = mapping_client.post("/api/v1/map", json={"text": "Boneless chicken"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mapped_node_id"] == "food_004"
+    assert data["confidence"] == 1.0
+
+
+def test_map_text_parses_quantity(mapping_client: TestClient) -> None:
+    """Test only the item phrase is matched and the quantity is reported."""
+    response = mapping_client.post("/api/v1/map", json={"text": "2 lbs apples"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mapped_node_id"] == "food_001"
+    assert data["quantity"] == 2.0
+    assert data["unit_node_id"] == "unit_003"
+
+
+async def test_mapping_cache_tiers_by_outcome() -> None:
+    """Test hits ignore case and whitespace and unmapped results expire sooner."""
+    cache = MappingCache("checksum", maxsize=8, ttl=60, negative_ttl=1)
+    mapped = MappingResponse(text="Apples", mapped_node_id="food_001", confidence=0.9)
+    await cache.put(MappingRequest(text="Apples"), mapped)
+    hit = await cache.get(MappingRequest(text="  APPLES "))
+    assert hit is not None and hit.mapped_node_id == "food_001"
+    assert hit.text == "  APPLES "
+    assert await cache.get(MappingRequest(text="apples", context={"category": "x"})) is None
+
+    unmapped = MappingResponse(text="zzz", confidence=0.0)
+    await cache.put(MappingRequest(text="zzz"), unmapped)
+    assert cache._ttl(unmapped) == 1
+    assert cache_key(MappingRequest(text="zzz"), "a") != cache_key(MappingRequest(text="zzz"), "b")
+
+
+async def test_mapping_cache_disabled_at_zero_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a TTL of 0 turns the cache off instead of failing at startup."""
+    monkeypatch.setenv("MAPPING_CACHE_TTL", "0")
+    assert MappingCache.from_snapshot(get_snapshot_store().current()) is None
+    cache = MappingCache("checksum", maxsize=8, ttl=60, negative_ttl=0)
+    await cache.put(MappingRequest(text="zzz"), MappingResponse(text="zzz", confidence=0.0))
+    assert cache.stats()["size"] == 0
+
+
+class _FakeEngine:
+    """Answers every statement with the given rows and records what ran."""
+
+    def __init__(self, rows: list[SimpleNamespace]) -> None:
+        self.rows = rows
+        self.statements: list[tuple[str, object]] = []
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator["_FakeEngine"]:
+        yield self
+
+    begin = connect
+
+    async def execute(self, statement: object, parameters: object = None) -> SimpleNamespace:
+        self.statements.append((str(statement).split()[0], parameters))
+        return SimpleNamespace(
+            first=lambda: self.rows[0] if self.rows else None, all=lambda: self.rows
+        )
+
+
+async def test_invalid_shared_row_is_a_miss(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test shared rows that no longer validate are treated as misses and deleted."""
+    request = MappingRequest(text="Apples")
+    text_key, context_hash, _ = cache_key(request, "checksum")
+    bad = SimpleNamespace(
+        text_key=text_key, context_hash=context_hash, response={"confidence": 7}, remaining=60
+    )
+    engine = _FakeEngine([bad])
+    monkeypatch.setattr(cache_module, "get_engine", lambda: engine)
+    cache = MappingCache("checksum", maxsize=8, ttl=60, negative_ttl=1, shared=True)
+
+    assert await cache.get(request) is None
+    assert cache.shared_hits == 0
+    assert engine.statements[-1][0] == "DELETE"
+    assert await cache.warm() == 0
+    assert engine.statements[-1] == (
+        "DELETE",
+        [{"checksum": "checksum", "text_key": text_key, "context_hash": context_hash}],
+    )
+
+
+def test_map_text_cache_keeps_quantities_apart(mapping_client: TestClient) -> None:
+    """Test texts differing only in quantity punctuation do not share a cached result."""
+    for text, quantity in [("1/2 cup milk", 0.5), ("1-2 cup milk", 1.0), ("2.5 kg rice", 2.5)]:
+        assert (
+            mapping_client.post("/api/v1/map", json={"text": text}).json()["quantity"] == quantity
+        )
+    assert (
+        mapping_client.post("/api/v1/map", json={"text": "2/5 kg rice"}).json()["quantity"] == 0.4
+    )
+
+
+def test_map_text_uses_release_cache(mapping_client: TestClient) -> None:
+    """Test repeated texts are served from the cache of the active release."""
+    cache = get_mapping_cache(get_snapshot_store().current())
+    assert cache is not None
+    hits = cache.stats()["hits"]
+    context = {"category": "food_item", "source": "cache-test"}
+    first = mapping_client.post(
+        "/api/v1/map", json={"text": "Boneless Chicken", "context": context}
+    ).json()
+    second = mapping_client.post(
+        "/api/v1/map", json={"text": " boneless  CHICKEN", "context": context}
+    ).json()
+    assert second["mapped_node_id"] == first["mapped_node_id"] == "food_004"
+    assert second["text"] == " boneless  CHICKEN"
+    assert cache.stats()["hits"] == hits + 1
+    assert mapping_client.get("/metrics/cache").json()["checksum"] == cache.checksum
+
+
+@pytest.mark.parametrize("available", [True, False])
+def test_map_text_reranks_alternatives(
+    mapping_client: TestClient, monkeypatch: pytest.MonkeyPatch, available: bool
+) -> None:
+    """Test alternatives are reranked, and keep lexical order uncached if reranking fails."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not available:
+            return httpx.Response(503)
+        body = json.loads(request.content)
+        return httpx.Response(
+            200, json={"query": body["query"], "reranked_results": body["candidates"][::-1]}
+        )
+
+    client = http.AgentClient(
+        "reranking", "http://reranking", retries=0, transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setitem(http._clients, "reranking", client)
+    body = {"text": "fresh cheese", "context": {"source": f"rerank-{available}"}}
+    ids = [a["id"] for a in mapping_client.post("/api/v1/map", json=body).json()["alternatives"]]
+    assert ids == (["food_004", "food_102"] if available else ["food_102", "food_004"])
+
+    cache = get_mapping_cache(get_snapshot_store().current())
+    assert cache is not None
+    assert (asyncio.run(cache.get(MappingRequest(**body))) is not None) is available
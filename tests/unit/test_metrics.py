@@ -0,0 +1,73 @@
+"""Unit tests for request metrics, spans and the sampling profiler."""
+
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from shared.utils import metrics
+from shared.utils.metrics import Histogram, MetricsMiddleware, SamplingProfiler, metrics_router
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    """Test observations land in the first bucket whose bound they do not exceed."""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 3.65
+
+
+def test_middleware_labels_requests_by_route_template() -> None:
+    """Test requests are counted per route template and status, and exposed at /metrics."""
+    app = FastAPI()
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict:
+        if item_id < 0:
+            raise HTTPException(status_code=404)
+        with metrics.span("test.lookup"):
+            return {"id": item_id}
+
+    client = TestClient(app)
+    for path in ("/items/1", "/items/2", "/items/-1", "/missing"):
+        client.get(path)
+    registry = metrics.get_registry()
+    assert registry.requests[("GET", "/items/{item_id}", "200")].count >= 2
+    assert ("GET", "/items/{item_id}", "404") in registry.requests
+    assert ("GET", "unmatched", "404") in registry.requests
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/items/{item_id}",status="404"' in response.text
+    assert 'span_duration_seconds_count{span="test.lookup"}' in response.text
+    assert 'http_requests_in_flight{method="GET"} 1' in response.text
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_dumps_folded_stacks_of_slow_requests(tmp_path: Path) -> None:
+    """Test only requests over the threshold are written, as folded stacks."""
+    profiler = SamplingProfiler(threshold=0.02, interval=0.001, directory=tmp_path)
+
+    profiler.enter()
+    start = time.perf_counter()
+    assert profiler.exit(start, time.perf_counter(), "GET /fast") is None
+
+    profiler.enter()
+    start = time.perf_counter()
+    _busy(0.1)
+    path = profiler.exit(start, time.perf_counter(), "GET /items/{item_id}")
+    assert path is not None and path.suffix == ".folded"
+    assert "GET_items_item_id" in path.name
+    stack, count = path.read_text().splitlines()[0].rsplit(" ", 1)
+    assert "_busy (test_metrics.py" in stack.split(";")[-1]
+    assert int(count) > 0
@@ -2,6 +2,8 @@
 
 from fastapi.testclient import TestClient
 
+from agents.ontology.main import MAX_VECTOR_QUERIES
+
 
 def test_health_endpoint(ontology_client: TestClient) -> None:
     """Test health check endpoint."""
@@ -20,11 +22,29 @@ def test_root_endpoint(ontology_client: TestClient) -> None:
     assert data["status"] == "healthy"
 
 
-def test_list_nodes_empty(ontology_client: TestClient) -> None:
-    """Test listing nodes returns empty list initially."""
-    response = ontology_client.get("/api/v1/nodes")
+def test_list_nodes(ontology_client: TestClient) -> None:
+    """Test listing nodes returns the golden release."""
+    response = ontology_client.get("/api/v1/nodes?limit=3")
+    assert response.status_code == 200
+    assert [node["id"] for node in response.json()] == ["food_001", "food_002", "food_003"]
+
+
+def test_list_nodes_by_category(ontology_client: TestClient) -> None:
+    """Test listing nodes filtered by category."""
+    response = ontology_client.get("/api/v1/nodes?category=unit_of_measure")
+    assert response.status_code == 200
+    nodes = response.json()
+    assert nodes
+    assert {node["category"] for node in nodes} == {"unit_of_measure"}
+
+
+def test_get_node(ontology_client: TestClient) -> None:
+    """Test getting a node by ID."""
+    response = ontology_client.get("/api/v1/nodes/food_001")
     assert response.status_code == 200
-    assert response.json() == []
+    data = response.json()
+    assert data["label"] == "Apple"
+    assert "apples" in data["synonyms"]
 
 
 def test_get_node_not_found(ontology_client: TestClient) -> None:
@@ -55,3 +75,18 @@ def test_search_nodes(ontology_client: TestClient) -> None:
     data = response.json()
     assert "results" in data
     assert data["query"] == "apple"
+    assert data["results"][0]["id"] == "food_001"
+
+
+def test_vector_search_without_embeddings(ontology_client: TestClient) -> None:
+    """Test vector search over a release without embeddings is unavailable, not an error."""
+    response = ontology_client.post("/api/v1/search/vector", json={"embeddings": [[1.0, 0.0]]})
+    assert response.status_code == 503
+
+
+def test_vector_search_caps_queries(ontology_client: TestClient) -> None:
+    """Test one request cannot send more query vectors than the cap."""
+    response = ontology_client.post(
+        "/api/v1/search/vector", json={"embeddings": [[1.0, 0.0]] * (MAX_VECTOR_QUERIES + 1)}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,94 @@
+"""Unit tests for the relationship graph indexes."""
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from shared.ontology.graph import RelationshipGraph, get_graph
+from shared.ontology.release import load_release
+from shared.ontology.snapshot import build_snapshot
+
+
+def _graph(size: int, edges: list[tuple[int, int]]) -> RelationshipGraph:
+    sources = np.array([source for source, _ in edges], dtype=np.int64)
+    targets = np.array([target for _, target in edges], dtype=np.int64)
+    return RelationshipGraph(size, sources, targets)
+
+
+def test_forest_uses_intervals() -> None:
+    """Test a taxonomy with single parents uses the pre-order encoding."""
+    # 0 <- 1 <- 2, 0 <- 3, 4 alone
+    graph = _graph(5, [(1, 0), (2, 1), (3, 0)])
+    assert graph.is_forest
+    assert graph.ancestors(2) == [1, 0]
+    assert sorted(graph.descendants(0)) == [1, 2, 3]
+    assert graph.descendants(4) == []
+    assert graph.subsumes(0, 2)
+    assert graph.subsumes(2, 2)
+    assert not graph.subsumes(2, 0)
+    assert not graph.subsumes(3, 2)
+    assert not graph.subsumes(4, 2)
+
+
+def test_dag_falls_back_to_closure() -> None:
+    """Test multiple parents use precomputed ancestor sets."""
+    # 2 is_a 0 and 1; 3 is_a 2
+    graph = _graph(4, [(2, 0), (2, 1), (3, 2)])
+    assert not graph.is_forest
+    assert sorted(graph.ancestors(3)) == [0, 1, 2]
+    assert sorted(graph.descendants(1)) == [2, 3]
+    assert graph.subsumes(0, 3)
+    assert graph.subsumes(1, 3)
+    assert not graph.subsumes(0, 1)
+
+
+def test_cycle_falls_back_to_reachability() -> None:
+    """Test cycles do not break the closure."""
+    graph = _graph(3, [(0, 1), (1, 0), (2, 0)])
+    assert not graph.is_forest
+    assert graph.subsumes(1, 2)
+    assert graph.subsumes(0, 1)
+    assert sorted(graph.ancestors(2)) == [0, 1]
+
+
+def test_golden_taxonomy() -> None:
+    """Test is_a queries over the golden release."""
+    graph = get_graph(build_snapshot(load_release()))
+    assert graph.ancestors("food_001") == ["food_102", "food_101"]
+    assert sorted(graph.descendants("food_101")) == ["food_001", "food_102"]
+    assert graph.subsumes("food_100", "food_002")
+    assert not graph.subsumes("food_100", "food_001")
+    assert not graph.subsumes("missing", "food_001")
+    assert graph.descendants("unit_002", "measured_in") == ["food_002"]
+    assert graph.ancestors("food_001", "part_of") == []
+
+
+def test_descendants_endpoint(ontology_client: TestClient) -> None:
+    """Test listing descendants of a category node."""
+    response = ontology_client.get("/api/v1/nodes/food_103/descendants")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert {node["id"] for node in data["results"]} == {"food_104", "food_004"}
+
+
+def test_ancestors_endpoint(ontology_client: TestClient) -> None:
+    """Test listing ancestors and unknown nodes."""
+    response = ontology_client.get("/api/v1/nodes/food_004/ancestors")
+    assert [node["label"] for node in response.json()["results"]] == ["Poultry", "Meat & Poultry"]
+    assert ontology_client.get("/api/v1/nodes/missing/ancestors").status_code == 404
+    response = ontology_client.get(
+        "/api/v1/nodes/food_004/ancestors", params={"relationship_type": "likes"}
+    )
+    assert response.status_code == 422
+
+
+def test_subsumes_endpoint(ontology_client: TestClient) -> None:
+    """Test subsumption checks."""
+    response = ontology_client.get(
+        "/api/v1/subsumes", params={"ancestor_id": "food_100", "descendant_id": "food_002"}
+    )
+    assert response.json()["subsumes"] is True
+    response = ontology_client.get(
+        "/api/v1/subsumes", params={"ancestor_id": "food_002", "descendant_id": "food_100"}
+    )
+    assert response.json()["subsumes"] is False
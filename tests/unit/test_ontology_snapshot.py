@@ -0,0 +1,83 @@
+"""Unit tests for the in-process ontology snapshot."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from shared.ontology.release import Release, load_release
+from shared.ontology.snapshot import SnapshotStore, build_snapshot
+
+
+def _release(nodes: list[dict], version: str = "v1") -> Release:
+    return Release(version=version, nodes=nodes, relationships=[], checksum="test")
+
+
+def test_load_golden_release() -> None:
+    """Test loading the golden JSONL release."""
+    release = load_release()
+    assert release.version == "v1"
+    assert any(node["id"] == "food_001" for node in release.nodes)
+
+
+def test_load_json_release(tmp_path: Path) -> None:
+    """Test loading a release document in the schema format."""
+    path = tmp_path / "release.json"
+    path.write_text(
+        json.dumps(
+            {
+                "version": "v2",
+                "nodes": [{"id": "n1", "label": "Egg", "category": "food_item"}],
+                "relationships": [
+                    {"source_id": "n1", "target_id": "n1", "relationship_type": "is_a"}
+                ],
+            }
+        )
+    )
+    release = load_release(path)
+    assert release.version == "v2"
+    assert len(release.nodes) == 1
+    assert len(release.relationships) == 1
+
+
+def test_snapshot_indexes() -> None:
+    """Test id, synonym and category lookups."""
+    snapshot = build_snapshot(load_release())
+    assert snapshot.get("food_004").label == "Chicken Breast"
+    assert snapshot.get("missing") is None
+    assert [node.id for node in snapshot.lookup_synonym("Boneless  CHICKEN")] == ["food_004"]
+    assert [node.id for node in snapshot.lookup_synonym("Chicken-Breast")] == ["food_004"]
+    assert {node.category for node in snapshot.in_category("unit_of_measure")} == {
+        "unit_of_measure"
+    }
+
+
+def test_snapshot_rejects_duplicate_ids() -> None:
+    """Test that duplicate node ids fail the build."""
+    node = {"id": "n1", "label": "Egg", "category": "food_item"}
+    with pytest.raises(ValueError, match="Duplicate node id"):
+        build_snapshot(_release([node, node]))
+
+
+def test_snapshot_attributes_are_read_only() -> None:
+    """Test that node attributes cannot be mutated through the snapshot."""
+    snapshot = build_snapshot(_release([{"id": "n1", "label": "Egg", "category": "food_item"}]))
+    with pytest.raises(TypeError):
+        snapshot.get("n1").attributes["x"] = 1  # type: ignore[index]
+
+
+def test_store_swaps_snapshot(tmp_path: Path) -> None:
+    """Test that loading a release replaces the active snapshot."""
+    path = tmp_path / "release.json"
+    path.write_text(
+        json.dumps(
+            {"version": "v2", "nodes": [{"id": "n1", "label": "Egg", "category": "food_item"}]}
+        )
+    )
+    store = SnapshotStore()
+    before = store.current()
+    after = store.load(path)
+    assert store.current() is after
+    assert before.version == "v1"
+    assert after.version == "v2"
+    assert store.path == path
@@ -0,0 +1,91 @@
+"""Unit tests for the mapping agent's quantity/unit parser."""
+
+import time
+
+import pytest
+
+import agents.mapping.parser as parser_module
+from agents.mapping.parser import QuantityParser, parse_number
+from shared.ontology.release import load_release
+from shared.ontology.snapshot import build_snapshot
+
+
+@pytest.fixture(scope="module")
+def parser() -> QuantityParser:
+    """Parser with the golden release units."""
+    return QuantityParser.from_snapshot(build_snapshot(load_release()))
+
+
+@pytest.mark.parametrize(
+    ("token", "expected"),
+    [("2", 2.0), (".5", 0.5), ("3/4", 0.75), ("1 1/2", 1.5), ("½", 0.5), ("1½", 1.5)],
+)
+def test_parse_number(token: str, expected: float) -> None:
+    """Test quantity token formats."""
+    assert parse_number(token) == pytest.approx(expected)
+
+
+def test_parse_number_rejects_zero_denominator() -> None:
+    """Test a zero denominator is not a number."""
+    with pytest.raises(ValueError):
+        parse_number("1 1/0")
+
+
+@pytest.mark.parametrize(
+    ("text", "quantity", "quantity_max", "unit_node_id", "item"),
+    [
+        ("2 lbs apples", 2.0, None, "unit_003", "apples"),
+        ("2lbs apples", 2.0, None, "unit_003", "apples"),
+        ("1 1/2 kg rice", 1.5, None, "unit_001", "rice"),
+        ("1½ liters of milk", 1.5, None, "unit_002", "milk"),
+        ("2-3 pieces bread", 2.0, 3.0, "unit_005", "bread"),
+        ("2 to 3 kg rice", 2.0, 3.0, "unit_001", "rice"),
+        ("2 apples", 2.0, None, None, "apples"),
+        ("Milk 1-2 l", 1.0, 2.0, "unit_002", "Milk"),
+        ("apples (2 lbs)", 2.0, None, "unit_003", "apples"),
+        ("boneless chicken", None, None, None, "boneless chicken"),
+        ("Heinz 57 sauce", None, None, None, "Heinz 57 sauce"),
+        ("1/0 apples", None, None, None, "1/0 apples"),
+        ("apples 2-1/0 kg", None, None, None, "apples 2-1/0 kg"),
+        ("2% milk", None, None, None, "2% milk"),
+        ("7up", None, None, None, "7up"),
+        ("2x apples", 2.0, None, None, "apples"),
+        ("Milk, 2 l  ", 2.0, None, "unit_002", "Milk"),
+    ],
+)
+def test_parse(
+    parser: QuantityParser,
+    text: str,
+    quantity: float | None,
+    quantity_max: float | None,
+    unit_node_id: str | None,
+    item: str,
+) -> None:
+    """Test splitting text into quantity, unit and item phrase."""
+    parsed = parser.parse(text)
+    assert parsed.quantity == quantity
+    assert parsed.quantity_max == quantity_max
+    assert parsed.unit_node_id == unit_node_id
+    assert parsed.item == item
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["a" + " " * 10_000 + "!", "a" + " 1" * 5_000 + "!", " " * 10_000 + "1%"],
+    ids=["spaces", "numbers", "leading"],
+)
+def test_parse_pathological_whitespace(
+    parser: QuantityParser, monkeypatch: pytest.MonkeyPatch, text: str
+) -> None:
+    """Test long whitespace runs are rejected in linear time, even past the length cap."""
+    assert parser.parse(text).quantity is None
+    monkeypatch.setattr(parser_module, "MAX_PARSE_LENGTH", len(text))
+    start = time.perf_counter()
+    assert parser.parse(text).quantity is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_parse_many(parser: QuantityParser) -> None:
+    """Test the bulk API preserves input order."""
+    parsed = parser.parse_many(["2 kg rice", "milk"])
+    assert [result.item for result in parsed] == ["rice", "milk"]
@@ -0,0 +1,223 @@
+"""Unit tests for hot reload of ontology releases."""
+
+import json
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import shared.ontology.snapshot as snapshot_module
+from agents.mapping.lexical import LexicalIndex
+from agents.mapping.main import app as mapping_app
+from agents.ontology.main import app as ontology_app
+from agents.uom.main import get_unit_table
+from shared.ontology.graph import get_graph
+from shared.ontology.release import DEFAULT_RELEASE_PATH, save_embeddings
+from shared.ontology.reload import ReleaseWatcher
+from shared.ontology.snapshot import (
+    ReleaseValidationError,
+    SnapshotStore,
+    diff_snapshots,
+    get_snapshot_store,
+)
+
+PEAR = {"id": "food_900", "label": "Pear", "category": "food_item", "synonyms": ["pears"]}
+PINT = {
+    "id": "unit_900",
+    "label": "Pint",
+    "category": "unit_of_measure",
+    "synonyms": ["pt"],
+    "attributes": {"dimension": "volume", "base_unit": "milliliter", "conversion_factor": 473.176},
+}
+
+
+def _golden_lines() -> list[str]:
+    return DEFAULT_RELEASE_PATH.read_text().splitlines()
+
+
+def _write(path: Path, lines: list[str], *extra: dict) -> Path:
+    path.write_text("\n".join([*lines, *(json.dumps(record) for record in extra)]) + "\n")
+    return path
+
+
+@pytest.fixture
+def release(tmp_path: Path) -> Path:
+    """A writable copy of the golden release."""
+    return _write(tmp_path / "release.jsonl", _golden_lines())
+
+
+@pytest.fixture
+def store(release: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[SnapshotStore]:
+    """The process-wide store, pointed at the writable release."""
+    store = SnapshotStore(release)
+    monkeypatch.setattr(snapshot_module, "_default_store", store)
+    monkeypatch.setenv("ONTOLOGY_SUBSCRIBER_URLS", "")
+    yield store
+
+
+def test_diff_snapshots(store: SnapshotStore, release: Path) -> None:
+    """Test added, changed and removed nodes are detected."""
+    before = store.current()
+    lines = [line for line in _golden_lines() if '"food_003"' not in line or "source_id" in line]
+    lines = [line.replace('"Rice"', '"White Rice"') for line in lines]
+    _write(release, lines, {"id": "food_003", "label": "Bread", "category": "food_item"}, PEAR)
+    after = SnapshotStore(release).current()
+
+    diff = diff_snapshots(before, after)
+    assert diff.added == ("food_900",)
+    assert set(diff.changed) == {"food_003", "food_005"}
+    assert diff.removed == ()
+    assert not diff.appended
+    assert not diff.relationships_changed
+    assert diff_snapshots(before, before).is_empty
+
+
+def test_reload_carries_derived_structures(store: SnapshotStore, release: Path) -> None:
+    """Test appended nodes update derived caches instead of rebuilding them."""
+    before = store.current()
+    index = before.derived("lexical_index", LexicalIndex.from_snapshot)
+    table = get_unit_table()
+    get_graph(before)
+
+    assert not store.reload().changed
+    _write(release, _golden_lines(), PEAR, PINT)
+    result = store.reload()
+
+    assert result.changed
+    assert result.diff is not None and result.diff.appended
+    assert {"lexical_index", "unit_table"} <= set(result.reused)
+    assert "graph" not in result.reused
+    updated = result.snapshot.derived("lexical_index", LexicalIndex.from_snapshot)
+    assert updated.search("pear")[0].node_id == "food_900"
+    assert all(candidate.node_id != "food_900" for candidate in index.search("pear"))
+    assert get_unit_table().convert(1, "pt", "milliliter") == pytest.approx(473.176)
+    assert "unit_900" not in {unit.id for unit in table.units("volume")}
+
+
+def test_reload_rejects_invalid_release(store: SnapshotStore, release: Path) -> None:
+    """Test a release with dangling relationships never goes live."""
+    before = store.current()
+    _write(
+        release,
+        _golden_lines(),
+        {"source_id": "food_001", "target_id": "food_404", "relationship_type": "is_a"},
+    )
+    with pytest.raises(ReleaseValidationError, match="unknown node food_404"):
+        store.reload()
+    assert store.current() is before
+
+
+@pytest.mark.parametrize(
+    ("name", "content", "error"),
+    [
+        ("release.jsonl", b'{"id": "food_001"}\n{"id": \n', "line 2"),
+        ("release.jsonl", b"\xff\xfe", "not UTF-8"),
+        ("release.jsonl", b"[1, 2]\n", "not a JSON object"),
+        ("release.json", b"[1, 2]", "version and nodes"),
+        ("release.jsonl", b'{"id": "a", "label": "A"}\n', "line 1: missing category"),
+        ("release.json", b'{"version": "v2", "nodes": [{"id": "a"}, 3]}', "nodes[1]: not a"),
+    ],
+)
+def test_malformed_release_is_rejected(
+    store: SnapshotStore, tmp_path: Path, name: str, content: bytes, error: str
+) -> None:
+    """Test undecodable releases are validation errors and never go live."""
+    before = store.current()
+    path = tmp_path / name
+    path.write_bytes(content)
+    with pytest.raises(ReleaseValidationError, match=re.escape(error)):
+        store.reload(path)
+    assert store.current() is before
+
+
+def test_malformed_release_is_answered_with_422(store: SnapshotStore, release: Path) -> None:
+    """Test both reload endpoints report a malformed release as invalid, line by line."""
+    store.current()
+    release.write_text('{"id": "food_001", "label": "Apple"}\n{"id": \n')
+    response = TestClient(mapping_app).post(
+        "/api/v1/admin/release", json={"version": "v2", "checksum": "0" * 64}
+    )
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail[0] == "line 1: missing category"
+    assert detail[1].startswith("line 2:")
+    response = TestClient(ontology_app).post("/api/v1/admin/reload", json={})
+    assert response.status_code == 422
+
+
+async def test_embeddings_only_change_is_reloaded(store: SnapshotStore, release: Path) -> None:
+    """Test a new embedding sidecar changes the checksum and is picked up by the watcher."""
+    before = store.current()
+    watcher = ReleaseWatcher(store, interval=60)
+    watcher.start()
+    try:
+        assert await watcher.check() is None
+        save_embeddings(release, np.eye(len(before), 4))
+        result = await watcher.check()
+    finally:
+        await watcher.stop()
+    assert result is not None and result.changed
+    assert result.snapshot.checksum != before.checksum
+    assert result.snapshot.embeddings is not None
+
+
+def test_leases_keep_previous_snapshot(store: SnapshotStore, release: Path) -> None:
+    """Test in-flight requests finish on the snapshot they leased."""
+    with store.lease() as leased:
+        _write(release, _golden_lines(), PEAR)
+        store.reload()
+        assert store.current() is not leased
+        assert store.leases(leased) == 1
+        assert leased.get("food_900") is None
+    assert store.leases(leased) == 0
+
+
+async def test_watcher_reloads_changed_file(store: SnapshotStore, release: Path) -> None:
+    """Test the watcher picks up a rewritten release file."""
+    reloaded = []
+
+    async def on_reload(result: object) -> None:
+        reloaded.append(result)
+
+    watcher = ReleaseWatcher(store, interval=60, on_reload=on_reload)
+    store.current()
+    watcher.start()
+    try:
+        assert await watcher.check() is None
+        _write(release, _golden_lines(), PEAR)
+        result = await watcher.check()
+    finally:
+        await watcher.stop()
+    assert result is not None and result.changed
+    assert len(reloaded) == 1
+    assert store.current().get("food_900") is not None
+
+
+def test_admin_reload_endpoint(store: SnapshotStore, release: Path) -> None:
+    """Test reloading through the Ontology Agent."""
+    client = TestClient(ontology_app)
+    store.current()
+    _write(release, _golden_lines(), PEAR)
+    response = client.post("/api/v1/admin/reload", json={})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "reloaded"
+    assert data["diff"]["added"] == 1
+    assert client.get("/api/v1/nodes/food_900").status_code == 200
+
+    response = client.post("/api/v1/admin/reload", json={"path": "../../etc/passwd"})
+    assert response.status_code == 400
+
+
+def test_release_notification_endpoint(store: SnapshotStore) -> None:
+    """Test subscribers skip releases they already serve."""
+    client = TestClient(mapping_app)
+    snapshot = get_snapshot_store().current()
+    response = client.post(
+        "/api/v1/admin/release",
+        json={"version": snapshot.version, "checksum": snapshot.checksum},
+    )
+    assert response.json()["status"] == "unchanged"
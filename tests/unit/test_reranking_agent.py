@@ -0,0 +1,209 @@
+"""Unit tests for the Reranking Agent."""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.reranking.batching import MicroBatcher
+from agents.reranking.scoring import (
+    RerankGroup,
+    candidate_features,
+    rerank,
+    rerank_many,
+    text_features,
+    top_k_order,
+)
+from shared.ontology.release import Release, load_release
+from shared.ontology.snapshot import build_snapshot
+from shared.utils.cache import LRUCache
+
+
+def test_text_features() -> None:
+    """Test token overlap, trigram similarity and exact synonym matches."""
+    assert text_features("boneless chicken", ["chicken breast", "boneless chicken"]) == (1, 1, 1)
+    overlap, similarity, exact = text_features("chicken thigh", ["chicken breast"])
+    assert overlap == 0.5
+    assert 0 < similarity < 1
+    assert exact == 0
+    assert text_features("milk", []) == (0, 0, 0)
+
+
+def test_rerank_prefers_synonym_match() -> None:
+    """Test an exact synonym outranks a higher upstream score."""
+    snapshot = build_snapshot(load_release())
+    candidates = [
+        {"id": "food_003", "label": "Bread", "score": 0.9},
+        {"id": "food_105", "label": "Grains & Bakery", "score": 0.5},
+    ]
+    results = rerank("loaf", candidates, None, snapshot)
+    assert [result["id"] for result in results] == ["food_003", "food_105"]
+    assert results[0]["rerank_score"] > results[1]["rerank_score"]
+    assert results[0]["score"] == 0.9
+
+
+def test_feature_cache_and_context() -> None:
+    """Test node features are memoized and context features are applied."""
+    snapshot = build_snapshot(load_release())
+    cache: LRUCache = LRUCache(maxsize=16)
+    candidates = [{"id": "food_002"}, {"id": "unit_003"}, {"id": "custom", "label": "Oat Milk"}]
+    context = {"category": "unit_of_measure"}
+    features = candidate_features("Milk", candidates, context, snapshot, cache)
+    assert features.shape == (3, 5)
+    assert features[0, 2] == 1.0
+    assert list(features[:, 3]) == [0.0, 1.0, 0.0]
+    assert features[2, 0] == 1.0
+    assert len(cache) == 2
+
+    candidate_features("milk!", candidates, None, snapshot, cache)
+    assert cache.hits == 2
+
+
+def test_embedding_cosine() -> None:
+    """Test cosine similarity uses snapshot or candidate embeddings."""
+    nodes = [
+        {"id": "a", "label": "A", "category": "food_item", "embedding": [1.0, 0.0]},
+        {"id": "b", "label": "B", "category": "food_item", "embedding": [0.0, 1.0]},
+    ]
+    snapshot = build_snapshot(Release(version="v1", nodes=nodes, relationships=[], checksum="t"))
+    candidates = [{"id": "a"}, {"id": "b"}, {"id": "c", "embedding": [1.0, 1.0]}, {"id": "d"}]
+    features = candidate_features("x", candidates, {"query_embedding": [0, 2]}, snapshot)
+    np.testing.assert_allclose(features[:, 4], [0.0, 1.0, np.sqrt(0.5), 0.0], rtol=1e-6)
+
+
+def test_top_k_order() -> None:
+    """Test partial selection matches a full stable sort."""
+    scores = np.array([0.1, 0.5, 0.5, 0.9, 0.3])
+    assert top_k_order(scores).tolist() == [3, 1, 2, 4, 0]
+    assert top_k_order(scores, 3).tolist() == [3, 1, 2]
+    assert top_k_order(scores, 0).tolist() == []
+
+
+def test_rerank_many_matches_single_queries() -> None:
+    """Test one pass over many groups gives the per-query results."""
+    snapshot = build_snapshot(load_release())
+    groups = [
+        RerankGroup("loaf", [{"id": "food_105"}, {"id": "food_003"}]),
+        RerankGroup("nothing", []),
+        RerankGroup("kg", [{"id": "unit_002"}, {"id": "unit_001"}], top_k=1),
+    ]
+    results = rerank_many(groups, snapshot)
+    assert results == [
+        rerank(group.query, group.candidates, group.context, snapshot, top_k=group.top_k)
+        for group in groups
+    ]
+    assert [[result["id"] for result in group] for group in results] == [
+        ["food_003", "food_105"],
+        [],
+        ["unit_001"],
+    ]
+
+
+async def test_micro_batcher_coalesces_requests() -> None:
+    """Test concurrent submissions are scored as one batch, in order."""
+    batches = []
+
+    def score(groups: list[RerankGroup]) -> list[list[dict]]:
+        batches.append(len(groups))
+        return [[{"id": group.query}] for group in groups]
+
+    batcher = MicroBatcher(score, window=0.01, max_size=3)
+    results = await asyncio.gather(*(batcher.submit(RerankGroup(str(i), [])) for i in range(4)))
+    assert [result[0]["id"] for result in results] == ["0", "1", "2", "3"]
+    assert batches == [3, 1]
+    assert batcher.stats()["requests"] == 4
+
+
+async def test_micro_batcher_isolates_errors() -> None:
+    """Test a failing group fails only its own request."""
+
+    def score(groups: list[RerankGroup]) -> list[list[dict]]:
+        if any(group.query == "bad" for group in groups):
+            raise RuntimeError("boom")
+        return [[{"id": group.query}] for group in groups]
+
+    batcher = MicroBatcher(score, window=0.001, max_size=8)
+    results = await asyncio.gather(
+        batcher.submit(RerankGroup("a", [])),
+        batcher.submit(RerankGroup("bad", [])),
+        batcher.submit(RerankGroup("b", [])),
+        return_exceptions=True,
+    )
+    assert results[0] == [{"id": "a"}] and results[2] == [{"id": "b"}]
+    assert isinstance(results[1], RuntimeError)
+    with pytest.raises(ValueError):
+        MicroBatcher(score, window=0.001, max_size=0)
+
+
+def test_rerank_batch_endpoint(reranking_client: TestClient) -> None:
+    """Test the batch endpoint returns results in request order."""
+    response = reranking_client.post(
+        "/api/v1/rerank/batch",
+        json={
+            "requests": [
+                {"query": "loaf", "candidates": [{"id": "food_105"}, {"id": "food_003"}]},
+                {"query": "kg", "candidates": [{"id": "unit_002"}, {"id": "unit_001"}], "top_k": 1},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["query"] for result in results] == ["loaf", "kg"]
+    assert results[0]["reranked_results"][0]["id"] == "food_003"
+    assert [result["id"] for result in results[1]["reranked_results"]] == ["unit_001"]
+    assert reranking_client.post("/api/v1/rerank/batch", json={"requests": []}).status_code == 422
+
+
+def test_rerank_endpoint(reranking_client: TestClient) -> None:
+    """Test the rerank endpoint orders and truncates candidates."""
+    response = reranking_client.post(
+        "/api/v1/rerank",
+        json={
+            "query": "kg",
+            "candidates": [{"id": "unit_002"}, {"id": "food_001"}, {"id": "unit_001"}],
+            "context": {"category": "unit_of_measure"},
+            "top_k": 2,
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["reranked_results"]
+    assert [result["id"] for result in results] == ["unit_001", "unit_002"]
+
+
+@pytest.mark.parametrize(
+    "context",
+    [
+        {"category_priors": {"food_item": "high"}},
+        {"query_embedding": ["a"]},
+        {"query_embedding": [1.0, 0.0]},
+    ],
+)
+def test_rerank_rejects_invalid_context(reranking_client: TestClient, context: dict) -> None:
+    """Test malformed priors and embeddings of the wrong type or length are 422s."""
+    body = {"query": "kg", "candidates": [{"id": "x", "embedding": [1.0, 0.0, 0.0]}]}
+    response = reranking_client.post("/api/v1/rerank", json={**body, "context": context})
+    assert response.status_code == 422
+    batch = reranking_client.post(
+        "/api/v1/rerank/batch", json={"requests": [body, {**body, "context": context}]}
+    )
+    assert batch.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "embedding", [["a", 1.0, 0.0], [1.0, None, 0.0], [True, 0.0, 0.0], "abc", {}]
+)
+def test_rerank_rejects_non_numeric_candidate_embeddings(
+    reranking_client: TestClient, embedding: object
+) -> None:
+    """Test candidate embeddings that are not lists of numbers are 422s, not 500s."""
+    body = {
+        "query": "kg",
+        "candidates": [{"id": "unit_001"}, {"id": "x", "embedding": embedding}],
+        "context": {"query_embedding": [1.0, 0.0, 0.0]},
+    }
+    response = reranking_client.post("/api/v1/rerank", json=body)
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("candidates[1].embedding")
+    batch = reranking_client.post("/api/v1/rerank/batch", json={"requests": [body]})
+    assert batch.status_code == 422
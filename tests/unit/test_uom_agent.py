@@ -0,0 +1,204 @@
+"""Unit tests for UoM agent."""
+
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from shared.ontology.release import Release, load_release
+from shared.ontology.snapshot import (
+    NodeRecord,
+    OntologySnapshot,
+    build_snapshot,
+    diff_snapshots,
+)
+from shared.ontology.units import (
+    IncompatibleUnitsError,
+    MissingItemDataError,
+    UnitTable,
+    UnknownUnitError,
+    item_factor,
+)
+
+
+@pytest.fixture
+def table() -> UnitTable:
+    """Unit table compiled from the golden release."""
+    return UnitTable.from_snapshot(build_snapshot(load_release()))
+
+
+def test_health_endpoint(uom_client: TestClient) -> None:
+    """Test health check endpoint."""
+    response = uom_client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["service"] == "uom-agent"
+
+
+def test_convert(uom_client: TestClient) -> None:
+    """Test converting between units of one dimension."""
+    response = uom_client.post(
+        "/api/v1/convert", json={"value": 2, "from_unit": "lbs", "to_unit": "kg"}
+    )
+    assert response.status_code == 200
+    assert response.json()["converted_value"] == pytest.approx(0.907184)
+
+
+def test_convert_incompatible(uom_client: TestClient) -> None:
+    """Test converting across dimensions fails with a clear error."""
+    response = uom_client.post(
+        "/api/v1/convert", json={"value": 1, "from_unit": "kg", "to_unit": "liter"}
+    )
+    assert response.status_code == 422
+    assert "mass" in response.json()["detail"]
+
+
+def test_list_units(uom_client: TestClient) -> None:
+    """Test listing units by dimension."""
+    response = uom_client.get("/api/v1/units?dimension=volume")
+    assert response.status_code == 200
+    assert {unit["dimension"] for unit in response.json()["units"]} == {"volume"}
+
+
+def test_factor_table(table: UnitTable) -> None:
+    """Test the all-pairs factors and implicit base units."""
+    assert table.factor("kg", "gram") == pytest.approx(1000)
+    assert table.factor("lb", "oz") == pytest.approx(16, rel=1e-4)
+    assert table.base_unit("mass").id == "gram"
+    matrix = table.matrix("mass")
+    assert matrix.shape == (4, 4)
+    assert matrix.diagonal() == pytest.approx([1, 1, 1, 1])
+
+
+def test_unknown_and_incompatible_units(table: UnitTable) -> None:
+    """Test resolution failures raise dedicated errors."""
+    with pytest.raises(UnknownUnitError):
+        table.convert(1, "furlong", "kg")
+    with pytest.raises(IncompatibleUnitsError):
+        table.convert(1, "kg", "each")
+
+
+def test_incremental_add_and_update(table: UnitTable) -> None:
+    """Test adding a unit and updating one that others depend on."""
+    table.add_unit("unit_tonne", "Tonne", "mass", "kg", 1000, aliases=("t",))
+    assert table.convert(1, "t", "lb") == pytest.approx(2204.62, rel=1e-5)
+    table.add_unit("unit_001", "Kilogram", "mass", "gram", 500)
+    assert table.convert(1, "t", "gram") == pytest.approx(500_000)
+
+
+def _unit(node_id: str, label: str, base_unit: str, factor: float) -> dict:
+    attributes = {"dimension": "volume", "base_unit": base_unit, "conversion_factor": factor}
+    return {
+        "id": node_id,
+        "label": label,
+        "category": "unit_of_measure",
+        "synonyms": [label.lower()],
+        "attributes": attributes,
+    }
+
+
+def _units_snapshot(*nodes: dict) -> OntologySnapshot:
+    return build_snapshot(Release(version="v1", nodes=list(nodes), relationships=[], checksum="t"))
+
+
+TABLESPOON = _unit("unit_tbsp", "Tablespoon", "Cup", 1 / 16)
+CUP = _unit("unit_cup", "Cup", "milliliter", 236.588)
+
+
+def test_units_defined_out_of_order() -> None:
+    """Test a unit listed before its base unit still gets the base's scale."""
+    table = UnitTable.from_snapshot(_units_snapshot(TABLESPOON, CUP))
+    assert table.convert(1, "cup", "milliliter") == pytest.approx(236.588)
+    assert table.convert(16, "tablespoon", "cup") == pytest.approx(1)
+
+
+def test_update_defining_implicit_base_rebuilds() -> None:
+    """Test a release defining a unit that was only an implicit base forces a rebuild."""
+    previous, snapshot = _units_snapshot(TABLESPOON), _units_snapshot(TABLESPOON, CUP)
+    table = UnitTable.from_snapshot(previous)
+    assert table.updated(diff_snapshots(previous, snapshot), previous, snapshot) is None
+
+
+def test_convert_batch_json(uom_client: TestClient) -> None:
+    """Test columnar conversion with per-row errors."""
+    response = uom_client.post(
+        "/api/v1/convert/batch",
+        json={
+            "values": [1, 2, 3, 4],
+            "from_units": ["kg", "lb", "furlong", "kg"],
+            "to_units": ["gram", "kg", "kg", "liter"],
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["values"][:2] == pytest.approx([1000, 0.907184])
+    assert data["values"][2:] == [None, None]
+    assert [error["index"] for error in data["errors"]] == [2, 3]
+
+
+def test_convert_batch_binary(uom_client: TestClient) -> None:
+    """Test packed float64 conversion with one unit pair for all rows."""
+    values = np.array([1.0, 2.5], dtype="<f8")
+    response = uom_client.post(
+        "/api/v1/convert/batch?from_unit=kg&to_unit=gram",
+        content=values.tobytes(),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Conversion-Errors"] == "0"
+    assert np.frombuffer(response.content, dtype="<f8").tolist() == [1000.0, 2500.0]
+
+
+def test_convert_many_broadcasts_single_unit(table: UnitTable) -> None:
+    """Test a single unit code applies to every row."""
+    result = table.convert_many(np.array([1.0, 2.0]), "kg", ["gram", "lb"])
+    assert result.values == pytest.approx([1000, 4.40924], rel=1e-5)
+    assert result.errors == {}
+
+
+def test_convert_item_volume_to_mass(uom_client: TestClient) -> None:
+    """Test density-aware conversion of a food item."""
+    request = {"value": 2, "from_unit": "cups", "to_unit": "gram", "ontology_node_id": "food_005"}
+    response = uom_client.post("/api/v1/convert", json=request)
+    assert response.status_code == 200
+    assert response.json()["converted_value"] == pytest.approx(2 * 236.588 * 0.85)
+
+
+def test_convert_item_count_to_mass(uom_client: TestClient) -> None:
+    """Test count weights and that the composite factor is cached."""
+    from agents.uom.main import get_item_factor_cache
+
+    request = {"value": 3, "from_unit": "each", "to_unit": "kg", "ontology_node_id": "food_001"}
+    for _ in range(2):
+        response = uom_client.post("/api/v1/convert", json=request)
+        assert response.status_code == 200
+        assert response.json()["converted_value"] == pytest.approx(0.546)
+    assert ("food_001", "each", "kg") in get_item_factor_cache()
+
+
+def test_convert_item_missing_density(uom_client: TestClient) -> None:
+    """Test items without a density cannot cross mass and volume."""
+    request = {"value": 1, "from_unit": "cup", "to_unit": "gram", "ontology_node_id": "food_001"}
+    response = uom_client.post("/api/v1/convert", json=request)
+    assert response.status_code == 422
+    assert "density_g_per_ml" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("density", ["about 240", -1.03, 0, "nan", float("inf"), True, [1]])
+def test_invalid_item_density_is_missing_data(table: UnitTable, density: object) -> None:
+    """Test densities that are not positive finite numbers are reported, not used."""
+    node = NodeRecord(
+        "food_900", "Milk", "food_item", (), MappingProxyType({"density_g_per_ml": density})
+    )
+    with pytest.raises(MissingItemDataError, match="invalid density_g_per_ml"):
+        item_factor(table, node, "cup", "gram")
+    valid = NodeRecord(
+        "food_900", "Milk", "food_item", (), MappingProxyType({"density_g_per_ml": "1.03"})
+    )
+    assert item_factor(table, valid, "milliliter", "gram") == pytest.approx(1.03)
+
+
+def test_convert_unknown_item(uom_client: TestClient) -> None:
+    """Test unknown ontology nodes are reported."""
+    request = {"value": 1, "from_unit": "cup", "to_unit": "gram", "ontology_node_id": "nope"}
+    assert uom_client.post("/api/v1/convert", json=request).status_code == 404